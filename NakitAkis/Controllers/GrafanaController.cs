@@ -96,7 +96,47 @@ namespace NakitAkis.Controllers
         ORDER BY DATE_TRUNC('{dateTrunc}', tarih) ASC
         LIMIT @Limit";
 
-                var result = await connection.QueryAsync<dynamic>(sql, new { Limit = limit });
+                // ÖNCE ÖZET VIEW'I (cash_flow_rollups.py ile tutulur), YOKSA ANA TABLO
+                var rollupSql = @"
+        SELECT 
+            period_date,
+            total_anapara,
+            total_basit_faiz,
+            total_faiz_kazanci,
+            total_model_faiz_kazanci,
+            total_tlref_kazanci,
+            record_count,
+            avg_model_nema_orani,
+            avg_tlref_faiz,
+            avg_basit_faiz,
+            total_model_faiz,
+            total_tlref_faiz
+        FROM cash_flow_rollup_avg 
+        WHERE periyot = @Period
+        ORDER BY period_date ASC
+        LIMIT @Limit";
+
+                IEnumerable<dynamic> result;
+                try
+                {
+                    // Tetikleyicilerin kuyruğa yazdığı tarihler henüz yenilenmediyse özet eskidir
+                    var stale = await connection.ExecuteScalarAsync<bool>(
+                        "SELECT EXISTS (SELECT 1 FROM cash_flow_rollup_bekleyen)");
+                    if (stale)
+                    {
+                        _logger.LogInformation("cash_flow_rollup_bekleyen dolu, cash_flow_analysis üzerinden hesaplanıyor");
+                        result = await connection.QueryAsync<dynamic>(sql, new { Limit = limit });
+                    }
+                    else
+                    {
+                        result = await connection.QueryAsync<dynamic>(rollupSql, new { Period = dateTrunc, Limit = limit });
+                    }
+                }
+                catch (PostgresException ex) when (ex.SqlState == PostgresErrorCodes.UndefinedTable)
+                {
+                    _logger.LogWarning("cash_flow_rollup_avg bulunamadı, cash_flow_analysis üzerinden hesaplanıyor");
+                    result = await connection.QueryAsync<dynamic>(sql, new { Limit = limit });
+                }
 
                 if (!result.Any())
                 {
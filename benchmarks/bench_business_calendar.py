@@ -0,0 +1,73 @@
+"""İşgünü takvimi: günden güne geri yürüyerek önceki işgünü bulma ile vektörel aramanın karşılaştırması
+
+Veritabanı gerekmez. Ayrıca günlük güncellemenin bir yıl boyunca her gün çalıştığı
+varsayılarak takvimin kaç EVDS isteğini gereksiz kıldığı sayılır: sadece hafta sonu/tatil
+eksik olan günlerde eski yol boş dönen pencere için tüm series kodlarını dener.
+
+Kullanım:
+    python benchmarks/bench_business_calendar.py --years 30 --queries 1000000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evds_client import SERIES_CODES
+from tlref_calendar import BusinessCalendar, turkish_holidays
+
+
+def walk_back(date_val, closed):
+    """Eski yol: hafta sonu veya tatil olmayan güne kadar günden güne geri git"""
+    day = date_val - timedelta(days=1)
+    while day.weekday() >= 5 or day in closed:
+        day -= timedelta(days=1)
+    return day
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=30, help="Takvim uzunluğu (yıl)")
+    parser.add_argument("--queries", type=int, default=1_000_000, help="Rastgele tarih sayısı")
+    parser.add_argument("--year", type=int, default=2025, help="EVDS isteği sayımı için yıl")
+    args = parser.parse_args()
+
+    first_year = 2026 - args.years
+    start = time.perf_counter()
+    calendar = BusinessCalendar(first_year, 2025)
+    print(f"takvim kurulumu      : {(time.perf_counter() - start) * 1000:10.1f} ms ({calendar})")
+
+    rng = np.random.default_rng(7)
+    span = (date(2025, 12, 31) - date(first_year + 1, 1, 1)).days
+    dates = np.datetime64(date(first_year + 1, 1, 1)) + rng.integers(0, span, args.queries).astype("timedelta64[D]")
+
+    start = time.perf_counter()
+    vectorized = calendar.previous_business_days(dates)
+    vector_elapsed = time.perf_counter() - start
+
+    sample = dates[:min(args.queries, 100_000)].tolist()
+    closed = {d for year in range(first_year, 2026) for d, (_, half_day) in turkish_holidays(year).items()
+              if not half_day}
+    start = time.perf_counter()
+    walked = [walk_back(d, closed) for d in sample]
+    walk_elapsed = (time.perf_counter() - start) * args.queries / len(sample)
+
+    print(f"geri yürüme (tahmini): {walk_elapsed * 1000:10.1f} ms ({len(sample):,} örnekten)")
+    print(f"vektörel             : {vector_elapsed * 1000:10.1f} ms ({args.queries:,} tarih)")
+    print(f"hızlanma             : {walk_elapsed / vector_elapsed:10.1f}x")
+    assert vectorized[:len(sample)].tolist() == walked
+    print("Sonuçlar aynı ✓")
+
+    # Günlük güncelleme her gün sadece o günü eksik bulursa
+    days = [date(args.year, 1, 1) + timedelta(days=i) for i in range(365)]
+    closed_days = sum(not calendar.is_business_day(d) for d in days)
+    print(f"\n{args.year}: {closed_days} hafta sonu/tatil günü; takvimsiz yol bu günlerde "
+          f"{closed_days * len(SERIES_CODES):,} boş EVDS isteği atar, takvimle 0")
+
+
+if __name__ == "__main__":
+    main()
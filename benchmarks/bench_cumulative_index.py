@@ -0,0 +1,80 @@
+"""Kümülatif endeks: dönem başına satır toplama/çarpma ile iki aramalı hesaplamanın karşılaştırması
+
+Veritabanı gerekmez; sentetik günlük oran serisi üzerinde rastgele dönemler sorgulanır.
+
+Kullanım:
+    python benchmarks/bench_cumulative_index.py --years 30 --queries 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tlref_index import DAY_COUNT, compute_index
+
+
+def make_rates(years, seed=42):
+    """Her takvim günü için sentetik tlref_yuzde (ondalık) serisi"""
+    rng = np.random.default_rng(seed)
+    return np.clip(0.10 + np.cumsum(rng.normal(0, 0.0005, years * 365)), 0.01, None).round(6)
+
+
+def scan_window(rates, first, last):
+    """Eski yol: dönemdeki her satırı gezerek çarp/topla"""
+    growth, total = 1.0, 0.0
+    for rate in rates[first:last + 1]:
+        growth *= 1.0 + rate / DAY_COUNT
+        total += rate
+    return growth - 1.0, total / (last - first + 1)
+
+
+def lookup_window(rates, index_values, sum_values, first, last):
+    """Endeks yolu: başlangıç ve bitiş satırı"""
+    prior_index = index_values[first] / (1.0 + rates[first] / DAY_COUNT)
+    prior_sum = sum_values[first] - rates[first]
+    return index_values[last] / prior_index - 1.0, (sum_values[last] - prior_sum) / (last - first + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=30, help="Sentetik seri uzunluğu (yıl)")
+    parser.add_argument("--queries", type=int, default=2000, help="Rastgele dönem sayısı")
+    args = parser.parse_args()
+
+    rates = make_rates(args.years)
+    rng = np.random.default_rng(7)
+    windows = np.sort(rng.integers(0, len(rates), size=(args.queries, 2)), axis=1)
+    print(f"Sentetik seri: {args.years} yıl, {len(rates):,} gün, {args.queries:,} dönem")
+
+    start = time.perf_counter()
+    index_values, sum_values = compute_index(rates)
+    full_elapsed = time.perf_counter() - start
+    print(f"tam yeniden hesaplama : {full_elapsed * 1000:10.2f} ms")
+
+    # Son günün değişmesi: sadece son satır, önceki satırın değerine dayanarak hesaplanır
+    start = time.perf_counter()
+    compute_index(rates[-1:], index_values[-2], sum_values[-2])
+    print(f"artımlı (son gün)     : {(time.perf_counter() - start) * 1000:10.3f} ms")
+
+    start = time.perf_counter()
+    scanned = [scan_window(rates, a, b) for a, b in windows]
+    scan_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    looked_up = [lookup_window(rates, index_values, sum_values, a, b) for a, b in windows]
+    lookup_elapsed = time.perf_counter() - start
+
+    print(f"satır tarama          : {scan_elapsed * 1000:10.1f} ms")
+    print(f"iki arama             : {lookup_elapsed * 1000:10.1f} ms")
+    print(f"hızlanma              : {scan_elapsed / lookup_elapsed:10.1f}x")
+
+    np.testing.assert_allclose(np.array(looked_up), np.array(scanned), rtol=1e-9, atol=1e-12)
+    print("Sonuçlar aynı (göreli fark < 1e-9) ✓")
+
+
+if __name__ == "__main__":
+    main()
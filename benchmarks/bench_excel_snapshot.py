@@ -0,0 +1,93 @@
+"""EVDS çalışma kitabı okuma: openpyxl ile soğuk okuma, önbellekten sıcak okuma ve alternatif okuyucu
+
+Kullanım:
+    python benchmarks/bench_excel_snapshot.py --years 20
+    python benchmarks/bench_excel_snapshot.py --years 20 --json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evds_excel import SHEET_NAME, parse_evds_frame, read_evds_frame, resolve_engine, snapshot_format, snapshot_paths
+
+
+def make_synthetic_workbook(path, years, seed=42):
+    """EVDS dışa aktarımına benzeyen (Tarih metni, TLREF, ek sütunlar) sentetik çalışma kitabı yaz"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end="2025-08-19", periods=years * 261)
+    rates = 10 + np.cumsum(rng.normal(0, 0.05, len(dates)))
+    pd.DataFrame({
+        "Tarih": dates.strftime("%d-%m-%Y"),
+        "TP_BISTTLREF_ORAN": rates.round(4),
+        "UNIXTIME": (dates.astype("int64") // 10**9).astype(str),
+        "TP_DK_USD_A": rng.normal(30, 1, len(dates)).round(4)
+    }).to_excel(path, sheet_name=SHEET_NAME, index=False)
+    return len(dates)
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=20, help="Sentetik çalışma kitabı uzunluğu (yıl)")
+    parser.add_argument("--repeat", type=int, default=5, help="Sıcak okuma tekrar sayısı")
+    parser.add_argument("--json", action="store_true", help="Sonuçları JSON olarak yazdır")
+    args = parser.parse_args()
+
+    results = {"years": args.years, "snapshot_format": snapshot_format()}
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "EVDS.xlsx")
+        results["rows"] = make_synthetic_workbook(path, args.years)
+        results["workbook_bytes"] = os.path.getsize(path)
+
+        cold_df, results["cold_openpyxl_s"] = timed(parse_evds_frame, path, engine="openpyxl")
+
+        # İlk çağrı okuyup önbelleği yazar, sonrakiler önbellekten gelir
+        _, results["cold_with_snapshot_write_s"] = timed(read_evds_frame, path, use_cache=True)
+        warm = []
+        for _ in range(args.repeat):
+            warm_df, elapsed = timed(read_evds_frame, path, use_cache=True)
+            warm.append(elapsed)
+        results["warm_snapshot_s"] = min(warm)
+        results["snapshot_bytes"] = os.path.getsize(snapshot_paths(path)[0])
+        pd.testing.assert_frame_equal(cold_df, warm_df)
+
+        if resolve_engine("calamine") == "calamine":
+            calamine_df, results["cold_calamine_s"] = timed(parse_evds_frame, path, engine="calamine")
+            pd.testing.assert_frame_equal(cold_df, calamine_df)
+        else:
+            results["cold_calamine_s"] = None
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"\nSentetik çalışma kitabı: {args.years} yıl, {results['rows']:,} satır, "
+          f"{results['workbook_bytes'] / 1024:.0f} KB")
+    print(f"openpyxl soğuk okuma     : {results['cold_openpyxl_s'] * 1000:10.1f} ms")
+    print(f"okuma + önbellek yazma   : {results['cold_with_snapshot_write_s'] * 1000:10.1f} ms")
+    label = f"önbellekten ({results['snapshot_format']})"
+    print(f"{label:25}: {results['warm_snapshot_s'] * 1000:10.1f} ms "
+          f"({results['cold_openpyxl_s'] / results['warm_snapshot_s']:.0f}x)")
+    if results["cold_calamine_s"] is None:
+        print("calamine soğuk okuma     :   kurulu değil (pip install python-calamine)")
+    else:
+        print(f"calamine soğuk okuma     : {results['cold_calamine_s'] * 1000:10.1f} ms "
+              f"({results['cold_openpyxl_s'] / results['cold_calamine_s']:.1f}x)")
+    print("Önbellekten okunan çerçeve birebir aynı ✓")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""fill_missing_dates: eski tarih-tarih tarama ile TlrefSeries as-of motorunun karşılaştırması
+
+Kullanım:
+    python benchmarks/bench_fill_missing_dates.py --years 30
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tlref_tablo_creator import fill_date_gaps
+
+
+def make_synthetic_series(years, seed=42):
+    """Hafta sonları ve rastgele tatilleri eksik olan sentetik TLREF serisi üret"""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp("2025-08-19")
+    dates = pd.date_range(end=end, periods=years * 365, freq="D")
+
+    # Sadece işgünleri, ayrıca ~%3 rastgele tatil (uzun bayramlar dahil)
+    keep = dates.dayofweek < 5
+    keep &= rng.random(len(dates)) > 0.03
+    for start in rng.choice(len(dates) - 10, size=years, replace=False):
+        keep[start:start + 9] = False
+    dates = dates[keep]
+
+    rates = 10 + np.cumsum(rng.normal(0, 0.05, len(dates)))
+    df = pd.DataFrame({"Tarih": dates, "TLREF": rates.round(4)})
+    df["TLREF_Yuzde"] = df["TLREF"] / 100.0
+    df["Gun_Adi"] = df["Tarih"].dt.day_name()
+    df["Hafta_Sonu"] = df["Tarih"].dt.dayofweek >= 5
+    df["Yil"] = df["Tarih"].dt.year
+    df["Ay"] = df["Tarih"].dt.month
+    df["Gun"] = df["Tarih"].dt.day
+    return df
+
+
+def legacy_fill_missing_dates(df):
+    """Eski implementasyon: her eksik gün için DataFrame'i 7 kereye kadar filtreler"""
+    full_date_range = pd.date_range(start=df["Tarih"].min(), end=df["Tarih"].max(), freq="D")
+    existing_dates = set(df["Tarih"].dt.date)
+    missing_dates = [d for d in full_date_range if d.date() not in existing_dates]
+
+    filled_records = []
+    for missing_date in missing_dates:
+        prev_date = missing_date - pd.Timedelta(days=1)
+        search_attempts = 0
+        prev_tlref = None
+        while search_attempts < 7 and prev_tlref is None:
+            prev_record = df[df["Tarih"].dt.date == prev_date.date()]
+            if not prev_record.empty:
+                prev_tlref = prev_record.iloc[0]["TLREF"]
+                break
+            prev_date = prev_date - pd.Timedelta(days=1)
+            search_attempts += 1
+
+        if prev_tlref is not None:
+            filled_records.append({
+                "Tarih": missing_date,
+                "TLREF": prev_tlref,
+                "TLREF_Yuzde": prev_tlref / 100.0,
+                "Gun_Adi": missing_date.day_name(),
+                "Hafta_Sonu": missing_date.dayofweek >= 5,
+                "Yil": missing_date.year,
+                "Ay": missing_date.month,
+                "Gun": missing_date.day
+            })
+
+    if not filled_records:
+        return df
+    combined_df = pd.concat([df, pd.DataFrame(filled_records)], ignore_index=True)
+    return combined_df.sort_values("Tarih").reset_index(drop=True)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=30, help="Sentetik seri uzunluğu (yıl)")
+    parser.add_argument("--skip-legacy", action="store_true", help="Eski implementasyonu çalıştırma")
+    args = parser.parse_args()
+
+    df = make_synthetic_series(args.years)
+    print(f"Sentetik seri: {args.years} yıl, {len(df):,} kayıt")
+
+    (new_df, report_df), new_elapsed = timed(fill_date_gaps, df)
+    print(f"as-of motoru         : {new_elapsed * 1000:10.1f} ms ({len(report_df):,} tarih dolduruldu)")
+
+    if args.skip_legacy:
+        return
+
+    legacy_df, legacy_elapsed = timed(legacy_fill_missing_dates, df)
+    print(f"eski tarama          : {legacy_elapsed * 1000:10.1f} ms")
+    print(f"hızlanma             : {legacy_elapsed / new_elapsed:10.1f}x")
+
+    columns = ["Tarih", "TLREF", "TLREF_Yuzde", "Gun_Adi", "Hafta_Sonu", "Yil", "Ay", "Gun"]
+    pd.testing.assert_frame_equal(
+        new_df[columns].reset_index(drop=True),
+        legacy_df[columns].reset_index(drop=True),
+        check_dtype=False
+    )
+    print("Sonuçlar birebir aynı ✓")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Günlük yolun (tlref_cli + daily_tlref_updater) import maliyeti için bütçe kontrolü
+
+`python -X importtime` birkaç kez ayrı süreçte çalıştırılır, en hızlı ölçüm alınır.
+Toplam süre bütçeyi aşarsa veya günlük yolda olmaması gereken ağır bir paket
+(pandas, numpy, requests...) yüklenirse 1 ile çıkar; CI'da gerilemeyi yakalamak içindir.
+
+Kullanım:
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --budget-ms 150 --repeat 7 --json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# -------------------------------
+# AYARLAR
+# -------------------------------
+MODULES = ["tlref_cli", "daily_tlref_updater"]  # Günlük yolun giriş modülleri
+BUDGET_MS = 150  # Giriş modüllerinin toplam (kümülatif) import süresi üst sınırı
+REPEAT = 5  # Ölçüm tekrar sayısı; en düşük değer raporlanır
+TOP_N = 10  # Raporlanacak en ağır modül sayısı
+
+# Günlük yolda import edilmemesi gereken paketler (lazy import edilir ya da hiç kullanılmaz)
+FORBIDDEN = ["pandas", "numpy", "requests", "urllib3", "schedule", "openpyxl", "http.server"]
+
+
+def measure_once(modules):
+    """Yeni bir süreçte -X importtime çıktısını al; {modül: (self_us, kümülatif_us)} döndür"""
+    code = "import " + ", ".join(modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import başarısız:\n{result.stderr[-2000:]}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def measure(modules=MODULES, repeat=REPEAT):
+    """En hızlı çalışmayı döndür (disk/CPU gürültüsünü azaltmak için)"""
+    best, best_total = None, None
+    for _ in range(repeat):
+        timings = measure_once(modules)
+        total = sum(timings.get(name, (0, 0))[1] for name in modules)
+        if best_total is None or total < best_total:
+            best, best_total = timings, total
+    return best, best_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--top", type=int, default=TOP_N)
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--json", action="store_true", help="Sonucu JSON olarak yazdır")
+    args = parser.parse_args()
+
+    timings, total_us = measure(args.modules, args.repeat)
+    forbidden = [name for name in FORBIDDEN if name in timings]
+    heaviest = sorted(timings.items(), key=lambda item: -item[1][0])[:args.top]
+    total_ms = total_us / 1000
+    ok = total_ms <= args.budget_ms and not forbidden
+
+    if args.json:
+        print(json.dumps({
+            "modules": args.modules,
+            "total_ms": round(total_ms, 2),
+            "budget_ms": args.budget_ms,
+            "module_count": len(timings),
+            "forbidden": forbidden,
+            "heaviest": [{"module": name, "self_ms": round(s / 1000, 2), "cumulative_ms": round(c / 1000, 2)}
+                         for name, (s, c) in heaviest],
+            "ok": ok
+        }, indent=2))
+    else:
+        print(f"Import süresi ({', '.join(args.modules)}): {total_ms:.1f} ms "
+              f"(bütçe {args.budget_ms:.0f} ms, {len(timings)} modül, en iyi {args.repeat} ölçüm)")
+        print(f"\n{'Modül':40} | {'Kendi (ms)':>10} | {'Kümülatif (ms)':>14}")
+        print("-" * 70)
+        for name, (self_us, cumulative_us) in heaviest:
+            print(f"{name:40} | {self_us / 1000:10.2f} | {cumulative_us / 1000:14.2f}")
+        if forbidden:
+            print(f"\n✗ Günlük yolda yasak paketler yüklendi: {', '.join(forbidden)}")
+        if total_ms > args.budget_ms:
+            print(f"\n✗ Bütçe aşıldı: {total_ms:.1f} ms > {args.budget_ms:.0f} ms")
+        if ok:
+            print("\n✓ Bütçe içinde")
+
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
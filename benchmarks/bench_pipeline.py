@@ -0,0 +1,391 @@
+"""TLREF iş akışının tüm aşamaları için sentetik veriyle uçtan uca benchmark
+
+Sentetik EVDS çalışma kitabı ve cash_flow_analysis tablosu üretir, her aşamayı
+ayrı bir şemada (varsayılan tlref_pipeline_bench) ve stub EVDS sunucusuna karşı
+çalıştırır. Her aşama için gecikme yüzdelikleri, satır/sn, veritabanı
+gidiş-dönüşü ve Python tarafı en yüksek bellek kullanımı raporlanır. Veritabanı
+TLREF_DB_* ile verilir; yerel, atılabilir bir PostgreSQL örneği önerilir.
+
+Satır satır eski yollar (tlref_load_batch, excel_cash_flow_batch) --row-sample
+kadar satırlık örnekle ölçülür ve aralarındaki sabit bekleme (time.sleep) süreye
+dahil edilmez.
+
+Kullanım:
+    python benchmarks/bench_pipeline.py --scale 1y
+    python benchmarks/bench_pipeline.py --scale 20y --json --output sonuc.json
+    python benchmarks/bench_pipeline.py --scale 1m --stages holiday_fill_bulk,cash_flow_propagation
+    python benchmarks/bench_pipeline.py --scale 20y --compare onceki.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cash_flow_rollups
+import daily_tlref_updater
+import evds_client
+import excel_tlref
+import holiday_tlref_filler
+import tlref_db
+import tlref_metrics
+import tlref_tablo_creator
+from bench_excel_snapshot import make_synthetic_workbook
+from evds_excel import parse_evds_frame
+from evds_stub import EvdsStubServer
+
+BENCH_SCHEMA = "tlref_pipeline_bench"
+
+# Ölçek adı -> (yıl, cash_flow_analysis'te günlük satır); 1m ~1.000.000 cash flow satırı
+SCALES = {
+    "1y": (1, 20),
+    "20y": (20, 20),
+    "1m": (20, 137)
+}
+DAILY_WINDOW_DAYS = 30  # Stub EVDS'ten yeniden çekilecek son gün sayısı
+REGRESSION_RATIO = 1.2  # --compare ile p50 bu oranı aşarsa gerileme sayılır
+
+
+# -------------------------------
+# Sentetik veri
+# -------------------------------
+def create_cash_flow_template(cur, start, end, rows_per_day, null_ratio=0.03):
+    """Hafta sonları ve rastgele günlerde TLREF'i eksik cash_flow_analysis şablonu oluştur"""
+    cur.execute("DROP TABLE IF EXISTS cash_flow_template")
+    cur.execute("""
+        CREATE TABLE cash_flow_template AS
+        SELECT d::date AS tarih,
+               (1000000 + k * 1000)::numeric AS anapara,
+               1::numeric AS basit_faiz, 1::numeric AS faiz_kznc, 1::numeric AS model_faiz_kznc,
+               0.3::numeric AS model_nema_orani,
+               CASE WHEN EXTRACT(ISODOW FROM d) >= 6 OR hashint4(EXTRACT(DOY FROM d)::int) %% 100 < %s
+                    THEN NULL ELSE 0.45 END::numeric AS tlref_faiz,
+               NULL::numeric AS tlref_faiz_kazanci
+        FROM generate_series(%s::date, %s::date, interval '1 day') AS d,
+             generate_series(1, %s) AS k
+        ORDER BY d
+    """, (int(null_ratio * 100), start, end, rows_per_day))
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS cash_flow_analysis (
+            id SERIAL PRIMARY KEY,
+            tarih DATE,
+            anapara NUMERIC,
+            basit_faiz NUMERIC,
+            faiz_kznc NUMERIC,
+            model_faiz_kznc NUMERIC,
+            model_nema_orani NUMERIC,
+            tlref_faiz NUMERIC,
+            tlref_faiz_kazanci NUMERIC
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_cash_flow_bench_tarih ON cash_flow_analysis (tarih)")
+    # Yazan aşamalar dokundukları özet kovalarını da yeniler; bu maliyet ölçüme dahildir
+    cash_flow_rollups.create_rollup_table(cur)
+    cur.execute("SELECT COUNT(*) FROM cash_flow_template")
+    return cur.fetchone()[0]
+
+
+def reset_cash_flow():
+    with tlref_db.transaction() as cur:
+        cur.execute("TRUNCATE cash_flow_analysis")
+        cur.execute("""
+            INSERT INTO cash_flow_analysis
+            (tarih, anapara, basit_faiz, faiz_kznc, model_faiz_kznc, model_nema_orani, tlref_faiz, tlref_faiz_kazanci)
+            SELECT * FROM cash_flow_template
+        """)
+        cur.execute("ANALYZE cash_flow_analysis")
+        cash_flow_rollups.rebuild_rollups(cur)
+
+
+def reset_tlref(df):
+    """TLREF tablosunu boş olarak yeniden oluştur; df verilirse COPY yoluyla doldur"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not tlref_tablo_creator.create_tlref_table():
+            raise RuntimeError("TLREF tablosu oluşturulamadı")
+        if df is not None and not tlref_tablo_creator.insert_data_bulk(df):
+            raise RuntimeError("TLREF tablosu doldurulamadı")
+
+
+# -------------------------------
+# Aşamalar
+# -------------------------------
+def build_stages(ctx):
+    """(ad, hazırlık, çalıştır) listesi; çalıştır işlenen satır sayısını döndürür"""
+    sample = ctx["row_sample"]
+
+    def excel_parse():
+        return len(parse_evds_frame(ctx["workbook"]))
+
+    def fill_missing_dates():
+        return len(tlref_tablo_creator.fill_missing_dates(ctx["derived_df"].copy()))
+
+    def tlref_load_copy():
+        if not tlref_tablo_creator.insert_data_bulk(ctx["load_df"]):
+            raise RuntimeError("insert_data_bulk başarısız")
+        return len(ctx["load_df"])
+
+    def tlref_load_batch():
+        part = ctx["load_df"].tail(sample)
+        with mock.patch.object(tlref_tablo_creator.time, "sleep"):
+            if not tlref_tablo_creator.insert_data_in_batches(part):
+                raise RuntimeError("insert_data_in_batches başarısız")
+        return len(part)
+
+    def delete_daily_window():
+        with tlref_db.transaction() as cur:
+            cur.execute("DELETE FROM TLREF WHERE tarih BETWEEN %s AND %s", ctx["daily_window"])
+
+    def daily_update_stub():
+        start, end = ctx["daily_window"]
+        updated = daily_tlref_updater.daily_tlref_update(start_date=start, end_date=end, raise_errors=True)
+        if not updated:
+            raise RuntimeError("daily_tlref_update hiç kayıt yazmadı")
+        return updated
+
+    def excel_cash_flow_bulk():
+        updated, _, errors = excel_tlref.update_all_bulk(ctx["excel_df"])
+        if errors:
+            raise RuntimeError("update_all_bulk hata verdi")
+        return ctx["cash_flow_rows"]
+
+    def excel_cash_flow_batch():
+        part = ctx["excel_df"].head(sample)
+        with mock.patch.object(excel_tlref.time, "sleep"):
+            updated, _, errors = excel_tlref.update_all_in_batches(part)
+        if errors:
+            raise RuntimeError("update_all_in_batches hata verdi")
+        return len(part)
+
+    def cash_flow_propagation():
+        return daily_tlref_updater.update_cash_flow_tlref(raise_errors=True)
+
+    def revise_daily_window():
+        # Dolu cash_flow_analysis üzerinde EVDS'in son günleri revize etmesi
+        # changes modu yüksek su işaretini de kurar, ölçülen çalışma sadece revize günleri görür
+        reset_cash_flow()
+        daily_tlref_updater.update_cash_flow_tlref(raise_errors=True, mode="changes")
+        with tlref_db.transaction() as cur:
+            cur.execute("""
+                UPDATE TLREF SET tlref_oran = tlref_oran + 0.01, tlref_yuzde = tlref_yuzde + 0.0001,
+                                 updated_at = clock_timestamp()
+                WHERE tarih BETWEEN %s AND %s
+            """, ctx["daily_window"])
+
+    def cash_flow_revision():
+        return daily_tlref_updater.update_cash_flow_tlref(raise_errors=True, mode="changes")
+
+    def cash_flow_rollup_rebuild():
+        with tlref_db.transaction() as cur:
+            cash_flow_rollups.rebuild_rollups(cur)
+        return ctx["cash_flow_rows"]
+
+    def holiday_fill_bulk():
+        report = holiday_tlref_filler.fill_holiday_tlref_bulk()
+        if not report:
+            raise RuntimeError("fill_holiday_tlref_bulk boş rapor döndürdü")
+        return len(report)
+
+    def holiday_fill_row():
+        holiday_tlref_filler.fill_holiday_tlref()
+        return ctx["holiday_dates"]
+
+    return [
+        ("excel_parse", None, excel_parse),
+        ("fill_missing_dates", None, fill_missing_dates),
+        ("tlref_load_copy", lambda: reset_tlref(None), tlref_load_copy),
+        ("tlref_load_batch", lambda: reset_tlref(None), tlref_load_batch),
+        ("daily_update_stub", delete_daily_window, daily_update_stub),
+        ("excel_cash_flow_bulk", reset_cash_flow, excel_cash_flow_bulk),
+        ("excel_cash_flow_batch", reset_cash_flow, excel_cash_flow_batch),
+        ("cash_flow_propagation", reset_cash_flow, cash_flow_propagation),
+        ("cash_flow_revision", revise_daily_window, cash_flow_revision),
+        ("cash_flow_rollup_rebuild", None, cash_flow_rollup_rebuild),
+        ("holiday_fill_bulk", reset_cash_flow, holiday_fill_bulk),
+        ("holiday_fill_row", reset_cash_flow, holiday_fill_row)
+    ]
+
+
+def measure(setup, run, repeat):
+    """Aşamayı repeat kez ölç, ardından bir kez de tracemalloc ile en yüksek belleği al"""
+    samples, rows, round_trips = [], 0, 0
+    for _ in range(repeat):
+        if setup:
+            setup()
+        tlref_metrics.reset()
+        start = time.perf_counter()
+        rows = run()
+        samples.append(time.perf_counter() - start)
+        round_trips = sum(v for k, v in tlref_metrics.summary()["counters"].items()
+                          if k.startswith("tlref_db_round_trips_total"))
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    p50, p95 = np.percentile(samples, [50, 95])
+    return {
+        "rows": int(rows),
+        "repeat": repeat,
+        "p50_s": float(p50),
+        "p95_s": float(p95),
+        "max_s": float(max(samples)),
+        "rows_per_s": float(rows / p50) if p50 else None,
+        "db_round_trips": int(round_trips),
+        "peak_py_bytes": int(peak)
+    }
+
+
+# -------------------------------
+# Karşılaştırma
+# -------------------------------
+def compare(results, baseline, ratio=REGRESSION_RATIO):
+    """Önceki sonuçla p50 karşılaştır; (aşama, eski, yeni, oran, gerileme mi) listesi döndür"""
+    if baseline.get("scale") != results["scale"]:
+        raise SystemExit(f"Karşılaştırılan sonuç farklı ölçekte ({baseline.get('scale')} != {results['scale']})")
+    rows = []
+    for name, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if not previous:
+            continue
+        change = current["p50_s"] / previous["p50_s"] if previous["p50_s"] else float("inf")
+        rows.append((name, previous["p50_s"], current["p50_s"], change, change > ratio))
+    return rows
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="1y", help="Sentetik veri ölçeği")
+    parser.add_argument("--repeat", type=int, default=3, help="Her aşama için ölçüm sayısı")
+    parser.add_argument("--stages", help="Sadece bu aşamalar (virgülle ayrılmış)")
+    parser.add_argument("--row-sample", type=int, default=200, help="Satır satır yollarda kullanılacak satır sayısı")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Stub EVDS yanıt gecikmesi (sn)")
+    parser.add_argument("--keep", action="store_true", help="Sentetik şemayı silme")
+    parser.add_argument("--json", action="store_true", help="Sonuçları JSON olarak yazdır")
+    parser.add_argument("--output", help="Sonuçları bu JSON dosyasına da yaz")
+    parser.add_argument("--compare", help="Önceki bir --output dosyasıyla karşılaştır")
+    args = parser.parse_args()
+
+    years, rows_per_day = SCALES[args.scale]
+    logging.disable(logging.INFO)
+
+    # Tüm modüller havuzdan bağlandığı için şema seçimi bağlantı seçenekleriyle yapılır
+    tlref_db.configure_pool(options=f"-c search_path={BENCH_SCHEMA}")
+    stub = EvdsStubServer(latency=args.stub_latency).start()
+    evds_client._client = evds_client.EvdsClient(base_url=stub.base_url, state_file=None, use_cache=False)
+
+    results = {
+        "scale": args.scale,
+        "years": years,
+        "rows_per_day": rows_per_day,
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "stages": {}
+    }
+
+    with tempfile.TemporaryDirectory() as folder:
+        ctx = {"row_sample": args.row_sample, "workbook": os.path.join(folder, "EVDS.xlsx")}
+        results["workbook_rows"] = make_synthetic_workbook(ctx["workbook"], years)
+
+        parsed = parse_evds_frame(ctx["workbook"])
+        ctx["excel_df"] = parsed.sort_values("Tarih", ascending=False)
+        ctx["derived_df"] = tlref_tablo_creator.add_derived_columns(parsed.sort_values("Tarih").copy())
+        with contextlib.redirect_stdout(io.StringIO()):
+            ctx["load_df"] = tlref_tablo_creator.fill_missing_dates(ctx["derived_df"].copy())
+
+        first_day, last_day = ctx["load_df"]["Tarih"].min().date(), ctx["load_df"]["Tarih"].max().date()
+        ctx["daily_window"] = (last_day - timedelta(days=DAILY_WINDOW_DAYS - 1), last_day)
+
+        with tlref_db.transaction() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+            cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+            ctx["cash_flow_rows"] = create_cash_flow_template(cur, first_day, last_day, rows_per_day)
+            cur.execute("SELECT COUNT(DISTINCT tarih) FROM cash_flow_template WHERE tlref_faiz IS NULL")
+            ctx["holiday_dates"] = cur.fetchone()[0]
+        results["cash_flow_rows"] = ctx["cash_flow_rows"]
+
+        selected = set(args.stages.split(",")) if args.stages else None
+        try:
+            # TLREF tablosu sonraki aşamalar için tam veriyle hazırlanır
+            reset_tlref(ctx["load_df"])
+            for name, setup, run in build_stages(ctx):
+                if selected and name not in selected:
+                    continue
+                print(f"  {name} ölçülüyor...", file=sys.stderr)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results["stages"][name] = measure(setup, run, args.repeat)
+                if name in ("tlref_load_copy", "tlref_load_batch"):
+                    reset_tlref(ctx["load_df"])
+        finally:
+            stub.stop()
+            if not args.keep:
+                with tlref_db.transaction() as cur:
+                    cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+            tlref_db.close_pool()
+
+    # ru_maxrss Linux'ta KB, macOS'ta bayt
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results["process_max_rss_bytes"] = maxrss if sys.platform == "darwin" else maxrss * 1024
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    comparison = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            comparison = compare(results, json.load(f))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"\nÖlçek {args.scale}: {years} yıl, çalışma kitabı {results['workbook_rows']:,} satır, "
+              f"cash_flow_analysis {results['cash_flow_rows']:,} satır (revizyon {results['revision']})")
+        print("-" * 96)
+        print(f"{'Aşama':24} | {'Satır':>9} | {'p50 (ms)':>10} | {'p95 (ms)':>10} | {'satır/sn':>11} | "
+              f"{'DB tur':>7} | {'Bellek MB':>9}")
+        print("-" * 96)
+        for name, r in results["stages"].items():
+            print(f"{name:24} | {r['rows']:9,} | {r['p50_s'] * 1000:10.1f} | {r['p95_s'] * 1000:10.1f} | "
+                  f"{r['rows_per_s'] or 0:11,.0f} | {r['db_round_trips']:7,} | {r['peak_py_bytes'] / 1e6:9.1f}")
+        print(f"Süreç en yüksek RSS: {results['process_max_rss_bytes'] / 1e6:.0f} MB")
+
+    if comparison is not None:
+        print(f"\n{'Aşama':24} | {'Önce p50 (ms)':>13} | {'Sonra p50 (ms)':>14} | {'Oran':>6}", file=sys.stderr)
+        for name, before, after, change, regressed in comparison:
+            print(f"{name:24} | {before * 1000:13.1f} | {after * 1000:14.1f} | {change:5.2f}x"
+                  f"{'  ✗ gerileme' if regressed else ''}", file=sys.stderr)
+        if any(regressed for *_, regressed in comparison):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Eski indeks düzeni ile tlref_schema stratejisinin sentetik veri üzerinde sorgu süresi karşılaştırması
+
+Ayrı bir şemada (varsayılan tlref_schema_bench) sentetik TLREF ve cash_flow_analysis
+tabloları oluşturur, scriptlerin çalıştırdığı sorguları eski indekslerle ölçer,
+migration'ı uygular ve aynı sorguları tekrar ölçer.
+
+Kullanım:
+    python benchmarks/bench_schema.py --years 20 --rows-per-day 60
+    python benchmarks/bench_schema.py --partition --json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tlref_schema
+from tlref_db import DB_CONFIG
+
+BENCH_SCHEMA = "tlref_schema_bench"
+
+# Scriptlerdeki sorguların (ad, SQL, geri alınsın mı) karşılıkları
+QUERIES = [
+    ("tlref_upsert_2000", """
+        INSERT INTO TLREF (tarih, tlref_oran, tlref_yuzde, gun_adi, hafta_sonu, yil, ay, gun)
+        SELECT d::date, 45, 0.45, 'x', FALSE, EXTRACT(YEAR FROM d), EXTRACT(MONTH FROM d), EXTRACT(DAY FROM d)
+        FROM generate_series((SELECT MAX(tarih) FROM TLREF) - 999, (SELECT MAX(tarih) FROM TLREF) + 1000,
+                             interval '1 day') AS d
+        ON CONFLICT (tarih) DO UPDATE SET tlref_oran = EXCLUDED.tlref_oran
+    """, True),
+    ("cash_flow_gap_scan", """
+        SELECT tarih, COUNT(*) FROM cash_flow_analysis
+        WHERE tlref_faiz IS NULL
+        GROUP BY tarih ORDER BY tarih
+    """, False),
+    ("holiday_source_lookup", """
+        SELECT g.tarih, src.tarih
+        FROM (
+            SELECT tarih FROM cash_flow_analysis
+            WHERE tlref_faiz IS NULL AND tarih >= (SELECT MAX(tarih) FROM TLREF) - 365
+            GROUP BY tarih
+        ) g
+        LEFT JOIN LATERAL (
+            SELECT s.tarih FROM cash_flow_analysis s
+            WHERE s.tarih < g.tarih AND s.tarih >= g.tarih - 10 AND s.tlref_faiz IS NOT NULL
+            ORDER BY s.tarih DESC LIMIT 1
+        ) src ON TRUE
+    """, False),
+    ("cash_flow_last_30_days", """
+        SELECT COUNT(*), SUM(anapara) FROM cash_flow_analysis
+        WHERE tarih >= (SELECT MAX(tarih) FROM TLREF) - 30
+    """, False),
+    ("apply_cash_flow_tlref", """
+        UPDATE cash_flow_analysis cfa
+        SET tlref_faiz = t.tlref_yuzde,
+            tlref_faiz_kazanci = (t.tlref_yuzde * cfa.anapara / 365.0)
+        FROM TLREF t
+        WHERE cfa.tarih = t.tarih AND cfa.tlref_faiz IS NULL
+    """, True)
+]
+
+
+def create_synthetic_schema(cur, years, rows_per_day, null_ratio):
+    """Eski kurulumdaki indekslerle sentetik tablolar oluştur"""
+    cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+    cur.execute(f"SET search_path TO {BENCH_SCHEMA}")
+
+    cur.execute("""
+        CREATE TABLE TLREF (
+            id SERIAL PRIMARY KEY,
+            tarih DATE NOT NULL UNIQUE,
+            tlref_oran DECIMAL(10, 6) NOT NULL,
+            tlref_yuzde DECIMAL(8, 6) NOT NULL,
+            gun_adi VARCHAR(20),
+            hafta_sonu BOOLEAN DEFAULT FALSE,
+            yil INTEGER,
+            ay INTEGER,
+            gun INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("CREATE INDEX idx_TLREF_tarih ON TLREF(tarih)")
+    cur.execute("CREATE INDEX idx_TLREF_yil_ay ON TLREF(yil, ay)")
+    cur.execute("CREATE INDEX idx_TLREF_hafta_sonu ON TLREF(hafta_sonu)")
+    cur.execute("""
+        INSERT INTO TLREF (tarih, tlref_oran, tlref_yuzde, gun_adi, hafta_sonu, yil, ay, gun)
+        SELECT d::date, 10 + random() * 40, 0.1 + random() * 0.4, to_char(d, 'Day'),
+               EXTRACT(ISODOW FROM d) >= 6, EXTRACT(YEAR FROM d), EXTRACT(MONTH FROM d), EXTRACT(DAY FROM d)
+        FROM generate_series(CURRENT_DATE - %s, CURRENT_DATE - 1, interval '1 day') AS d
+    """, (years * 365,))
+
+    cur.execute("""
+        CREATE TABLE cash_flow_analysis (
+            id SERIAL PRIMARY KEY,
+            tarih DATE,
+            anapara NUMERIC,
+            basit_faiz NUMERIC,
+            faiz_kznc NUMERIC,
+            model_faiz_kznc NUMERIC,
+            model_nema_orani NUMERIC,
+            tlref_faiz NUMERIC,
+            tlref_faiz_kazanci NUMERIC
+        )
+    """)
+    # Tarih sırasıyla eklenir (gerçek yükleme düzeni); TLREF'i eksik satırlar hafta sonu ve rastgele günler
+    cur.execute("""
+        INSERT INTO cash_flow_analysis
+        (tarih, anapara, basit_faiz, faiz_kznc, model_faiz_kznc, model_nema_orani, tlref_faiz, tlref_faiz_kazanci)
+        SELECT d::date, 1000000 + k * 1000, 1, 1, 1, 0.3,
+               CASE WHEN EXTRACT(ISODOW FROM d) >= 6 OR hashint4(EXTRACT(DOY FROM d)::int) %% 100 < %s
+                    THEN NULL ELSE 0.45 END,
+               NULL
+        FROM generate_series(CURRENT_DATE - %s, CURRENT_DATE - 1, interval '1 day') AS d,
+             generate_series(1, %s) AS k
+        ORDER BY d
+    """, (int(null_ratio * 100), years * 365, rows_per_day))
+    cur.execute("ANALYZE TLREF")
+    cur.execute("ANALYZE cash_flow_analysis")
+
+
+def time_queries(conn, repeat):
+    """Her sorguyu repeat kez çalıştır; (ad -> medyan ms) döndür"""
+    timings = {}
+    cur = conn.cursor()
+    for name, sql, rollback in QUERIES:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cur.execute(sql)
+            if cur.description:
+                cur.fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+            if rollback:
+                conn.rollback()
+                cur.execute(f"SET search_path TO {BENCH_SCHEMA}")
+        conn.commit()
+        timings[name] = statistics.median(samples)
+    return timings
+
+
+def index_bytes(cur):
+    cur.execute("""
+        SELECT COALESCE(SUM(pg_relation_size(c.oid)), 0)
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s AND c.relkind = 'i'
+    """, (BENCH_SCHEMA,))
+    return cur.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=20, help="Sentetik veri uzunluğu (yıl)")
+    parser.add_argument("--rows-per-day", type=int, default=60, help="cash_flow_analysis'te günlük satır sayısı")
+    parser.add_argument("--null-ratio", type=float, default=0.03, help="İşgünlerinde TLREF'i eksik gün oranı")
+    parser.add_argument("--repeat", type=int, default=3, help="Her sorgu için tekrar sayısı")
+    parser.add_argument("--partition", action="store_true", help="cash_flow_analysis'i yıllık bölümle")
+    parser.add_argument("--keep", action="store_true", help="Sentetik şemayı silme")
+    parser.add_argument("--json", action="store_true", help="Sonuçları JSON olarak yazdır")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    try:
+        create_synthetic_schema(cur, args.years, args.rows_per_day, args.null_ratio)
+        conn.commit()
+        cur.execute(f"SET search_path TO {BENCH_SCHEMA}")
+        cur.execute("SELECT COUNT(*) FROM cash_flow_analysis")
+        rows = cur.fetchone()[0]
+        conn.commit()
+
+        before = time_queries(conn, args.repeat)
+        before_bytes = index_bytes(cur)
+
+        start = time.perf_counter()
+        for _, apply in tlref_schema.plan_migration(cur, partition=args.partition):
+            apply(cur)
+        cur.execute("ANALYZE TLREF")
+        cur.execute("ANALYZE cash_flow_analysis")
+        conn.commit()
+        migration_seconds = time.perf_counter() - start
+
+        after = time_queries(conn, args.repeat)
+        after_bytes = index_bytes(cur)
+    finally:
+        if not args.keep:
+            conn.rollback()
+            cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+            conn.commit()
+        conn.close()
+
+    results = {
+        "years": args.years,
+        "cash_flow_rows": rows,
+        "partitioned": args.partition,
+        "migration_s": migration_seconds,
+        "index_bytes": {"before": before_bytes, "after": after_bytes},
+        "queries_ms": {name: {"before": before[name], "after": after[name]} for name in before}
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"\nSentetik veri: {args.years} yıl, cash_flow_analysis {rows:,} satır"
+          f"{' (yıllık bölümlü)' if args.partition else ''}")
+    print(f"Migration süresi: {migration_seconds:.2f} sn")
+    print(f"İndeks boyutu: {before_bytes / 1024 / 1024:.1f} MB -> {after_bytes / 1024 / 1024:.1f} MB")
+    print("-" * 66)
+    print(f"{'Sorgu':28} | {'Önce (ms)':>10} | {'Sonra (ms)':>10} | {'Oran':>7}")
+    print("-" * 66)
+    for name in before:
+        ratio = before[name] / after[name] if after[name] else float("inf")
+        print(f"{name:28} | {before[name]:10.1f} | {after[name]:10.1f} | {ratio:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
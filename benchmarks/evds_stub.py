@@ -0,0 +1,123 @@
+"""EVDS JSON yapısını taklit eden yerel stub HTTP sunucusu
+
+Kullanım:
+    python benchmarks/evds_stub.py --port 8765
+    EVDS_BASE_URL=http://127.0.0.1:8765/service/evds python daily_tlref_updater.py
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_SERIES = "TP.BISTTLREF.ORAN"
+
+
+def synthetic_rate(day):
+    """Tarihe bağlı, tekrarlanabilir sentetik TLREF değeri"""
+    return round(40 + (day.toordinal() % 365) / 100.0, 4)
+
+
+class EvdsStubServer(ThreadingHTTPServer):
+    """İstek sayısını, gecikmeyi ve hata enjeksiyonunu ayarlanabilir stub sunucu"""
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), series_codes=(DEFAULT_SERIES,),
+                 latency=0.0, fail_first=0, rate_func=synthetic_rate):
+        super().__init__(address, EvdsStubHandler)
+        self.series_codes = set(series_codes)
+        self.latency = latency
+        self.fail_first = fail_first
+        self.rate_func = rate_func
+        self.request_log = []
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/service/evds"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class EvdsStubHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        # EVDS parametreleri sorgu dizesi yerine path içinde gelir: /series=..&startDate=..
+        params = dict(
+            part.split("=", 1) for part in self.path.rsplit("/", 1)[-1].split("&") if "=" in part
+        )
+        with server._lock:
+            server.request_log.append(params)
+            should_fail = len(server.request_log) <= server.fail_first
+
+        if server.latency:
+            time.sleep(server.latency)
+        if should_fail:
+            self._send_json(503, {"error": "Service Unavailable"})
+            return
+
+        series_code = params.get("series", "")
+        try:
+            start = datetime.strptime(params["startDate"], "%d-%m-%Y").date()
+            end = datetime.strptime(params["endDate"], "%d-%m-%Y").date()
+        except (KeyError, ValueError):
+            self._send_json(400, {"error": "Bad Request"})
+            return
+
+        items = []
+        if series_code in server.series_codes:
+            series_key = series_code.replace(".", "_")
+            day = start
+            while day <= end:
+                # EVDS hafta sonlarını boş değerle döndürür
+                value = str(server.rate_func(day)) if day.weekday() < 5 else None
+                items.append({
+                    "Tarih": day.strftime("%d-%m-%Y"),
+                    series_key: value,
+                    "UNIXTIME": {"$numberLong": str(int(time.mktime(day.timetuple())))}
+                })
+                day += timedelta(days=1)
+
+        self._send_json(200, {"totalCount": len(items), "items": items})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Her istek için yapay gecikme (sn)")
+    parser.add_argument("--series", action="append", help="Cevap verilecek series kodları")
+    args = parser.parse_args()
+
+    server = EvdsStubServer(("127.0.0.1", args.port), series_codes=args.series or (DEFAULT_SERIES,),
+                            latency=args.latency)
+    print(f"EVDS stub: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""cash_flow_analysis için gün/hafta/ay/çeyrek/yıl özet tablosu (Grafana cash-flow-analysis paneli)
+
+GrafanaController her panel yenilemesinde tüm tabloyu DATE_TRUNC ile gruplayıp
+AVG(COALESCE(...)) hesaplıyordu. Bu modül aynı özetleri cash_flow_rollup tablosunda
+tutar: gün kovaları tablodan, daha büyük dönemler gün kovalarının toplamlarından
+hesaplanır. TLREF sütunlarını yazan işler sadece dokundukları tarihlerin kovalarını
+yeniler; panel cash_flow_rollup_avg view'ından birkaç yüz satır okur.
+
+cash_flow_analysis üzerindeki tetikleyiciler her INSERT/UPDATE/DELETE/TRUNCATE'te
+değişen tarihleri cash_flow_rollup_bekleyen tablosuna yazar (anapara düzeltmeleri,
+silinen satırlar, başka uygulamaların yazdıkları). Her yenileme bu tarihleri de işler;
+günlük iş hiçbir şey yazmasa da kuyruğu boşaltır. Kuyrukta tarih varken panel ana
+tablodan hesaplar.
+
+Kullanım:
+    python cash_flow_rollups.py rebuild
+    python cash_flow_rollups.py check
+    python cash_flow_rollups.py refresh --start 2024-01-01 --end 2024-12-31
+    python cash_flow_rollups.py pending
+"""
+import argparse
+from datetime import date, timedelta
+
+import tlref_metrics
+from tlref_db import transaction
+
+# -------------------------------
+# AYARLAR
+# -------------------------------
+CASH_FLOW_TABLE = "cash_flow_analysis"
+ROLLUP_TABLE = "cash_flow_rollup"
+GRAFANA_VIEW = f"{ROLLUP_TABLE}_avg"
+PENDING_TABLE = f"{ROLLUP_TABLE}_bekleyen"  # Tetikleyicilerin kaydettiği, kovası yenilenmemiş tarihler
+CHANGE_FUNCTION = f"{ROLLUP_TABLE}_degisiklik"
+PERIODS = ("day", "week", "month", "quarter", "year")  # DATE_TRUNC birimleri; ilki temel kova
+CHECK_TOLERANCE = 1e-9  # check'te ortalamalar için kabul edilen göreli fark
+
+# Özet sütunu -> cash_flow_analysis sütunu; panel AVG(COALESCE(x, 0)) = toplam / kayıt sayısı okur
+SUM_COLUMNS = {
+    "toplam_anapara": "anapara",
+    "toplam_basit_faiz": "basit_faiz",
+    "toplam_faiz_kznc": "faiz_kznc",
+    "toplam_model_faiz_kznc": "model_faiz_kznc",
+    "toplam_tlref_faiz_kazanci": "tlref_faiz_kazanci",
+    "toplam_model_nema_orani": "model_nema_orani",
+    "toplam_tlref_faiz": "tlref_faiz"
+}
+
+# Panelin filtresiyle aynı
+BASE_FILTER = "tarih IS NOT NULL AND anapara > 0"
+
+# Grafana'nın beklediği sütun adları (GrafanaController.GetCashFlowAnalysis)
+GRAFANA_COLUMNS = [
+    ("total_anapara", "toplam_anapara"),
+    ("total_basit_faiz", "toplam_basit_faiz"),
+    ("total_faiz_kazanci", "toplam_faiz_kznc"),
+    ("total_model_faiz_kazanci", "toplam_model_faiz_kznc"),
+    ("total_tlref_kazanci", "toplam_tlref_faiz_kazanci"),
+    ("avg_model_nema_orani", "toplam_model_nema_orani"),
+    ("avg_tlref_faiz", "toplam_tlref_faiz"),
+    ("avg_basit_faiz", "toplam_basit_faiz")
+]
+
+
+# (tetikleyici adı, olay, transition tabloları); transition tablolu tetikleyici tek olaylı olmalı
+CHANGE_TRIGGERS = [
+    (f"{CHANGE_FUNCTION}_ekle", "INSERT", "REFERENCING NEW TABLE AS yeni"),
+    (f"{CHANGE_FUNCTION}_guncelle", "UPDATE", "REFERENCING OLD TABLE AS eski NEW TABLE AS yeni"),
+    (f"{CHANGE_FUNCTION}_sil", "DELETE", "REFERENCING OLD TABLE AS eski"),
+    (f"{CHANGE_FUNCTION}_bosalt", "TRUNCATE", "")
+]
+
+# Satır başına değil ifade başına çalışır; değişen tarihler transition tablolarından bir kez okunur
+CHANGE_FUNCTION_SQL = f"""
+    CREATE OR REPLACE FUNCTION {CHANGE_FUNCTION}() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'TRUNCATE' THEN
+            INSERT INTO {PENDING_TABLE} (tarih)
+            SELECT donem FROM {ROLLUP_TABLE} WHERE periyot = 'day'
+            ON CONFLICT DO NOTHING;
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO {PENDING_TABLE} (tarih)
+            SELECT DISTINCT tarih FROM yeni WHERE tarih IS NOT NULL
+            ON CONFLICT DO NOTHING;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            INSERT INTO {PENDING_TABLE} (tarih)
+            SELECT DISTINCT tarih FROM eski WHERE tarih IS NOT NULL
+            ON CONFLICT DO NOTHING;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+"""
+
+
+def rollup_exists(cur):
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (ROLLUP_TABLE,))
+    return cur.fetchone()[0]
+
+
+def create_rollup_table(cur):
+    """Özet tablosunu ve panelin okuyacağı ortalama view'ını oluştur"""
+    sum_columns = ",\n".join(f"            {name} NUMERIC NOT NULL" for name in SUM_COLUMNS)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+            periyot VARCHAR(8) NOT NULL,
+            donem DATE NOT NULL,
+            kayit_sayisi BIGINT NOT NULL,
+{sum_columns},
+            PRIMARY KEY (periyot, donem)
+        )
+    """)
+
+    # DATE_TRUNC(periyot, tarih) timestamptz döndürür; panel aynı tipi görsün diye donem dönüştürülür
+    averages = ",\n".join(f"            ({column} / kayit_sayisi)::float8 AS {alias}"
+                          for alias, column in GRAFANA_COLUMNS)
+    cur.execute(f"""
+        CREATE OR REPLACE VIEW {GRAFANA_VIEW} AS
+        SELECT
+            periyot,
+            donem::timestamptz AS period_date,
+{averages},
+            kayit_sayisi AS record_count,
+            0.0 AS total_model_faiz,
+            0.0 AS total_tlref_faiz
+        FROM {ROLLUP_TABLE}
+    """)
+    create_change_capture(cur)
+
+
+def change_capture_exists(cur):
+    cur.execute("""
+        SELECT COUNT(*) FROM pg_trigger
+        WHERE tgrelid = to_regclass(%s) AND tgname = ANY(%s)
+    """, (CASH_FLOW_TABLE, [name for name, _, _ in CHANGE_TRIGGERS]))
+    return cur.fetchone()[0] == len(CHANGE_TRIGGERS)
+
+
+def create_change_capture(cur):
+    """Değişen tarihleri kuyruğa yazan tetikleyicileri (yeniden) kur
+
+    cash_flow_analysis yeniden oluşturulduğunda (ör. bölümlere dönüştürme) tekrar çağrılmalıdır.
+    """
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {PENDING_TABLE} (tarih DATE PRIMARY KEY)")
+    cur.execute(CHANGE_FUNCTION_SQL)
+    for name, event, referencing in CHANGE_TRIGGERS:
+        cur.execute(f"DROP TRIGGER IF EXISTS {name} ON {CASH_FLOW_TABLE}")
+        cur.execute(f"""
+            CREATE TRIGGER {name} AFTER {event} ON {CASH_FLOW_TABLE}
+            {referencing} FOR EACH STATEMENT EXECUTE FUNCTION {CHANGE_FUNCTION}()
+        """)
+
+
+def drain_pending(cur):
+    """Kuyruktaki tarihleri al ve sil; kuyruk tablosu yoksa boş liste"""
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (PENDING_TABLE,))
+    if not cur.fetchone()[0]:
+        return []
+    cur.execute(f"DELETE FROM {PENDING_TABLE} RETURNING tarih")
+    return [row[0] for row in cur.fetchall()]
+
+
+def _day_select(where):
+    sums = ", ".join(f"SUM(COALESCE({column}, 0))" for column in SUM_COLUMNS.values())
+    return f"""
+        SELECT 'day', tarih, COUNT(*), {sums}
+        FROM {CASH_FLOW_TABLE}
+        WHERE {BASE_FILTER} AND {where}
+        GROUP BY tarih
+    """
+
+
+def _period_select(where):
+    """Gün kovalarından bir dönemin kovalarını topla (%(periyot)s parametresi)"""
+    sums = ", ".join(f"SUM({name})" for name in SUM_COLUMNS)
+    return f"""
+        SELECT %(periyot)s, DATE_TRUNC(%(periyot)s, donem)::date, SUM(kayit_sayisi), {sums}
+        FROM {ROLLUP_TABLE}
+        WHERE periyot = 'day' AND {where}
+        GROUP BY DATE_TRUNC(%(periyot)s, donem)::date
+    """
+
+
+@tlref_metrics.stage("cash_flow_rollup_rebuild")
+def rebuild_rollups(cur):
+    """Tüm kovaları baştan hesapla; {periyot: kova sayısı} döndür"""
+    counts = {}
+    drain_pending(cur)
+    cur.execute(f"DELETE FROM {ROLLUP_TABLE}")
+    cur.execute(f"INSERT INTO {ROLLUP_TABLE} {_day_select('TRUE')}")
+    counts["day"] = cur.rowcount
+    for period in PERIODS[1:]:
+        cur.execute(f"INSERT INTO {ROLLUP_TABLE} {_period_select('TRUE')}", {"periyot": period})
+        counts[period] = cur.rowcount
+    return counts
+
+
+@tlref_metrics.stage("cash_flow_rollup_refresh")
+def refresh_rollups(cur, dates):
+    """Verilen ve kuyruktaki tarihlerin düştüğü gün/hafta/ay/çeyrek/yıl kovalarını yeniden hesapla
+
+    Özet tablosu henüz kurulmamışsa hiçbir şey yapmaz; yenilenen gün sayısını döndürür.
+    """
+    if not rollup_exists(cur):
+        return 0
+    dates = sorted({d for d in dates if d is not None} | set(drain_pending(cur)))
+    if not dates:
+        return 0
+
+    params = {"tarihler": dates}
+    cur.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE periyot = 'day' AND donem = ANY(%(tarihler)s::date[])",
+                params)
+    cur.execute(f"INSERT INTO {ROLLUP_TABLE} {_day_select('tarih = ANY(%(tarihler)s::date[])')}", params)
+
+    for period in PERIODS[1:]:
+        params = {"periyot": period, "tarihler": dates, "ilk": dates[0]}
+        touched = "DATE_TRUNC(%(periyot)s, donem)::date IN " \
+                  "(SELECT DATE_TRUNC(%(periyot)s, d)::date FROM unnest(%(tarihler)s::date[]) AS d)"
+        cur.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE periyot = %(periyot)s AND {touched}", params)
+        # Kovanın başı ilk tarihten en fazla bir yıl önce olabilir; gün kovası taraması buna daraltılır
+        window = f"donem > %(ilk)s::date - 366 AND {touched}"
+        cur.execute(f"INSERT INTO {ROLLUP_TABLE} {_period_select(window)}", params)
+    return len(dates)
+
+
+def check_rollups(cur):
+    """Özetleri panelin sorgusuyla tablodan baştan hesaplananla karşılaştır; {periyot: [uyuşmayan kovalar]}"""
+    averages = ", ".join(f"AVG(COALESCE({column}, 0))::float8 AS {alias}"
+                         for alias, column in ((a, SUM_COLUMNS[c]) for a, c in GRAFANA_COLUMNS))
+    differs = " OR ".join(
+        f"abs(r.{alias} - e.{alias}) > %(tolerans)s * GREATEST(abs(e.{alias}), 1)"
+        for alias, _ in GRAFANA_COLUMNS
+    )
+    mismatches = {}
+    for period in PERIODS:
+        cur.execute(f"""
+            WITH expected AS (
+                SELECT DATE_TRUNC(%(periyot)s, tarih)::timestamptz AS period_date,
+                       COUNT(*) AS record_count, {averages}
+                FROM {CASH_FLOW_TABLE}
+                WHERE {BASE_FILTER}
+                GROUP BY DATE_TRUNC(%(periyot)s, tarih)
+            ),
+            stored AS (
+                SELECT * FROM {GRAFANA_VIEW} WHERE periyot = %(periyot)s
+            )
+            SELECT COALESCE(r.period_date, e.period_date)::date
+            FROM stored r
+            FULL OUTER JOIN expected e ON r.period_date = e.period_date
+            WHERE r.period_date IS NULL OR e.period_date IS NULL
+               OR r.record_count <> e.record_count
+               OR {differs}
+            ORDER BY 1
+        """, {"periyot": period, "tolerans": CHECK_TOLERANCE})
+        mismatches[period] = [row[0] for row in cur.fetchall()]
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("rebuild", help="Özet tablosunu oluştur ve baştan hesapla")
+    sub.add_parser("check", help="Özetleri tablodan baştan hesaplananla karşılaştır")
+
+    refresh_parser = sub.add_parser("refresh", help="Tarih aralığının kovalarını yeniden hesapla")
+    refresh_parser.add_argument("--start", type=date.fromisoformat, required=True)
+    refresh_parser.add_argument("--end", type=date.fromisoformat, default=date.today())
+
+    sub.add_parser("pending", help="Tetikleyicilerin kaydettiği tarihlerin kovalarını yenile")
+
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        with transaction() as cur:
+            create_rollup_table(cur)
+            counts = rebuild_rollups(cur)
+        print(f"✓ {ROLLUP_TABLE} yeniden hesaplandı: "
+              + ", ".join(f"{period} {count}" for period, count in counts.items()))
+
+    elif args.command == "check":
+        with transaction() as cur:
+            mismatches = check_rollups(cur)
+        for period, buckets in mismatches.items():
+            if buckets:
+                sample = ", ".join(str(d) for d in buckets[:10])
+                print(f"✗ {ROLLUP_TABLE} [{period}]: {len(buckets)} kova uyuşmuyor ({sample})")
+            else:
+                print(f"✓ {ROLLUP_TABLE} [{period}]: tabloyla tutarlı")
+        if any(mismatches.values()):
+            raise SystemExit(1)
+
+    elif args.command == "refresh":
+        days = [args.start + timedelta(days=i) for i in range((args.end - args.start).days + 1)]
+        with transaction() as cur:
+            count = refresh_rollups(cur, days)
+        print(f"✓ {count} günün kovaları (ve üst dönemleri) yeniden hesaplandı")
+
+    elif args.command == "pending":
+        with transaction() as cur:
+            count = refresh_rollups(cur, [])
+        print(f"✓ Kuyruktaki {count} günün kovaları yeniden hesaplandı")
+
+
+if __name__ == "__main__":
+    main()
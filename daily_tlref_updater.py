@@ -1,129 +1,251 @@
-import pandas as pd
-import psycopg2
-import requests
 from datetime import datetime, timedelta
-import schedule
-import time
 import os
 import logging
 
+# Günlük yol çoğu gün sadece birkaç sorgu çalıştırır; requests/numpy (evds_client,
+# tlref_series, tlref_index) ve psycopg2.extras sadece eksik gün bulunduğunda kullanıldıkları
+# fonksiyonların içinde yüklenir. pandas bu modülde hiç kullanılmaz.
+import tlref_cli
+import tlref_metrics
+from cash_flow_rollups import refresh_rollups as refresh_cash_flow_rollups
+from tlref_calendar import load_calendar
+from tlref_db import transaction
+from tlref_rollups import refresh_rollups
+
 # -------------------------------
 # AYARLAR
 # -------------------------------
-DB_CONFIG = {
-    "host":"192.168.182.3","dbname":"tmks-ftp","user":"postgres","password":"postgres.db!"
-}
 TABLE_NAME = "TLREF"
-API_KEY = "xuG8dyK7UA"  # EVDS API anahtarı
+LOOKBACK_DAYS = int(os.environ.get("TLREF_LOOKBACK_DAYS", 10))  # Günlük kontrolün geriye bakacağı gün sayısı
+CARRY_FORWARD_DAYS = 7  # API'de olmayan gün için en fazla kaç gün önceki değer taşınsın
+FETCH_MODE = "auto"  # "range": tek istek, "concurrent": parçalı eşzamanlı, "auto": pencere büyükse eşzamanlı
+PIPELINE_MODE = "batch"  # "batch": toplu çek + tek işlemde yaz, "per_date": eski tarih tarih yol
+SKIP_NON_BUSINESS_DAYS = True  # Hafta sonu/tatil günleri API'ye sorulmadan önceki işgününden taşınır
+CASH_FLOW_TABLE = "cash_flow_analysis"
+CASH_FLOW_MODE = "changes"  # "changes": boş satırlar + yüksek su işaretinden sonra değişen TLREF günleri, "null": sadece boş satırlar, "full": tüm satırlar
+PROPAGATION_STATE_TABLE = "tlref_propagation_state"  # cash_flow_analysis'e aktarılan son TLREF.updated_at
+REQUIRED_COLUMNS = ("kumulatif_endeks", "kumulatif_toplam", "tasinan")  # migrate ile eklenen, yazıcıların kullandığı sütunlar
+PROPAGATION_OVERLAP_MINUTES = 10  # Geç commit edilen işlemler kaçmasın diye yüksek su işaretinden bu kadar geri bakılır
+
+# Türkçe gün adları
+GUN_ADI_TR = {
+    'Monday': 'Pazartesi',
+    'Tuesday': 'Salı', 
+    'Wednesday': 'Çarşamba',
+    'Thursday': 'Perşembe',
+    'Friday': 'Cuma',
+    'Saturday': 'Cumartesi',
+    'Sunday': 'Pazar'
+}
+
+# Taşınmış değer gerçek değerin üzerine yazılmaz; değişmeyen satırın updated_at'i de ilerletilmez,
+# böylece updated_at sadece gerçekten değişen günleri gösterir
+UPSERT_CONFLICT_SQL = f"""
+    ON CONFLICT (tarih) DO UPDATE SET
+        tlref_oran = EXCLUDED.tlref_oran,
+        tlref_yuzde = EXCLUDED.tlref_yuzde,
+        gun_adi = EXCLUDED.gun_adi,
+        hafta_sonu = EXCLUDED.hafta_sonu,
+        tasinan = EXCLUDED.tasinan,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE (NOT EXCLUDED.tasinan OR {TABLE_NAME}.tasinan)
+      AND ({TABLE_NAME}.tlref_oran, {TABLE_NAME}.tasinan) IS DISTINCT FROM (EXCLUDED.tlref_oran, EXCLUDED.tasinan)
+"""
 
 # Log ayarları
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def check_missing_dates():
-    """Son 10 gün içinde eksik olan tarihleri kontrol et"""
+@tlref_metrics.stage("gap_detection")
+def ensure_tlref_columns():
+    """migrate çalıştırılmamış kurulumda eksik TLREF sütunlarını ekle
+
+    Sütunlar eksikse eksik tarih sorgusu ve upsert hata verir; hata yutulduğunda iş
+    "Tüm tarihler güncel" diyerek başarılı biterdi. Sütunlar tamamsa sadece katalog okunur.
+    """
+    with transaction() as cur:
+        cur.execute("""
+            SELECT COUNT(*) FROM pg_attribute
+            WHERE attrelid = to_regclass(%s) AND attname = ANY(%s) AND NOT attisdropped
+        """, (TABLE_NAME.lower(), list(REQUIRED_COLUMNS)))
+        if cur.fetchone()[0] == len(REQUIRED_COLUMNS):
+            return []
+        
+        import tlref_schema
+        added = tlref_schema.ensure_tlref_columns(cur)
+    
+    if added:
+        logger.warning(f"⚠ {TABLE_NAME} tablosuna eksik sütunlar eklendi ({', '.join(added)}); "
+                       f"kalan adımlar için python tlref_schema.py migrate çalıştırın")
+    return added
+
+def check_missing_dates(start_date=None, end_date=None, lookback_days=None, raise_errors=False):
+    """Son LOOKBACK_DAYS gün (veya verilen aralık) içinde eksik olan tarihleri kontrol et
+
+    İşgününe düşen taşınmış (tasinan) satırlar da eksik sayılır; API'de gerçek değer
+    yayımlandıysa yer tutucunun yerine yazılır. Hafta sonu ve tatillerdeki taşınmış satırlar tamdır.
+    """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        # Son 10 günün tarihlerini kontrol et
-        end_date = datetime.today().date()
-        start_date = end_date - timedelta(days=10)
-        
-        # Bu aralıkta eksik olan tarihleri bul
-        cur.execute(f"""
-            SELECT generate_series(%s::date, %s::date, '1 day'::interval)::date as tarih
-            EXCEPT
-            SELECT tarih FROM {TABLE_NAME}
-            WHERE tarih BETWEEN %s AND %s
-            ORDER BY tarih
-        """, (start_date, end_date, start_date, end_date))
-        
-        missing_dates = [row[0] for row in cur.fetchall()]
-        
-        cur.close()
-        conn.close()
+        # Varsayılan olarak son LOOKBACK_DAYS günün tarihlerini kontrol et
+        end_date = end_date or datetime.today().date()
+        start_date = start_date or end_date - timedelta(days=lookback_days or LOOKBACK_DAYS)
+        
+        with transaction() as cur:
+            closed_days = []
+            if SKIP_NON_BUSINESS_DAYS:
+                closed_days = load_calendar(start_date, end_date, cur).non_business_days(
+                    start_date, end_date, certain=True)
+            
+            # Bu aralıkta eksik olan (veya işgünü yer tutucusu olan) tarihleri bul
+            cur.execute(f"""
+                SELECT generate_series(%s::date, %s::date, '1 day'::interval)::date as tarih
+                EXCEPT
+                SELECT tarih FROM {TABLE_NAME}
+                WHERE tarih BETWEEN %s AND %s
+                  AND (NOT tasinan OR hafta_sonu OR tarih = ANY(%s::date[]))
+                ORDER BY tarih
+            """, (start_date, end_date, start_date, end_date, closed_days))
+            
+            missing_dates = [row[0] for row in cur.fetchall()]
         
-        logger.info(f"Son 10 günde {len(missing_dates)} eksik tarih bulundu")
+        logger.info(f"{start_date} - {end_date} aralığında {len(missing_dates)} eksik tarih bulundu")
         return missing_dates
         
     except Exception as e:
         logger.error(f"Eksik tarih kontrolü hatası: {e}")
+        if raise_errors:
+            raise
         return []
 
-def get_tlref_from_api(date_val):
-    """EVDS API'sinden belirli tarih için TLREF değeri al"""
+@tlref_metrics.stage("gap_detection")
+def find_gap_ranges(start_date=None, end_date=None, raise_errors=False):
+    """Tablonun tüm aralığında (veya verilen aralıkta) ardışık eksik gün aralıklarını bul"""
     try:
-        date_str = date_val.strftime("%d-%m-%Y")
+        with transaction() as cur:
+            # Tarih indeksi sırasıyla okunur; LEAD ile ardışık iki kayıt arasındaki boşluk bulunur.
+            # Aralık sınırlarına eklenen nöbetçi günler baştaki ve sondaki boşlukları da yakalar.
+            cur.execute(f"""
+                WITH bounds AS (
+                    SELECT COALESCE(%s::date, MIN(tarih)) AS bas,
+                           COALESCE(%s::date, CURRENT_DATE) AS son
+                    FROM {TABLE_NAME}
+                ),
+                days AS (
+                    SELECT t.tarih FROM {TABLE_NAME} t, bounds b
+                    WHERE t.tarih BETWEEN b.bas AND b.son
+                    UNION ALL SELECT bas - 1 FROM bounds
+                    UNION ALL SELECT son + 1 FROM bounds
+                ),
+                ordered AS (
+                    SELECT tarih, LEAD(tarih) OVER (ORDER BY tarih) AS sonraki
+                    FROM days
+                )
+                SELECT tarih + 1 AS bosluk_bas, sonraki - 1 AS bosluk_son
+                FROM ordered
+                WHERE sonraki - tarih > 1
+                ORDER BY tarih
+            """, (start_date, end_date))
+            
+            gap_ranges = [(bas, son) for bas, son in cur.fetchall() if bas is not None]
         
-        # Birkaç farklı series kodunu dene
-        series_codes = [
-            "TP.BISTTLREF.ORAN",
-            "TP.TLREF.AO",
-            "TP.BIST.TLREF"
-        ]
+        total_days = sum((son - bas).days + 1 for bas, son in gap_ranges)
+        logger.info(f"{len(gap_ranges)} boşluk aralığında toplam {total_days} eksik tarih bulundu")
+        return gap_ranges
         
-        for series_code in series_codes:
-            url = f"https://evds2.tcmb.gov.tr/service/evds/series={series_code}&startDate={date_str}&endDate={date_str}&type=json"
-            headers = {"key": API_KEY}
-            
-            try:
-                response = requests.get(url, headers=headers, timeout=30)
-                
-                if response.status_code == 200:
-                    json_data = response.json()
-                    
-                    if "items" in json_data and len(json_data["items"]) > 0:
-                        item = json_data["items"][0]
-                        series_key = series_code.replace(".", "_")
-                        
-                        if series_key in item and item[series_key]:
-                            value = item[series_key]
-                            
-                            if isinstance(value, (int, float)):
-                                tlref_value = float(value)
-                                logger.info(f"API'den {date_str} için TLREF alındı: {tlref_value}")
-                                return tlref_value
-                
-            except Exception as e:
-                logger.warning(f"{series_code} ile {date_str} alınamadı: {e}")
-                continue
+    except Exception as e:
+        logger.error(f"Boşluk taraması hatası: {e}")
+        if raise_errors:
+            raise
+        return []
+
+def dates_to_ranges(dates):
+    """Sıralı tarih listesini ardışık (başlangıç, bitiş) aralıklarına çevir"""
+    ranges = []
+    for date_val in sorted(dates):
+        if ranges and date_val - ranges[-1][1] == timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], date_val)
+        else:
+            ranges.append((date_val, date_val))
+    return ranges
+
+def expand_ranges(ranges):
+    """(başlangıç, bitiş) aralıklarını gün listesine aç"""
+    return [bas + timedelta(days=i) for bas, son in ranges for i in range((son - bas).days + 1)]
+
+def get_tlref_from_api(date_val):
+    """EVDS API'sinden belirli tarih için TLREF değeri al"""
+    from evds_client import get_client
+    
+    try:
+        tlref_value = get_client().fetch_range(date_val, date_val).get(date_val)
         
-        logger.warning(f"API'den {date_str} için TLREF alınamadı")
-        return None
+        if tlref_value is None:
+            logger.warning(f"API'den {date_val.strftime('%d-%m-%Y')} için TLREF alınamadı")
+        return tlref_value
         
     except Exception as e:
         logger.error(f"API TLREF alma hatası: {e}")
         return None
 
-def get_previous_tlref(target_date):
-    """Önceki işgününün TLREF değerini al"""
+def get_tlref_range_from_api(missing_dates):
+    """Eksik tarihlerin tamamını kapsayan pencereyi tek istekle al, {tarih: değer} döndür"""
+    from evds_client import get_client
+    
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        # Önceki 7 gün içinde en son TLREF değerini bul
-        search_date = target_date - timedelta(days=1)
+        return get_client().fetch_dates(missing_dates)
+    except Exception as e:
+        logger.error(f"API TLREF aralık alma hatası: {e}")
+        return {}
+
+def carry_forward(series, date_val, calendar=None):
+    """date_val için taşınacak (kaynak tarih, değer)
+
+    Takvim verilirse hafta sonu/tatil günleri doğrudan önceki işgününden taşınır; uzun
+    bayram tatillerinde de CARRY_FORWARD_DAYS sınırı o işgününden itibaren sayılır.
+    """
+    if calendar is not None and not calendar.is_business_day(date_val):
+        source_date = calendar.previous_business_day(date_val)
+        if source_date is not None:
+            return series.asof(source_date, CARRY_FORWARD_DAYS)
+    return series.asof(date_val, CARRY_FORWARD_DAYS, strict=True)
+
+def split_business_days(missing_dates):
+    """Eksik tarihleri (işgünleri, tatil/hafta sonu günleri) olarak ayır; takvimi de döndür
+
+    Tahmini bayramların kenar günleri işgünü tarafına düşer ve API'ye sorulur.
+    """
+    if not SKIP_NON_BUSINESS_DAYS or not missing_dates:
+        return list(missing_dates), [], None
+    
+    calendar = load_calendar(min(missing_dates), max(missing_dates))
+    business_days = [d for d in missing_dates if calendar.may_be_business_day(d)]
+    closed_days = [d for d in missing_dates if not calendar.may_be_business_day(d)]
+    if closed_days:
+        logger.info(f"{len(closed_days)} hafta sonu/tatil günü API'ye sorulmadan önceki işgününden taşınacak")
+    return business_days, closed_days, calendar
+
+def get_previous_tlref(target_date, series=None, calendar=None):
+    """Önceki işgününün TLREF değerini al (series verilirse veritabanına gitmeden)"""
+    try:
+        if series is not None:
+            search_date, tlref_oran = carry_forward(series, target_date, calendar)
+        else:
+            # Önceki 7 gün içinde en son TLREF değerini tek sorguda bul
+            with transaction() as cur:
+                cur.execute(f"""
+                    SELECT tarih, tlref_oran
+                    FROM {TABLE_NAME} 
+                    WHERE tarih < %s AND tarih >= %s
+                    ORDER BY tarih DESC
+                    LIMIT 1
+                """, (target_date, target_date - timedelta(days=CARRY_FORWARD_DAYS)))
+                
+                search_date, tlref_oran = cur.fetchone() or (None, None)
         
-        for i in range(7):
-            cur.execute(f"""
-                SELECT tlref_oran, tlref_yuzde 
-                FROM {TABLE_NAME} 
-                WHERE tarih = %s
-            """, (search_date,))
-            
-            result = cur.fetchone()
-            if result:
-                tlref_oran, tlref_yuzde = result
-                cur.close()
-                conn.close()
-                logger.info(f"Önceki TLREF ({search_date}): {float(tlref_oran)}")
-                return float(tlref_oran)
-            
-            search_date = search_date - timedelta(days=1)
+        if tlref_oran is not None:
+            logger.info(f"Önceki TLREF ({search_date}): {float(tlref_oran)}")
+            return float(tlref_oran)
         
-        cur.close()
-        conn.close()
         logger.warning(f"Önceki TLREF değeri bulunamadı")
         return None
         
@@ -131,51 +253,33 @@ def get_previous_tlref(target_date):
         logger.error(f"Önceki TLREF alma hatası: {e}")
         return None
 
+def build_tlref_row(date_val, tlref_oran, carried=False):
+    """TLREF tablosu için (tarih, oran, yüzde, gün adı, hafta sonu, yıl, ay, gün, taşınan) satırı oluştur"""
+    gun_adi = date_val.strftime('%A')
+    return (
+        date_val,
+        tlref_oran,
+        tlref_oran / 100.0,
+        GUN_ADI_TR.get(gun_adi, gun_adi),
+        date_val.weekday() >= 5,
+        date_val.year,
+        date_val.month,
+        date_val.day,
+        carried
+    )
+
+@tlref_metrics.stage("db_upsert")
 def insert_tlref_record(date_val, tlref_oran, source="API"):
     """TLREF kaydını tabloya ekle"""
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        tlref_yuzde = tlref_oran / 100.0
-        gun_adi = date_val.strftime('%A')
-        hafta_sonu = date_val.weekday() >= 5
-        
-        # Türkçe gün adları
-        gun_adi_tr = {
-            'Monday': 'Pazartesi',
-            'Tuesday': 'Salı', 
-            'Wednesday': 'Çarşamba',
-            'Thursday': 'Perşembe',
-            'Friday': 'Cuma',
-            'Saturday': 'Cumartesi',
-            'Sunday': 'Pazar'
-        }.get(gun_adi, gun_adi)
-        
-        cur.execute(f"""
-            INSERT INTO {TABLE_NAME} 
-            (tarih, tlref_oran, tlref_yuzde, gun_adi, hafta_sonu, yil, ay, gun)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (tarih) DO UPDATE SET
-                tlref_oran = EXCLUDED.tlref_oran,
-                tlref_yuzde = EXCLUDED.tlref_yuzde,
-                gun_adi = EXCLUDED.gun_adi,
-                hafta_sonu = EXCLUDED.hafta_sonu,
-                updated_at = CURRENT_TIMESTAMP
-        """, (
-            date_val,
-            tlref_oran,
-            tlref_yuzde,
-            gun_adi_tr,
-            hafta_sonu,
-            date_val.year,
-            date_val.month,
-            date_val.day
-        ))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        with transaction() as cur:
+            cur.execute(f"""
+                INSERT INTO {TABLE_NAME} 
+                (tarih, tlref_oran, tlref_yuzde, gun_adi, hafta_sonu, yil, ay, gun, tasinan)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                {UPSERT_CONFLICT_SQL}
+            """, build_tlref_row(date_val, tlref_oran, carried=(source != "API")))
+        tlref_metrics.count("tlref_rows_total", op="tlref_upsert")
         
         logger.info(f"✓ {date_val} TLREF kaydedildi: {tlref_oran:.4f}% ({source})")
         return True
@@ -184,118 +288,347 @@ def insert_tlref_record(date_val, tlref_oran, source="API"):
         logger.error(f"TLREF kaydetme hatası: {e}")
         return False
 
-def daily_tlref_update():
-    """Günlük TLREF güncelleme işlemi"""
+@tlref_metrics.stage("db_upsert")
+def upsert_tlref_rows(cur, records):
+    """(tarih, değer, kaynak) kayıtlarını tek çok satırlı upsert ile yaz"""
+    from psycopg2.extras import execute_values
+    
+    execute_values(cur, f"""
+        INSERT INTO {TABLE_NAME} 
+        (tarih, tlref_oran, tlref_yuzde, gun_adi, hafta_sonu, yil, ay, gun, tasinan)
+        VALUES %s
+        {UPSERT_CONFLICT_SQL}
+    """, [build_tlref_row(date_val, tlref_oran, carried=(source != "API"))
+          for date_val, tlref_oran, source in records],
+        page_size=1000)
+    tlref_metrics.count("tlref_rows_total", len(records), op="tlref_upsert")
+
+def load_tlref_windows(cur, gap_ranges, lookback_days=CARRY_FORWARD_DAYS):
+    """Her boşluk aralığı ve öncesindeki lookback_days gün için mevcut TLREF değerlerini tek sorguda getir"""
+    cur.execute(f"""
+        SELECT DISTINCT t.tarih, t.tlref_oran
+        FROM {TABLE_NAME} t
+        JOIN unnest(%s::date[], %s::date[]) AS r(bas, son)
+          ON t.tarih BETWEEN r.bas - %s AND r.son
+    """, ([bas for bas, _ in gap_ranges], [son for _, son in gap_ranges], lookback_days))
+    return {tarih: float(tlref_oran) for tarih, tlref_oran in cur.fetchall()}
+
+def resolve_missing_values(missing_dates, api_values, known_values, calendar=None):
+    """Eksik tarihlere API değerini, yoksa önceki işgününün (son 7 gün içindeki) değerini bellekte ata"""
+    from tlref_series import TlrefSeries
+    
+    series = TlrefSeries(list(known_values), list(known_values.values()))
+    for date_val, value in api_values.items():
+        series.set(date_val, value)
+    
+    records = []
+    for date_val in sorted(missing_dates):
+        if date_val in api_values:
+            records.append((date_val, api_values[date_val], "API"))
+            continue
+        
+        # Taşınan değer de sonraki eksik günler için kaynak olur
+        _, prev_value = carry_forward(series, date_val, calendar)
+        if prev_value is not None:
+            series.set(date_val, prev_value)
+            records.append((date_val, prev_value, "Önceki Gün"))
+        else:
+            logger.warning(f"⚠ {date_val} için TLREF değeri bulunamadı")
+    return records
+
+def merge_fetch_windows(gap_ranges, max_join_gap=CARRY_FORWARD_DAYS):
+    """Birbirine yakın boşluk aralıklarını tek API penceresinde birleştir"""
+    windows = []
+    for bas, son in sorted(gap_ranges):
+        if windows and (bas - windows[-1][1]).days <= max_join_gap:
+            windows[-1] = (windows[-1][0], max(son, windows[-1][1]))
+        else:
+            windows.append((bas, son))
+    return windows
+
+def fetch_missing_values(missing_dates, fetch_mode=FETCH_MODE):
+    """Eksik tarihlerin API değerlerini aralık bazında tek istekle ya da parçalı/eşzamanlı olarak al"""
+    from evds_client import CHUNK_DAYS, get_client
+    
+    windows = merge_fetch_windows(dates_to_ranges(missing_dates))
+    longest = max((son - bas).days + 1 for bas, son in windows)
+    missing_set = set(missing_dates)
+    
+    if fetch_mode == "concurrent" or (fetch_mode == "auto" and (longest > CHUNK_DAYS or len(windows) > 1)):
+        try:
+            api_values, chunk_stats = get_client().fetch_windows(windows)
+        except Exception as e:
+            logger.error(f"API TLREF eşzamanlı alma hatası: {e}")
+            return {}
+        return {d: v for d, v in api_values.items() if d in missing_set}
+    
+    return get_tlref_range_from_api(missing_dates)
+
+def run_batch_pipeline(missing_dates, fetch_mode=FETCH_MODE, with_cash_flow=True):
+    """Eksik tarihleri toplu çek, taşımaları bellekte hesapla ve tek işlemde yaz"""
+    gap_ranges = dates_to_ranges(missing_dates)
+    
+    # 1. Eksik işgünleri için API değerleri; sadece tatil/hafta sonu eksikse ağa hiç gidilmez
+    business_days, _, calendar = split_business_days(missing_dates)
+    api_values = fetch_missing_values(business_days, fetch_mode) if business_days else {}
+    
+    # 2-4. Önceki 7 günü tek sorguda oku, taşımaları hesapla, tek upsert + cash flow
+    # Hepsi aynı işlemde olduğundan Grafana yarım güncellenmiş durumu görmez
+    with transaction() as cur:
+        known_values = load_tlref_windows(cur, gap_ranges)
+        records = resolve_missing_values(missing_dates, api_values, known_values, calendar)
+        
+        if records:
+            from tlref_index import refresh_index
+            
+            upsert_tlref_rows(cur, records)
+            refresh_rollups(cur, [date_val for date_val, _, _ in records])
+            refresh_index(cur, [date_val for date_val, _, _ in records])
+        cash_flow_rows = apply_cash_flow_tlref(cur) if with_cash_flow else 0
+    
+    for date_val, tlref_oran, source in records:
+        logger.info(f"✓ {date_val} TLREF kaydedildi: {tlref_oran:.4f}% ({source})")
+    if cash_flow_rows > 0:
+        logger.info(f"cash_flow_analysis tablosunda {cash_flow_rows} kayıt güncellendi")
+    
+    return len(records)
+
+def daily_tlref_update(fetch_mode=FETCH_MODE, start_date=None, end_date=None, pipeline=PIPELINE_MODE,
+                       full_scan=False, raise_errors=False):
+    """Günlük TLREF güncelleme işlemi (aralık verilirse geriye dönük, full_scan ile tüm geçmiş)
+
+    raise_errors ile hatalar loglanıp yutulmak yerine çağırana iletilir (zamanlayıcı aşamaları için).
+    """
     logger.info("=== Günlük TLREF Güncelleme Başladı ===")
     
-    # 1. Eksik tarihleri kontrol et
-    missing_dates = check_missing_dates()
+    try:
+        ensure_tlref_columns()
+    except Exception as e:
+        logger.error(f"TLREF şema kontrolü hatası: {e}")
+        if raise_errors:
+            raise
+        return 0
+    
+    # 1. Eksik tarihleri kontrol et (tam taramada aralık bazında)
+    if full_scan:
+        missing_dates = expand_ranges(find_gap_ranges(start_date, end_date, raise_errors=raise_errors))
+    else:
+        missing_dates = check_missing_dates(start_date, end_date, raise_errors=raise_errors)
     
     if not missing_dates:
         logger.info("Tüm tarihler güncel")
-        return
+        return 0
+    
+    from evds_client import CHUNK_DAYS
+    from tlref_series import TlrefSeries
+    
+    span_days = (max(missing_dates) - min(missing_dates)).days + 1
+    long_gap = fetch_mode == "concurrent" or (fetch_mode == "auto" and span_days > CHUNK_DAYS)
+    
+    if pipeline == "batch" or long_gap or full_scan:
+        try:
+            updated_count = run_batch_pipeline(missing_dates, fetch_mode, with_cash_flow=(pipeline == "batch"))
+        except Exception as e:
+            logger.error(f"Toplu TLREF güncelleme hatası: {e}")
+            if raise_errors:
+                raise
+            updated_count = 0
+        logger.info(f"=== Güncelleme Tamamlandı: {updated_count} kayıt ===")
+        return updated_count
     
     updated_count = 0
+    written_dates = []
+    
+    # 2. Eksik işgünlerinin penceresini API'den tek seferde al
+    business_days, _, calendar = split_business_days(missing_dates)
+    api_values = get_tlref_range_from_api(business_days) if business_days else {}
+    
+    # Önceki gün değerleri için pencere bir kez okunur, tarih başına sorgu atılmaz
+    series = TlrefSeries.from_db(min(missing_dates) - timedelta(days=CARRY_FORWARD_DAYS), max(missing_dates))
     
-    # 2. Her eksik tarih için veri almaya çalış
+    # 3. Her eksik tarihi işle
     for date_val in missing_dates:
         logger.info(f"İşleniyor: {date_val}")
         
-        # Önce API'den almaya çalış
-        tlref_value = get_tlref_from_api(date_val)
+        tlref_value = api_values.get(date_val)
         source = "API"
         
         # API'den alamazsa önceki günün değerini kullan
         if tlref_value is None:
-            tlref_value = get_previous_tlref(date_val)
+            tlref_value = get_previous_tlref(date_val, series, calendar)
             source = "Önceki Gün"
         
         # Değer bulunduysa kaydet
         if tlref_value is not None:
             if insert_tlref_record(date_val, tlref_value, source):
                 updated_count += 1
+                written_dates.append(date_val)
+                series.set(date_val, tlref_value)
         else:
             logger.warning(f"⚠ {date_val} için TLREF değeri bulunamadı")
     
+    # 4. Aylık/yıllık özetlerde sadece yazılan tarihlerin kovalarını, endekste ilk yazılan tarihten sonrasını yenile
+    if written_dates:
+        from tlref_index import refresh_index
+        
+        try:
+            with transaction() as cur:
+                refresh_rollups(cur, written_dates)
+                refresh_index(cur, written_dates)
+        except Exception as e:
+            logger.error(f"Özet tablosu/endeks yenileme hatası: {e}")
+    
     logger.info(f"=== Güncelleme Tamamlandı: {updated_count} kayıt ===")
+    return updated_count
+
+def create_propagation_state_table(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {PROPAGATION_STATE_TABLE} (
+            hedef VARCHAR(64) PRIMARY KEY,
+            yuksek_su TIMESTAMP NOT NULL,
+            guncellendi TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def get_propagation_high_water(cur, target=CASH_FLOW_TABLE):
+    """Hedefe en son aktarılan TLREF.updated_at değerini kilitleyerek oku (hiç yoksa None)"""
+    cur.execute(f"SELECT yuksek_su FROM {PROPAGATION_STATE_TABLE} WHERE hedef = %s FOR UPDATE", (target,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def set_propagation_high_water(cur, high_water, target=CASH_FLOW_TABLE):
+    cur.execute(f"""
+        INSERT INTO {PROPAGATION_STATE_TABLE} (hedef, yuksek_su) VALUES (%s, %s)
+        ON CONFLICT (hedef) DO UPDATE SET
+            yuksek_su = GREATEST({PROPAGATION_STATE_TABLE}.yuksek_su, EXCLUDED.yuksek_su),
+            guncellendi = CURRENT_TIMESTAMP
+    """, (target, high_water))
+
+def update_returning_dates(cur, update_sql, params=None):
+    """RETURNING cfa.tarih ile biten UPDATE'i çalıştır; {tarih: güncellenen satır} döndür"""
+    cur.execute(f"""
+        WITH updated AS ({update_sql})
+        SELECT tarih, COUNT(*) FROM updated GROUP BY tarih
+    """, params)
+    return dict(cur.fetchall())
+
+def apply_cash_flow_changes(cur):
+    """Yüksek su işaretinden sonra değişen TLREF günlerini cash_flow_analysis'e yeniden uygula
 
-def update_cash_flow_tlref():
-    """cash_flow_analysis tablosundaki TLREF değerlerini güncelle"""
+    Revize edilen değerler ve gerçek değerle değiştirilen taşınmış günler böylece eski
+    oranda kalmaz. İlk çalışmada (işaret yoksa) tüm günler karşılaştırılır; sadece
+    oranı farklı olan satırlar yazılır. {tarih: güncellenen satır} döndürür.
+    """
+    create_propagation_state_table(cur)
+    high_water = get_propagation_high_water(cur)
+    
+    # İşaret, bu işlemin gördüğü en son değişiklikten alınır (now() değil)
+    cur.execute(f"SELECT MAX(updated_at) FROM {TABLE_NAME}")
+    new_high_water = cur.fetchone()[0]
+    since = high_water - timedelta(minutes=PROPAGATION_OVERLAP_MINUTES) if high_water else None
+    
+    revised = update_returning_dates(cur, f"""
+        UPDATE {CASH_FLOW_TABLE} cfa
+        SET tlref_faiz = t.tlref_yuzde,
+            tlref_faiz_kazanci = (t.tlref_yuzde * cfa.anapara / 365.0)
+        FROM {TABLE_NAME} t
+        WHERE cfa.tarih = t.tarih
+        AND (%s::timestamp IS NULL OR t.updated_at > %s)
+        AND cfa.tlref_faiz IS DISTINCT FROM t.tlref_yuzde
+        RETURNING cfa.tarih
+    """, (since, since))
+    
+    if new_high_water is not None:
+        set_propagation_high_water(cur, new_high_water)
+    tlref_metrics.count("tlref_rows_total", sum(revised.values()), op="cash_flow_revision")
+    return revised
+
+@tlref_metrics.stage("cash_flow_propagation")
+def apply_cash_flow_tlref(cur, mode=None):
+    """cash_flow_analysis kayıtlarının TLREF faizini verilen işlem içinde güncelle
+
+    mode (varsayılan CASH_FLOW_MODE): "null" sadece TLREF faizi olmayan kayıtları,
+    "changes" bunlara ek olarak son aktarımdan sonra değişen TLREF günlerini,
+    "full" oranı TLREF tablosundan farklı olan tüm kayıtları günceller. Dokunulan
+    tarihlerin cash_flow_rollup kovaları da aynı işlemde yenilenir.
+    """
+    mode = mode or CASH_FLOW_MODE
+    condition = "cfa.tlref_faiz IS DISTINCT FROM t.tlref_yuzde" if mode == "full" else "cfa.tlref_faiz IS NULL"
+    updated = update_returning_dates(cur, f"""
+        UPDATE {CASH_FLOW_TABLE} cfa
+        SET tlref_faiz = t.tlref_yuzde,
+            tlref_faiz_kazanci = (t.tlref_yuzde * cfa.anapara / 365.0)
+        FROM {TABLE_NAME} t
+        WHERE cfa.tarih = t.tarih 
+        AND {condition}
+        RETURNING cfa.tarih
+    """)
+    tlref_metrics.count("tlref_rows_total", sum(updated.values()), op="cash_flow_update")
+    
+    if mode == "changes":
+        for date_val, rows in apply_cash_flow_changes(cur).items():
+            updated[date_val] = updated.get(date_val, 0) + rows
+    
+    refresh_cash_flow_rollups(cur, updated)
+    return sum(updated.values())
+
+def update_cash_flow_tlref(raise_errors=False, mode=None):
+    """cash_flow_analysis tablosundaki TLREF değerlerini güncelle; güncellenen satır sayısını döndür"""
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        # TLREF faizi olmayan kayıtları güncelle
-        cur.execute(f"""
-            UPDATE cash_flow_analysis cfa
-            SET tlref_faiz = t.tlref_yuzde,
-                tlref_faiz_kazanci = (t.tlref_yuzde * cfa.anapara / 365.0)
-            FROM {TABLE_NAME} t
-            WHERE cfa.tarih = t.tarih 
-            AND cfa.tlref_faiz IS NULL
-        """)
-        
-        updated_rows = cur.rowcount
-        conn.commit()
-        cur.close()
-        conn.close()
+        with transaction() as cur:
+            # TLREF faizi olmayan ve (mode'a göre) TLREF'i sonradan değişen kayıtları güncelle
+            updated_rows = apply_cash_flow_tlref(cur, mode)
         
         if updated_rows > 0:
             logger.info(f"cash_flow_analysis tablosunda {updated_rows} kayıt güncellendi")
+        return updated_rows
         
     except Exception as e:
         logger.error(f"Cash flow TLREF güncelleme hatası: {e}")
+        if raise_errors:
+            raise
+        return 0
 
 def manual_update():
-    """Manuel güncelleme"""
+    """Manuel güncelleme (python tlref_cli.py daily ile aynı)"""
     print("=== Manuel TLREF Güncelleme ===")
     
     # Son durum raporu
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        cur.execute(f"SELECT COUNT(*), MAX(tarih) FROM {TABLE_NAME}")
-        count, last_date = cur.fetchone()
+        with transaction() as cur:
+            cur.execute(f"SELECT COUNT(*), MAX(tarih) FROM {TABLE_NAME}")
+            count, last_date = cur.fetchone()
         
         print(f"Mevcut kayıt sayısı: {count:,}")
         print(f"Son tarih: {last_date}")
         
-        cur.close()
-        conn.close()
-        
     except Exception as e:
         print(f"Durum kontrol hatası: {e}")
     
-    # Güncelleme yap
-    daily_tlref_update()
-    
-    # Cash flow tablosunu da güncelle
-    update_cash_flow_tlref()
+    # Güncelleme ve ardından cash flow tablosu
+    tlref_cli.main(["daily"])
 
 def setup_scheduler():
-    """Otomatik zamanlanmış görevleri ayarla"""
-    # Her gün saat 18:00'da çalıştır
-    schedule.every().day.at("18:00").do(daily_tlref_update)
-    schedule.every().day.at("18:05").do(update_cash_flow_tlref)
+    """Otomatik güncelleme servisini başlat (bkz. tlref_scheduler)"""
+    # Zamanlayıcı bu modülü içe aktardığı için burada yüklenir
+    from tlref_scheduler import LockNotAcquired, RUN_AT, run_daemon
     
     print("=== TLREF Otomatik Güncelleme Servisi ===")
-    print("Günlük güncelleme saatleri:")
-    print("- 18:00: TLREF verileri güncelleme")
-    print("- 18:05: Cash flow tablosu güncelleme")
+    print(f"Her gün {RUN_AT}: TLREF güncelleme -> ardından cash flow tablosu güncelleme")
+    print("Kaçırılan günler açılışta telafi edilir.")
     print("Servis çalışıyor... (Ctrl+C ile durdurun)")
     
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Her dakika kontrol et
+        run_daemon()
+    except LockNotAcquired as e:
+        print(f"✗ {e}")
     except KeyboardInterrupt:
         print("\nServis durduruldu.")
 
 def main():
     print("=== Günlük TLREF Güncelleme Sistemi ===")
     print("1. Manuel güncelleme yap")
-    print("2. Otomatik servis başlat (günlük 18:00)")
+    print("2. Otomatik servis başlat (günlük, kaçırılanları telafi eder)")
     print("3. İptal")
     
     try:
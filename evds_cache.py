@@ -0,0 +1,249 @@
+"""EVDS cevapları için SQLite tabanlı kalıcı önbellek
+
+Kullanım:
+    python evds_cache.py stats
+    python evds_cache.py list --limit 20
+    python evds_cache.py purge --expired
+    python evds_cache.py purge --series TP.BISTTLREF.ORAN
+    python evds_cache.py purge --all
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+# -------------------------------
+# AYARLAR
+# -------------------------------
+CACHE_FILE = os.environ.get(
+    "EVDS_CACHE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".evds_cache.sqlite3")
+)
+CACHE_ENABLED = os.environ.get("EVDS_CACHE", "1") != "0"
+REVISION_WINDOW_DAYS = 5  # Son kaç günün değeri hâlâ revize edilebilir kabul edilsin
+RECENT_TTL_SECONDS = 6 * 3600  # Revize edilebilir pencere için önbellek süresi
+MAX_CACHE_BYTES = 50 * 1024 * 1024  # Bu boyut aşılınca en az kullanılanlar silinir
+
+
+class EvdsCache:
+    """(series, başlangıç, bitiş) anahtarlı EVDS cevap önbelleği"""
+
+    def __init__(self, path=CACHE_FILE, max_bytes=MAX_CACHE_BYTES,
+                 revision_window_days=REVISION_WINDOW_DAYS, recent_ttl=RECENT_TTL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.revision_window_days = revision_window_days
+        self.recent_ttl = recent_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS evds_cache (
+                series TEXT NOT NULL,
+                start_date TEXT NOT NULL,
+                end_date TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                expires_at REAL,
+                PRIMARY KEY (series, start_date, end_date)
+            );
+            CREATE INDEX IF NOT EXISTS idx_evds_cache_last_access ON evds_cache(last_access);
+            CREATE TABLE IF NOT EXISTS evds_cache_stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _expires_at(self, end_date, now):
+        """Kesinleşmiş geçmiş değerler süresiz, son günler kısa süreli saklanır"""
+        if end_date >= date.today() - timedelta(days=self.revision_window_days):
+            return now + self.recent_ttl
+        return None
+
+    def _count(self, name):
+        self._conn.execute("""
+            INSERT INTO evds_cache_stats (name, value) VALUES (?, 1)
+            ON CONFLICT (name) DO UPDATE SET value = value + 1
+        """, (name,))
+
+    def get(self, series_code, start_date, end_date):
+        """Önbellekte geçerli kayıt varsa {tarih: değer} döndür, yoksa None"""
+        now = time.time()
+        key = (series_code, start_date.isoformat(), end_date.isoformat())
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT payload, expires_at FROM evds_cache
+                WHERE series = ? AND start_date = ? AND end_date = ?
+            """, key).fetchone()
+
+            # Eski sürümlerin yazdığı boş cevaplar da ıskalama sayılır
+            if row is None or (row[1] is not None and row[1] < now) or row[0] == "{}":
+                self.misses += 1
+                self._count("misses")
+                self._conn.commit()
+                return None
+
+            self.hits += 1
+            self._count("hits")
+            self._conn.execute("""
+                UPDATE evds_cache SET last_access = ?
+                WHERE series = ? AND start_date = ? AND end_date = ?
+            """, (now,) + key)
+            self._conn.commit()
+
+        return {date.fromisoformat(d): v for d, v in json.loads(row[0]).items()}
+
+    def put(self, series_code, start_date, end_date, values):
+        """Cevabı önbelleğe yaz ve gerekirse boyut sınırına göre temizle
+
+        Boş cevap yazılmaz: kesinti sırasında item'sız dönen 200 ya da henüz boş bir series
+        kodu, süresiz kayıt olarak o pencerenin sonraki doldurmalarını engellemesin.
+        """
+        if not values:
+            return
+        now = time.time()
+        payload = json.dumps({d.isoformat(): v for d, v in values.items()}, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO evds_cache
+                (series, start_date, end_date, payload, size, fetched_at, last_access, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (series_code, start_date.isoformat(), end_date.isoformat(), payload,
+                  len(payload), now, now, self._expires_at(end_date, now)))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Toplam boyut sınırı aşıldıysa en uzun süredir kullanılmayan kayıtları sil"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM evds_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        rows = self._conn.execute(
+            "SELECT rowid, size FROM evds_cache ORDER BY last_access ASC"
+        ).fetchall()
+        for rowid, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM evds_cache WHERE rowid = ?", (rowid,))
+            total -= size
+            removed += 1
+        return removed
+
+    def purge(self, series_code=None, expired_only=False):
+        """Önbellekten kayıt sil; silinen kayıt sayısını döndür"""
+        conditions, params = [], []
+        if series_code:
+            conditions.append("series = ?")
+            params.append(series_code)
+        if expired_only:
+            conditions.append("expires_at IS NOT NULL AND expires_at < ?")
+            params.append(time.time())
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._lock:
+            cur = self._conn.execute(f"DELETE FROM evds_cache {where}", params)
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+            return cur.rowcount
+
+    def stats(self):
+        """Önbellek boyutu ve kalıcı isabet/ıska sayaçları"""
+        with self._lock:
+            entries, size, recent = self._conn.execute("""
+                SELECT COUNT(*), COALESCE(SUM(size), 0), COUNT(expires_at)
+                FROM evds_cache
+            """).fetchone()
+            totals = dict(self._conn.execute("SELECT name, value FROM evds_cache_stats").fetchall())
+
+        return {
+            "entries": entries,
+            "bytes": size,
+            "recent_entries": recent,
+            "final_entries": entries - recent,
+            "session_hits": self.hits,
+            "session_misses": self.misses,
+            "total_hits": totals.get("hits", 0),
+            "total_misses": totals.get("misses", 0)
+        }
+
+    def entries(self, limit=20):
+        """Son kullanılan kayıtları listele"""
+        with self._lock:
+            return self._conn.execute("""
+                SELECT series, start_date, end_date, size, fetched_at, last_access, expires_at
+                FROM evds_cache
+                ORDER BY last_access DESC
+                LIMIT ?
+            """, (limit,)).fetchall()
+
+
+_cache = None
+
+
+def get_cache():
+    """Süreç boyunca paylaşılan önbelleği döndür (kapalıysa None)"""
+    global _cache
+    if _cache is None and CACHE_ENABLED:
+        _cache = EvdsCache()
+    return _cache
+
+
+def _format_ts(value):
+    return datetime.fromtimestamp(value).strftime("%d.%m.%Y %H:%M") if value else "süresiz"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", default=CACHE_FILE, help="Önbellek dosyası")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("stats", help="Boyut ve isabet/ıska sayaçlarını göster")
+
+    list_parser = sub.add_parser("list", help="Kayıtları listele")
+    list_parser.add_argument("--limit", type=int, default=20)
+
+    purge_parser = sub.add_parser("purge", help="Kayıtları sil")
+    group = purge_parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--all", action="store_true", help="Tüm kayıtları sil")
+    group.add_argument("--expired", action="store_true", help="Süresi dolanları sil")
+    group.add_argument("--series", help="Sadece bu series koduna ait kayıtları sil")
+
+    args = parser.parse_args()
+    cache = EvdsCache(args.file)
+
+    if args.command == "stats":
+        st = cache.stats()
+        total = st["total_hits"] + st["total_misses"]
+        ratio = (st["total_hits"] / total * 100) if total else 0.0
+        print(f"Önbellek dosyası: {args.file}")
+        print(f"Kayıt sayısı: {st['entries']} (kesin: {st['final_entries']}, güncel: {st['recent_entries']})")
+        print(f"Boyut: {st['bytes'] / 1024:.1f} KB / {cache.max_bytes / 1024 / 1024:.0f} MB")
+        print(f"İsabet: {st['total_hits']} | Iska: {st['total_misses']} | İsabet oranı: %{ratio:.1f}")
+
+    elif args.command == "list":
+        for series, start, end, size, fetched, accessed, expires in cache.entries(args.limit):
+            print(f"{series:20} {start} - {end} | {size:6} B | alındı: {_format_ts(fetched)} "
+                  f"| son kullanım: {_format_ts(accessed)} | bitiş: {_format_ts(expires)}")
+
+    elif args.command == "purge":
+        removed = cache.purge(series_code=args.series, expired_only=args.expired)
+        print(f"{removed} kayıt silindi")
+
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
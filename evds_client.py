@@ -0,0 +1,281 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from evds_cache import get_cache
+import tlref_metrics
+
+# -------------------------------
+# AYARLAR
+# -------------------------------
+EVDS_BASE_URL = os.environ.get("EVDS_BASE_URL", "https://evds2.tcmb.gov.tr/service/evds")
+API_KEY = os.environ.get("EVDS_API_KEY", "xuG8dyK7UA")  # EVDS API anahtarı
+SERIES_CODES = [
+    "TP.BISTTLREF.ORAN",
+    "TP.TLREF.AO",
+    "TP.BIST.TLREF"
+]
+STATE_FILE = os.environ.get(
+    "EVDS_STATE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".evds_state.json")
+)
+REQUEST_TIMEOUT = (5, 30)  # (bağlantı, okuma) saniye
+RETRY_COUNT = 3
+RETRY_BACKOFF = 0.5  # 0.5s, 1s, 2s ...
+CHUNK_DAYS = 31  # Eşzamanlı modda her isteğin kapsadığı gün sayısı
+MAX_CONCURRENCY = 4  # Aynı anda en fazla kaç istek
+RATE_LIMIT = 5.0  # Saniyede en fazla istek (token bucket)
+CHUNK_RETRIES = 2  # Başarısız parça için ek deneme sayısı
+
+logger = logging.getLogger(__name__)
+
+
+def parse_evds_items(items, series_code):
+    """EVDS 'items' listesini {tarih: değer} sözlüğüne çevir"""
+    series_key = series_code.replace(".", "_")
+    values = {}
+    for item in items:
+        value = item.get(series_key)
+        if value is None or value == "":
+            continue
+        try:
+            date_val = datetime.strptime(item["Tarih"], "%d-%m-%Y").date()
+            values[date_val] = float(value)
+        except (KeyError, TypeError, ValueError):
+            continue
+    return values
+
+
+def split_date_range(start_date, end_date, chunk_days=CHUNK_DAYS):
+    """[start, end] aralığını en fazla chunk_days günlük parçalara böl"""
+    chunks = []
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end_date)
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + timedelta(days=1)
+    return chunks
+
+
+class TokenBucket:
+    """Saniyede rate kadar token üreten, thread-safe basit hız sınırlayıcı"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bir token alınana kadar bekle"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class EvdsClient:
+    """Kalıcı HTTP oturumu ile EVDS'den tarih aralığı bazında TLREF çeken istemci"""
+
+    def __init__(self, api_key=API_KEY, base_url=EVDS_BASE_URL, series_codes=None,
+                 state_file=STATE_FILE, retries=RETRY_COUNT, backoff=RETRY_BACKOFF,
+                 timeout=REQUEST_TIMEOUT, cache=None, use_cache=True):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache if cache is not None else (get_cache() if use_cache else None)
+        self.series_codes = list(series_codes or SERIES_CODES)
+        self.state_file = state_file
+        self.timeout = timeout
+        self.last_series_code = self._load_state().get("last_series_code")
+        self._state_lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=4,
+                              pool_maxsize=max(8, MAX_CONCURRENCY))
+
+        self.session = requests.Session()
+        self.session.headers.update({"key": api_key, "Connection": "keep-alive"})
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _load_state(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        if not self.state_file:
+            return
+        try:
+            with open(self.state_file, "w", encoding="utf-8") as f:
+                json.dump({"last_series_code": self.last_series_code}, f)
+        except OSError as e:
+            logger.warning(f"EVDS durum dosyası yazılamadı: {e}")
+
+    def _remember_series(self, series_code):
+        with self._state_lock:
+            if series_code != self.last_series_code:
+                self.last_series_code = series_code
+                self._save_state()
+
+    def ordered_series_codes(self):
+        """En son çalışan series kodu önce olacak şekilde sırala"""
+        if self.last_series_code in self.series_codes:
+            return [self.last_series_code] + [c for c in self.series_codes if c != self.last_series_code]
+        return list(self.series_codes)
+
+    def fetch_series(self, series_code, start_date, end_date):
+        """Tek bir series kodu için tüm tarih aralığını tek istekte çek (önce önbelleğe bak)"""
+        if self.cache is not None:
+            cached = self.cache.get(series_code, start_date, end_date)
+            if cached is not None:
+                return cached
+
+        url = (f"{self.base_url}/series={series_code}"
+               f"&startDate={start_date.strftime('%d-%m-%Y')}"
+               f"&endDate={end_date.strftime('%d-%m-%Y')}&type=json")
+        with tlref_metrics.stage("api_fetch", series=series_code):
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except requests.RequestException:
+                tlref_metrics.count("tlref_http_requests_total", series=series_code, status="error")
+                raise
+            tlref_metrics.count("tlref_http_requests_total", series=series_code, status=response.status_code)
+            response.raise_for_status()
+            values = parse_evds_items(response.json().get("items", []), series_code)
+
+        if self.cache is not None:
+            self.cache.put(series_code, start_date, end_date, values)
+        return values
+
+    def fetch_range(self, start_date, end_date):
+        """startDate..endDate aralığındaki TLREF değerlerini {tarih: değer} olarak döndür"""
+        for series_code in self.ordered_series_codes():
+            try:
+                values = self.fetch_series(series_code, start_date, end_date)
+            except (requests.RequestException, ValueError) as e:
+                logger.warning(f"{series_code} ile {start_date} - {end_date} alınamadı: {e}")
+                continue
+
+            if values:
+                self._remember_series(series_code)
+                logger.info(f"API'den {start_date} - {end_date} için {len(values)} TLREF alındı ({series_code})")
+                return values
+
+        logger.warning(f"API'den {start_date} - {end_date} için TLREF alınamadı")
+        return {}
+
+    def fetch_dates(self, dates):
+        """Verilen tarihleri kapsayan pencereyi tek seferde çekip sadece istenenleri döndür"""
+        dates = sorted(set(dates))
+        if not dates:
+            return {}
+        values = self.fetch_range(dates[0], dates[-1])
+        return {d: values[d] for d in dates if d in values}
+
+    def _fetch_chunk(self, start_date, end_date, bucket, retries):
+        """Bir parçayı series kodlarını sırayla deneyerek çek; sadece hata varsa tekrar dene"""
+        started = time.perf_counter()
+        attempts = 0
+        while True:
+            attempts += 1
+            errors = 0
+            for series_code in self.ordered_series_codes():
+                bucket.acquire()
+                try:
+                    values = self.fetch_series(series_code, start_date, end_date)
+                except (requests.RequestException, ValueError) as e:
+                    errors += 1
+                    logger.warning(f"{series_code} ile {start_date} - {end_date} alınamadı: {e}")
+                    continue
+                if values:
+                    self._remember_series(series_code)
+                    return values, {
+                        "start": start_date, "end": end_date, "series": series_code,
+                        "rows": len(values), "attempts": attempts,
+                        "latency": time.perf_counter() - started
+                    }
+
+            # Tüm kodlar boş döndüyse aralıkta veri yoktur, tekrar denemeye gerek yok
+            if errors == 0 or attempts > retries:
+                return {}, {
+                    "start": start_date, "end": end_date, "series": None,
+                    "rows": 0, "attempts": attempts, "error": errors > 0,
+                    "latency": time.perf_counter() - started
+                }
+            time.sleep(RETRY_BACKOFF * (2 ** (attempts - 1)))
+
+    def fetch_range_concurrent(self, start_date, end_date, chunk_days=CHUNK_DAYS,
+                               max_workers=MAX_CONCURRENCY, rate_limit=RATE_LIMIT,
+                               retries=CHUNK_RETRIES):
+        """Büyük aralığı parçalara bölüp eşzamanlı çek; (sıralı değerler, parça istatistikleri) döndür"""
+        return self.fetch_windows([(start_date, end_date)], chunk_days, max_workers, rate_limit, retries)
+
+    def fetch_windows(self, windows, chunk_days=CHUNK_DAYS, max_workers=MAX_CONCURRENCY,
+                      rate_limit=RATE_LIMIT, retries=CHUNK_RETRIES):
+        """Birden fazla (başlangıç, bitiş) penceresini parçalara bölüp eşzamanlı çek"""
+        chunks = [chunk for start, end in windows for chunk in split_date_range(start, end, chunk_days)]
+        bucket = TokenBucket(rate_limit)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                lambda chunk: self._fetch_chunk(chunk[0], chunk[1], bucket, retries), chunks
+            ))
+
+        values = {}
+        stats = []
+        for chunk_values, chunk_stats in results:
+            values.update(chunk_values)
+            stats.append(chunk_stats)
+            logger.info(
+                f"Parça {chunk_stats['start']} - {chunk_stats['end']}: {chunk_stats['rows']} kayıt, "
+                f"{chunk_stats['latency'] * 1000:.0f} ms, {chunk_stats['attempts']} deneme"
+            )
+
+        failed = sum(1 for st in stats if st.get("error"))
+        logger.info(f"API'den {len(chunks)} parçada {len(values)} TLREF alındı ({failed} başarısız parça)")
+        return dict(sorted(values.items())), stats
+
+
+_client = None
+
+
+def get_client():
+    """Süreç boyunca paylaşılan EVDS istemcisini döndür"""
+    global _client
+    if _client is None:
+        _client = EvdsClient()
+    return _client
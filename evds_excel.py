@@ -0,0 +1,209 @@
+import hashlib
+import importlib.util
+import json
+import os
+import time
+
+import pandas as pd
+
+import tlref_metrics
+
+# -------------------------------
+# AYARLAR
+# -------------------------------
+SHEET_NAME = "EVDS"
+EXCEL_ENGINE = os.environ.get("TLREF_EXCEL_ENGINE", "openpyxl")  # "calamine" kuruluysa çok daha hızlı
+SNAPSHOT_ENABLED = os.environ.get("TLREF_EXCEL_CACHE", "1") != "0"
+SNAPSHOT_VERSION = 1  # Okuma/normalizasyon mantığı değişirse artırılır, eski önbellekler geçersiz olur
+REVISION_WINDOW_DAYS = 30  # Artımlı okumada son kaç günün değişip değişmediği kontrol edilsin
+FINGERPRINT_DECIMALS = 4  # Parmak izi için TLREF kaç basamağa yuvarlansın (EVDS 4 basamak verir)
+
+
+def find_excel_file(file_name):
+    """Excel dosyasını önce masaüstünde, sonra çalışma dizininde ara"""
+    desktop_path = os.path.join(os.path.expanduser("~"), "Desktop", file_name)
+    if os.path.exists(desktop_path):
+        return desktop_path
+    if os.path.exists(file_name):
+        return file_name
+    return None
+
+
+def resolve_engine(engine=None):
+    """İstenen Excel okuyucusunu döndür; calamine kurulu değilse openpyxl'e düş"""
+    engine = engine or EXCEL_ENGINE
+    if engine == "calamine" and importlib.util.find_spec("python_calamine") is None:
+        print("python-calamine kurulu değil, openpyxl kullanılacak")
+        return "openpyxl"
+    return engine
+
+
+def detect_columns(file_path, sheet_name=SHEET_NAME, engine=None):
+    """Sadece başlık satırını okuyup (tarih sütunu, TLREF sütunu) ham adlarını bul"""
+    header = pd.read_excel(file_path, sheet_name=sheet_name, nrows=0, engine=resolve_engine(engine)).columns
+
+    tlref_column = None
+    for col in header:
+        name = str(col).strip().upper()
+        if 'TLREF' in name or 'ORAN' in name:
+            tlref_column = col
+            break
+
+    return header[0], tlref_column
+
+
+@tlref_metrics.stage("excel_parse")
+def parse_evds_frame(file_path, sheet_name=SHEET_NAME, engine=None):
+    """Çalışma kitabından sadece tarih ve TLREF sütunlarını okuyup (Tarih, TLREF) çerçevesi döndür"""
+    engine = resolve_engine(engine)
+    date_column, tlref_column = detect_columns(file_path, sheet_name, engine)
+    if tlref_column is None:
+        raise ValueError("TLREF sütunu bulunamadı")
+
+    df = pd.read_excel(file_path, sheet_name=sheet_name, usecols=[date_column, tlref_column], engine=engine)
+    df = df.rename(columns={date_column: 'Tarih', tlref_column: 'TLREF'})
+
+    # Veriyi temizle
+    df = df.dropna(subset=['TLREF'])
+
+    # Tarih sütununu datetime'a çevir
+    if pd.api.types.is_object_dtype(df['Tarih']) or pd.api.types.is_string_dtype(df['Tarih']):
+        df['Tarih'] = pd.to_datetime(df['Tarih'], format='%d-%m-%Y', errors='coerce')
+    else:
+        df['Tarih'] = pd.to_datetime(df['Tarih'], errors='coerce')
+
+    # Tarih dönüşümü başarısız olan satırları kaldır
+    df = df.dropna(subset=['Tarih'])
+    df['TLREF'] = df['TLREF'].astype(float)
+    df['Tarih'] = df['Tarih'].astype('datetime64[ns]')
+    return df.reset_index(drop=True)
+
+
+def snapshot_format():
+    """Parquet motoru varsa parquet, yoksa ek bağımlılık gerektirmeyen pickle kullan"""
+    if importlib.util.find_spec("pyarrow") or importlib.util.find_spec("fastparquet"):
+        return "parquet"
+    return "pickle"
+
+
+def snapshot_paths(file_path, sheet_name=SHEET_NAME):
+    """Çalışma kitabının yanında tutulan (veri, meta) önbellek dosya yolları"""
+    folder, name = os.path.split(os.path.abspath(file_path))
+    base = os.path.join(folder, f".{name}.{sheet_name}.tlref")
+    extension = "parquet" if snapshot_format() == "parquet" else "pkl"
+    return f"{base}.{extension}", f"{base}.json"
+
+
+def file_fingerprint(file_path):
+    """Dosyanın yol, boyut, mtime ve içerik özetinden oluşan anahtarı"""
+    stat = os.stat(file_path)
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return {
+        "path": os.path.abspath(file_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest.hexdigest(),
+        "version": SNAPSHOT_VERSION
+    }
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@tlref_metrics.stage("excel_snapshot_load")
+def load_snapshot(file_path, sheet_name=SHEET_NAME):
+    """Çalışma kitabı değişmediyse önbellekteki çerçeveyi, aksi halde None döndür"""
+    data_path, meta_path = snapshot_paths(file_path, sheet_name)
+    meta = _read_meta(meta_path)
+    if meta is None or not os.path.exists(data_path):
+        return None
+
+    # Boyut farklıysa içerik özetini hesaplamaya gerek yok
+    if meta.get("size") != os.path.getsize(file_path):
+        return None
+    key = file_fingerprint(file_path)
+    if any(meta.get(k) != key[k] for k in ("path", "sha256", "version")):
+        return None
+
+    try:
+        if data_path.endswith(".parquet"):
+            df = pd.read_parquet(data_path)
+        else:
+            df = pd.read_pickle(data_path)
+    except Exception:
+        return None
+
+    # Dosyaya sadece dokunulduysa (kopyalama, senkronizasyon) mtime güncellenir
+    if meta.get("mtime_ns") != key["mtime_ns"]:
+        _write_meta(meta_path, key, len(df))
+    return df
+
+
+def _write_meta(meta_path, key, rows):
+    meta = dict(key, rows=rows, created_at=time.time())
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def save_snapshot(file_path, df, sheet_name=SHEET_NAME):
+    """Normalize edilmiş çerçeveyi çalışma kitabının yanına kaydet"""
+    data_path, meta_path = snapshot_paths(file_path, sheet_name)
+    try:
+        key = file_fingerprint(file_path)
+        if data_path.endswith(".parquet"):
+            df.to_parquet(data_path, index=False)
+        else:
+            df.to_pickle(data_path)
+        _write_meta(meta_path, key, len(df))
+    except OSError as e:
+        print(f"Excel önbelleği yazılamadı: {e}")
+
+
+def read_evds_frame(file_path, sheet_name=SHEET_NAME, engine=None, use_cache=SNAPSHOT_ENABLED):
+    """(Tarih, TLREF) çerçevesini önbellekten, yoksa çalışma kitabını okuyarak döndür"""
+    if use_cache:
+        df = load_snapshot(file_path, sheet_name)
+        if df is not None:
+            print(f"Excel önbelleği kullanıldı ({len(df)} satır)")
+            return df
+
+    df = parse_evds_frame(file_path, sheet_name, engine)
+    if use_cache:
+        save_snapshot(file_path, df, sheet_name)
+    return df
+
+
+def row_fingerprints(df):
+    """(Tarih, yuvarlanmış TLREF) çiftinden satır parmak izi üret"""
+    keyed = pd.DataFrame({
+        # Kaynağa göre çözünürlük ([s]/[us]/[ns]) değişebilir, hash tutarlı olsun diye sabitlenir
+        'Tarih': pd.to_datetime(df['Tarih']).dt.normalize().astype('datetime64[ns]'),
+        'TLREF': df['TLREF'].astype(float).round(FINGERPRINT_DECIMALS)
+    })
+    return pd.util.hash_pandas_object(keyed, index=False)
+
+
+def select_changed_rows(df, existing_df, since):
+    """since tarihinden itibaren, veritabanındakiyle parmak izi aynı olmayan satırları döndür"""
+    candidate = df[df['Tarih'] >= pd.Timestamp(since)]
+    if existing_df is None or existing_df.empty or candidate.empty:
+        return candidate
+
+    existing = set(row_fingerprints(existing_df))
+    changed = ~row_fingerprints(candidate).isin(existing).values
+    return candidate[changed]
+
+
+def incremental_window_start(high_water_mark, revision_days=REVISION_WINDOW_DAYS):
+    """Yüksek su işaretinden revizyon penceresi kadar geriye giderek okuma başlangıcını bul"""
+    if high_water_mark is None:
+        return None
+    return pd.Timestamp(high_water_mark) - pd.Timedelta(days=revision_days)
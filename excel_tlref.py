@@ -1,80 +1,40 @@
 import pandas as pd
-import psycopg2
-from datetime import datetime
-import os
+import io
 import time
 
+import tlref_cli
+import tlref_metrics
+from cash_flow_rollups import refresh_rollups
+from evds_excel import find_excel_file, incremental_window_start, read_evds_frame, select_changed_rows
+from tlref_db import transaction
+
 # -------------------------------
 # AYARLAR
 # -------------------------------
 EXCEL_FILE = "EVDS.xlsx"
 CSV_FILE = "tlref_batch_data.csv"
-DB_CONFIG = {
-    "host":"192.168.182.3","dbname":"tmks-ftp","user":"postgres","password":"postgres.db!"
-}
 BATCH_SIZE = 10  # Her seferde kaç kayıt işlensin
+UPDATE_MODE = "bulk"  # "bulk": tek UPDATE ... FROM, "batch": satır satır SELECT + UPDATE
 
-def read_excel_tlref():
-    """Excel dosyasından TLREF verilerini oku"""
+def read_excel_tlref(since=None):
+    """Excel dosyasından TLREF verilerini oku (since verilirse sadece o tarihten sonrası)"""
     try:
         # Dosya yolu kontrolü
-        desktop_path = os.path.join(os.path.expanduser("~"), "Desktop", EXCEL_FILE)
-        current_path = EXCEL_FILE
-        
-        file_path = None
-        if os.path.exists(desktop_path):
-            file_path = desktop_path
-        elif os.path.exists(current_path):
-            file_path = current_path
-        else:
+        file_path = find_excel_file(EXCEL_FILE)
+        if file_path is None:
             print(f"EVDS.xlsx dosyası bulunamadı.")
             return None
             
         print(f"Excel dosyası okunuyor: {file_path}")
         
-        # Excel dosyasını oku
-        df = pd.read_excel(file_path, sheet_name='EVDS')
-        
-        # Sütun isimlerini temizle
-        df.columns = df.columns.str.strip()
-        
-        # TLREF sütununu bul
-        tlref_column = None
-        for col in df.columns:
-            if 'TLREF' in col.upper() or 'ORAN' in col.upper():
-                tlref_column = col
-                break
+        # Sadece tarih ve TLREF sütunlarını oku
+        df = read_evds_frame(file_path)
         
-        if tlref_column is None:
-            print("TLREF sütunu bulunamadı")
-            return None
-            
-        # Veriyi temizle
-        df = df.dropna(subset=[tlref_column])
-        
-        # Tarih sütununu datetime'a çevir
-        date_column = df.columns[0]
-        
-        try:
-            if df[date_column].dtype == 'object':
-                df[date_column] = pd.to_datetime(df[date_column], format='%d-%m-%Y', errors='coerce')
-            else:
-                df[date_column] = pd.to_datetime(df[date_column], errors='coerce')
-        except:
-            print("Tarih dönüşümünde sorun var")
-            return None
-        
-        # Tarih dönüşümü başarısız olan satırları kaldır
-        df = df.dropna(subset=[date_column])
+        if since is not None:
+            df = df[df['Tarih'] >= pd.Timestamp(since)]
         
         # Tarihe göre sırala (en yeniden en eskiye)
-        df = df.sort_values(date_column, ascending=False)
-        
-        # Kolon isimlerini standartlaştır
-        df = df.rename(columns={
-            date_column: 'Tarih',
-            tlref_column: 'TLREF'
-        })
+        df = df.sort_values('Tarih', ascending=False)
         
         print(f"Excel'den {len(df)} TLREF verisi okundu")
         return df
@@ -83,68 +43,116 @@ def read_excel_tlref():
         print(f"Excel okuma hatası: {e}")
         return None
 
+def get_high_water_mark():
+    """cash_flow_analysis'te TLREF faizi dolu olan en son tarihi döndür"""
+    with transaction() as cur:
+        cur.execute("""
+            SELECT MAX(tarih)
+            FROM cash_flow_analysis
+            WHERE tlref_faiz IS NOT NULL
+        """)
+        return cur.fetchone()[0]
+
+def load_existing_rates(since):
+    """since tarihinden itibaren tüm satırlarında aynı TLREF olan tarihleri (Tarih, TLREF) olarak getir"""
+    with transaction() as cur:
+        # Bir tarihte boş ya da farklı değer varsa o tarih değişmiş kabul edilir
+        cur.execute("""
+            SELECT tarih, MAX(tlref_faiz) * 100
+            FROM cash_flow_analysis
+            WHERE tarih >= %s
+            GROUP BY tarih
+            HAVING COUNT(*) = COUNT(tlref_faiz)
+               AND MIN(tlref_faiz) = MAX(tlref_faiz)
+        """, (pd.Timestamp(since).date(),))
+        rows = cur.fetchall()
+    return pd.DataFrame({
+        'Tarih': pd.to_datetime([tarih for tarih, _ in rows]),
+        'TLREF': [float(oran) for _, oran in rows]
+    })
+
+def select_incremental_rows(df=None):
+    """Son dolu tarihten (revizyon penceresi dahil) sonraki yeni veya değişen satırları seç"""
+    high_water_mark = get_high_water_mark()
+    since = incremental_window_start(high_water_mark)
+    
+    if df is None:
+        df = read_excel_tlref(since=since)
+        if df is None:
+            return None
+    
+    if since is None:
+        print("Veritabanında TLREF değeri yok, tüm satırlar işlenecek")
+        return df
+    
+    print(f"Son dolu tarih: {high_water_mark} | Kontrol başlangıcı: {since.strftime('%d.%m.%Y')}")
+    changed_df = select_changed_rows(df, load_existing_rates(since), since)
+    print(f"Yeni veya değişen satır: {len(changed_df)} / {len(df)}")
+    return changed_df
+
+@tlref_metrics.stage("cash_flow_update")
 def process_batch(batch_df, batch_num, total_batches):
     """Bir batch'i işle"""
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        print(f"\n--- Batch {batch_num}/{total_batches} İşleniyor ({len(batch_df)} kayıt) ---")
-        
-        updated_count = 0
-        not_found_count = 0
-        error_count = 0
-        
-        for idx, row in batch_df.iterrows():
-            try:
-                date_val = row['Tarih'].date()
-                tlref_raw = float(row['TLREF'])
-                tlref_percentage = tlref_raw / 100.0
-                
-                # Bu tarih için kayıt var mı kontrol et
-                cur.execute("""
-                    SELECT COUNT(*), anapara 
-                    FROM cash_flow_analysis 
-                    WHERE tarih = %s 
-                    GROUP BY anapara
-                """, (date_val,))
-                
-                result = cur.fetchone()
-                
-                if result:
-                    count, anapara = result
-                    
-                    # Decimal Decimal hatası için anapara'yı float'a çevir
-                    anapara = float(anapara) if anapara else 0
+        with transaction() as cur:
+            print(f"\n--- Batch {batch_num}/{total_batches} İşleniyor ({len(batch_df)} kayıt) ---")
+            
+            updated_count = 0
+            not_found_count = 0
+            error_count = 0
+            updated_dates = []
+            
+            for idx, row in batch_df.iterrows():
+                try:
+                    date_val = row['Tarih'].date()
+                    tlref_raw = float(row['TLREF'])
+                    tlref_percentage = tlref_raw / 100.0
                     
-                    # Güncelle
+                    # Bu tarih için kayıt var mı kontrol et
                     cur.execute("""
-                        UPDATE cash_flow_analysis
-                        SET tlref_faiz = %s,
-                            tlref_faiz_kazanci = (%s * anapara / 365.0)
-                        WHERE tarih = %s
-                    """, (tlref_percentage, tlref_percentage, date_val))
+                        SELECT COUNT(*), anapara 
+                        FROM cash_flow_analysis 
+                        WHERE tarih = %s 
+                        GROUP BY anapara
+                    """, (date_val,))
                     
-                    if cur.rowcount > 0:
-                        updated_count += 1
-                        faiz_kazanci = (tlref_percentage * anapara) / 365.0
-                        print(f"  ✓ {date_val}: %{tlref_percentage:.6f} | Kazanç: {faiz_kazanci:,.2f}")
-                    else:
-                        error_count += 1
-                        print(f"  ✗ {date_val}: Güncelleme başarısız")
-                else:
-                    not_found_count += 1
-                    print(f"  ⚠ {date_val}: Veritabanında yok")
+                    result = cur.fetchone()
                     
-            except Exception as e:
-                error_count += 1
-                print(f"  ✗ {date_val}: Hata - {e}")
-        
-        # Batch'i commit et
-        conn.commit()
-        cur.close()
-        conn.close()
+                    if result:
+                        count, anapara = result
+                        
+                        # Decimal Decimal hatası için anapara'yı float'a çevir
+                        anapara = float(anapara) if anapara else 0
+                        
+                        # Güncelle
+                        cur.execute("""
+                            UPDATE cash_flow_analysis
+                            SET tlref_faiz = %s,
+                                tlref_faiz_kazanci = (%s * anapara / 365.0)
+                            WHERE tarih = %s
+                        """, (tlref_percentage, tlref_percentage, date_val))
+                        
+                        if cur.rowcount > 0:
+                            updated_count += 1
+                            updated_dates.append(date_val)
+                            tlref_metrics.count("tlref_rows_total", cur.rowcount, op="cash_flow_update")
+                            faiz_kazanci = (tlref_percentage * anapara) / 365.0
+                            print(f"  ✓ {date_val}: %{tlref_percentage:.6f} | Kazanç: {faiz_kazanci:,.2f}")
+                        else:
+                            error_count += 1
+                            print(f"  ✗ {date_val}: Güncelleme başarısız")
+                    else:
+                        not_found_count += 1
+                        print(f"  ⚠ {date_val}: Veritabanında yok")
+                        
+                except Exception as e:
+                    error_count += 1
+                    print(f"  ✗ {date_val}: Hata - {e}")
+            
+            # Grafana özetlerinde sadece bu batch'in günlerinin kovaları yenilenir
+            refresh_rollups(cur, updated_dates)
         
+        # Batch, with bloğundan çıkarken commit edilir
         print(f"Batch {batch_num} tamamlandı: ✓{updated_count} ⚠{not_found_count} ✗{error_count}")
         
         # Kısa bekleme (veritabanı rahatlaması için)
@@ -188,42 +196,141 @@ def update_all_in_batches(df):
     print(f"Veritabanında bulunamayan: {total_not_found}")
     print(f"Hata alan: {total_errors}")
     print(f"Başarı oranı: {(total_updated/total_records)*100:.1f}%")
+    
+    return total_updated, total_not_found, total_errors
+
+def build_rate_frame(df):
+    """(tarih, tlref_faiz) çerçevesini hazırla; geçersiz satırları ayrıca döndür"""
+    rates = pd.DataFrame({
+        'tarih': pd.to_datetime(df['Tarih'], errors='coerce').dt.date,
+        'tlref_faiz': pd.to_numeric(df['TLREF'], errors='coerce') / 100.0
+    })
+    invalid = rates['tarih'].isna() | rates['tlref_faiz'].isna()
+    # Aynı tarih birden fazla gelirse satır satır modundaki gibi son satır kazanır
+    valid = rates[~invalid].drop_duplicates(subset='tarih', keep='last')
+    return valid, df[invalid.values]
+
+def copy_rates_into_staging(cur, rates, staging_table):
+    """(tarih, tlref_faiz) çiftlerini COPY FROM STDIN ile geçici tabloya aktar"""
+    cur.execute(f"""
+        CREATE TEMP TABLE {staging_table} (
+            tarih DATE PRIMARY KEY,
+            tlref_faiz NUMERIC
+        ) ON COMMIT DROP
+    """)
+    
+    buffer = io.StringIO()
+    rates.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {staging_table} (tarih, tlref_faiz) FROM STDIN WITH (FORMAT csv)", buffer)
+
+@tlref_metrics.stage("cash_flow_update")
+def update_all_bulk(df):
+    """Tüm veriyi geçici tabloya aktarıp tek UPDATE ... FROM ile güncelle"""
+    total_records = len(df)
+    rates, invalid_df = build_rate_frame(df)
+    
+    print(f"\n{total_records} kayıt COPY ile geçici tabloya aktarılıp tek sorguda güncellenecek")
+    
+    for _, row in invalid_df.iterrows():
+        print(f"  ✗ {row['Tarih']}: Hata - geçersiz tarih veya TLREF ({row['TLREF']})")
+    
+    try:
+        with transaction() as cur:
+            staging_table = "cash_flow_tlref_staging"
+            copy_rates_into_staging(cur, rates, staging_table)
+            
+            # Güncellenen satırlar tarih bazında toplanır; eşleşmeyen tarihler bulunamayandır
+            cur.execute(f"""
+                WITH updated AS (
+                    UPDATE cash_flow_analysis c
+                    SET tlref_faiz = s.tlref_faiz,
+                        tlref_faiz_kazanci = (s.tlref_faiz * c.anapara / 365.0)
+                    FROM {staging_table} s
+                    WHERE c.tarih = s.tarih
+                    RETURNING c.tarih, c.tlref_faiz_kazanci
+                ),
+                per_date AS (
+                    SELECT tarih, COUNT(*) AS satir, SUM(tlref_faiz_kazanci) AS kazanc
+                    FROM updated
+                    GROUP BY tarih
+                )
+                SELECT s.tarih, s.tlref_faiz, p.satir, p.kazanc
+                FROM {staging_table} s
+                LEFT JOIN per_date p ON p.tarih = s.tarih
+                ORDER BY s.tarih DESC
+            """)
+            report = cur.fetchall()
+            refresh_rollups(cur, [date_val for date_val, _, row_count, _ in report if row_count])
+    
+    except Exception as e:
+        print(f"✗ Toplu güncelleme hatası: {e}")
+        return 0, 0, total_records
+    
+    updated_count = 0
+    not_found_count = 0
+    updated_rows = 0
+    for date_val, tlref_faiz, row_count, kazanc in report:
+        if row_count:
+            updated_count += 1
+            updated_rows += row_count
+            print(f"  ✓ {date_val}: %{float(tlref_faiz):.6f} | {row_count} satır | Kazanç: {float(kazanc or 0):,.2f}")
+        else:
+            not_found_count += 1
+            print(f"  ⚠ {date_val}: Veritabanında yok")
+    
+    tlref_metrics.count("tlref_rows_total", updated_rows, op="cash_flow_update")
+    error_count = len(invalid_df)
+    duplicate_count = total_records - error_count - len(rates)
+    
+    print(f"\n=== TOPLU İŞLEM SONUCU ===")
+    print(f"Toplam işlenen: {total_records}")
+    if duplicate_count:
+        print(f"Tekrarlanan tarih (son değer kullanıldı): {duplicate_count}")
+    print(f"Başarıyla güncellenen: {updated_count} tarih ({updated_rows} satır)")
+    print(f"Veritabanında bulunamayan: {not_found_count}")
+    print(f"Hata alan: {error_count}")
+    if total_records:
+        print(f"Başarı oranı: {(updated_count/total_records)*100:.1f}%")
+    
+    return updated_count, not_found_count, error_count
+
+def update_all(df, mode=UPDATE_MODE):
+    """Seçilen moda göre (bulk/batch) güncelleme yap"""
+    if mode == "bulk":
+        return update_all_bulk(df)
+    return update_all_in_batches(df)
 
 def verify_updates(df):
     """Güncellemeleri doğrula"""
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        print(f"\n=== DOĞRULAMA ===")
-        
-        # TLREF'i güncellenmiş kayıtları say
-        cur.execute("""
-            SELECT COUNT(*) 
-            FROM cash_flow_analysis 
-            WHERE tlref_faiz IS NOT NULL AND tlref_faiz > 0
-        """)
-        
-        updated_count = cur.fetchone()[0]
-        print(f"TLREF faizi olan kayıt sayısı: {updated_count}")
-        
-        # Son 5 güncellemeyi göster
-        cur.execute("""
-            SELECT tarih, tlref_faiz, tlref_faiz_kazanci, anapara
-            FROM cash_flow_analysis 
-            WHERE tlref_faiz IS NOT NULL 
-            ORDER BY tarih DESC 
-            LIMIT 5
-        """)
-        
-        recent_updates = cur.fetchall()
-        print(f"\nSon 5 güncellenmiş kayıt:")
-        for record in recent_updates:
-            tarih, tlref_faiz, kazanc, anapara = record
-            print(f"  {tarih}: TLREF %{tlref_faiz:.6f} | Anapara: {anapara:,.0f} | Kazanç: {kazanc:,.2f}")
-        
-        cur.close()
-        conn.close()
+        with transaction() as cur:
+            print(f"\n=== DOĞRULAMA ===")
+            
+            # TLREF'i güncellenmiş kayıtları say
+            cur.execute("""
+                SELECT COUNT(*) 
+                FROM cash_flow_analysis 
+                WHERE tlref_faiz IS NOT NULL AND tlref_faiz > 0
+            """)
+            
+            updated_count = cur.fetchone()[0]
+            print(f"TLREF faizi olan kayıt sayısı: {updated_count}")
+            
+            # Son 5 güncellemeyi göster
+            cur.execute("""
+                SELECT tarih, tlref_faiz, tlref_faiz_kazanci, anapara
+                FROM cash_flow_analysis 
+                WHERE tlref_faiz IS NOT NULL 
+                ORDER BY tarih DESC 
+                LIMIT 5
+            """)
+            
+            recent_updates = cur.fetchall()
+            print(f"\nSon 5 güncellenmiş kayıt:")
+            for record in recent_updates:
+                tarih, tlref_faiz, kazanc, anapara = record
+                print(f"  {tarih}: TLREF %{tlref_faiz:.6f} | Anapara: {anapara:,.0f} | Kazanç: {kazanc:,.2f}")
         
     except Exception as e:
         print(f"Doğrulama hatası: {e}")
@@ -245,45 +352,31 @@ def save_to_csv(df):
 def main():
     print("=== Batch TLREF İşleyici ===")
     print(f"Batch boyutu: {BATCH_SIZE} kayıt")
+    print("(Etkileşimsiz kullanım: python tlref_cli.py load|incremental --target cash-flow)")
     print()
     
-    # 1. Excel dosyasını oku
-    print("1. Excel dosyası okunuyor...")
-    df = read_excel_tlref()
-    
-    if df is None:
-        print("Excel dosyası okunamadı. İşlem durduruluyor.")
-        return
-    
-    # 2. Veri özeti
-    print(f"\n2. Veri özeti:")
-    print(f"   Toplam kayıt: {len(df)}")
-    print(f"   En eski tarih: {df['Tarih'].min().strftime('%d.%m.%Y')}")
-    print(f"   En yeni tarih: {df['Tarih'].max().strftime('%d.%m.%Y')}")
-    print(f"   TLREF aralığı: {df['TLREF'].min():.4f} - {df['TLREF'].max():.4f}")
-    
-    # 3. CSV kaydet
-    print("\n3. CSV dosyasına kaydediliyor...")
-    save_to_csv(df)
-    
-    # 4. İşlem seçeneği
-    print(f"\n4. İşlem seçenekleri:")
-    print(f"1. Tüm veriyi batch'ler halinde güncelle ({len(df)} kayıt)")
-    print(f"2. Sadece CSV kaydet, veritabanı güncelleme yapma")
-    print(f"3. İptal")
+    # İşlem seçeneği
+    print(f"İşlem seçenekleri:")
+    print(f"1. Tüm veriyi güncelle")
+    print(f"2. Sadece yeni/değişen tarihleri güncelle (artımlı)")
+    print(f"3. Sadece CSV kaydet, veritabanı güncelleme yapma")
+    print(f"4. İptal")
     
     try:
-        choice = input("\nSeçiminizi yapın (1/2/3): ")
+        choice = input("\nSeçiminizi yapın (1/2/3/4): ")
         
         if choice == "1":
-            print(f"\n5. Batch güncelleme başlıyor...")
-            update_all_in_batches(df)
-            
-            print(f"\n6. Doğrulama yapılıyor...")
-            verify_updates(df)
+            if tlref_cli.main(["load", "--target", "cash-flow", "--save-csv"]) == 0:
+                tlref_cli.main(["verify", "--target", "cash-flow"])
             
         elif choice == "2":
-            print("Sadece CSV kaydedildi, veritabanı güncellenmedi.")
+            if tlref_cli.main(["incremental", "--target", "cash-flow"]) == 0:
+                tlref_cli.main(["verify", "--target", "cash-flow"])
+            
+        elif choice == "3":
+            df = read_excel_tlref()
+            if df is not None:
+                save_to_csv(df)
             
         else:
             print("İşlem iptal edildi.")
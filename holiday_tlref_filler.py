@@ -1,33 +1,36 @@
-import pandas as pd
-import psycopg2
-from datetime import datetime, timedelta
-import time
+from datetime import timedelta
+
+import tlref_cli
+import tlref_metrics
+from cash_flow_rollups import refresh_rollups
+from tlref_calendar import load_calendar
+from tlref_db import transaction
+from tlref_series import TlrefSeries
 
 # -------------------------------
 # AYARLAR
 # -------------------------------
-DB_CONFIG = {
-    "host":"192.168.182.3","dbname":"tmks-ftp","user":"postgres","password":"postgres.db!"
-}
+LOOKBACK_DAYS = 10  # Önceki işgünü aranırken en fazla kaç gün geriye gidilsin
+FILL_MODE = "bulk"  # "bulk": tek SQL ile doldur, "row": eski satır satır yol
+
+def get_missing_tlref_dates(start_date=None, end_date=None, raise_errors=False):
+    """TLREF faizi olmayan tarihleri bul (aralık verilirse sadece o aralıkta)
 
-def get_missing_tlref_dates():
-    """TLREF faizi olmayan tarihleri bul"""
+    raise_errors ile hatalar yutulmak yerine çağırana iletilir (cron/CLI çıkış kodu için).
+    """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        # TLREF faizi olmayan kayıtları bul
-        cur.execute("""
-            SELECT tarih, anapara
-            FROM cash_flow_analysis 
-            WHERE tlref_faiz IS NULL 
-            ORDER BY tarih
-        """)
-        
-        missing_dates = cur.fetchall()
-        
-        cur.close()
-        conn.close()
+        with transaction() as cur:
+            # TLREF faizi olmayan kayıtları bul
+            cur.execute("""
+                SELECT tarih, anapara
+                FROM cash_flow_analysis 
+                WHERE tlref_faiz IS NULL 
+                AND (%s::date IS NULL OR tarih >= %s)
+                AND (%s::date IS NULL OR tarih <= %s)
+                ORDER BY tarih
+            """, (start_date, start_date, end_date, end_date))
+            
+            missing_dates = cur.fetchall()
         
         print(f"TLREF faizi olmayan {len(missing_dates)} tarih bulundu:")
         for date_val, anapara in missing_dates[:10]:  # İlk 10'unu göster
@@ -37,47 +40,52 @@ def get_missing_tlref_dates():
             print(f"  ... ve {len(missing_dates) - 10} tane daha")
             
         return missing_dates
-        
+    
     except Exception as e:
         print(f"Eksik tarihleri alma hatası: {e}")
+        if raise_errors:
+            raise
         return []
 
-def find_previous_workday_tlref(target_date):
-    """Belirli bir tarih için önceki işgününün TLREF değerini bul"""
+def find_previous_workday_tlref(target_date, series=None, calendar=None):
+    """Belirli bir tarih için önceki işgününün TLREF değerini bul (series verilirse bellekten)
+
+    Takvim verilirse önce doğrudan takvimdeki önceki işgününe bakılır; o gün de boşsa
+    pencere içindeki en yakın dolu güne düşülür.
+    """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
+        if series is not None:
+            if calendar is not None:
+                source_date = calendar.previous_business_day(target_date)
+                source_value = series.get(source_date) if source_date is not None else None
+                if source_value is not None and (target_date - source_date).days <= LOOKBACK_DAYS:
+                    return source_date, source_value
+            return series.asof(target_date, LOOKBACK_DAYS, strict=True)
         
-        # Önceki işgününün TLREF değerini ara (maksimum 10 gün geriye)
-        search_date = target_date
-        for i in range(10):
-            search_date = search_date - timedelta(days=1)
-            
-            # Bu tarihte TLREF değeri var mı?
+        with transaction() as cur:
+            # Önceki işgününün TLREF değerini tek sorguda ara (maksimum 10 gün geriye)
             cur.execute("""
-                SELECT tlref_faiz 
+                SELECT tarih, tlref_faiz 
                 FROM cash_flow_analysis 
-                WHERE tarih = %s AND tlref_faiz IS NOT NULL
-            """, (search_date,))
+                WHERE tarih < %s AND tarih >= %s AND tlref_faiz IS NOT NULL
+                ORDER BY tarih DESC
+                LIMIT 1
+            """, (target_date, target_date - timedelta(days=LOOKBACK_DAYS)))
             
             result = cur.fetchone()
-            if result:
-                tlref_value = float(result[0])
-                cur.close()
-                conn.close()
-                return search_date, tlref_value
         
-        cur.close()
-        conn.close()
+        if result:
+            return result[0], float(result[1])
         return None, None
         
     except Exception as e:
         print(f"Önceki işgünü TLREF arama hatası: {e}")
         return None, None
 
-def fill_holiday_tlref():
+@tlref_metrics.stage("holiday_fill")
+def fill_holiday_tlref(start_date=None, end_date=None, raise_errors=False):
     """Tatil günlerini önceki işgününün TLREF değeri ile doldur"""
-    missing_dates = get_missing_tlref_dates()
+    missing_dates = get_missing_tlref_dates(start_date, end_date, raise_errors)
     
     if not missing_dates:
         print("Tüm tarihlerde TLREF değeri mevcut.")
@@ -86,88 +94,195 @@ def fill_holiday_tlref():
     print(f"\n{len(missing_dates)} eksik tarih için önceki işgünü TLREF değerleri aranıyor...")
     
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
+        # Kaynak değerler tek sorguda okunur; güncellenen satırlar kaynak yapılmaz
+        dates = [date_val for date_val, _ in missing_dates if date_val is not None]
+        series = TlrefSeries.from_cash_flow(min(dates) - timedelta(days=LOOKBACK_DAYS), max(dates))
+        calendar = load_calendar(min(dates), max(dates))
+        
+        with transaction() as cur:
+            updated_dates = []
+            not_found_dates = set()
+            
+            for date_val, anapara in missing_dates:
+                # Önceki işgününün TLREF değerini bul
+                prev_date, prev_tlref = find_previous_workday_tlref(date_val, series, calendar)
+                
+                if prev_tlref is not None:
+                    # Bu tarih için TLREF değerini güncelle
+                    anapara_float = float(anapara) if anapara else 0
+                    
+                    cur.execute("""
+                        UPDATE cash_flow_analysis
+                        SET tlref_faiz = %s,
+                            tlref_faiz_kazanci = (%s * %s / 365.0)
+                        WHERE tarih = %s
+                    """, (prev_tlref, prev_tlref, anapara_float, date_val))
+                    
+                    if cur.rowcount > 0:
+                        updated_dates.append(date_val)
+                        tlref_metrics.count("tlref_rows_total", cur.rowcount, op="holiday_fill")
+                        faiz_kazanci = (prev_tlref * anapara_float) / 365.0
+                        print(f"  ✓ {date_val}: TLREF %{prev_tlref:.6f} ({prev_date} tarihinden) | Kazanç: {faiz_kazanci:,.2f}")
+                    
+                else:
+                    not_found_dates.add(date_val)
+                    print(f"  ⚠ {date_val}: Önceki işgünü TLREF değeri bulunamadı")
+            
+            refresh_rollups(cur, updated_dates)
+        
+        # Aynı tarihte birden fazla satır olabilir; toplu yoldaki gibi tarih sayılır
+        print(f"\n=== TATİL GÜNLERİ DOLDURMA SONUCU ===")
+        print(f"Güncellenene tarih: {len(set(updated_dates))}")
+        print(f"Bulunamayan tarih: {len(not_found_dates)}")
+    
+    except Exception as e:
+        print(f"Tatil günleri doldurma hatası: {e}")
+        if raise_errors:
+            raise
+
+@tlref_metrics.stage("holiday_fill")
+def fill_holiday_tlref_bulk(start_date=None, end_date=None, raise_errors=False):
+    """Tatil günlerini tek bir set-based UPDATE ile önceki işgünü TLREF değeri ile doldur"""
+    try:
+        with transaction() as cur:
+            cur.execute("""
+                SELECT DISTINCT tarih
+                FROM cash_flow_analysis
+                WHERE tlref_faiz IS NULL AND tarih IS NOT NULL
+                AND (%s::date IS NULL OR tarih >= %s)
+                AND (%s::date IS NULL OR tarih <= %s)
+            """, (start_date, start_date, end_date, end_date))
+            gap_dates = [row[0] for row in cur.fetchall()]
+            
+            # Her eksik tarihin kaynağı takvimdeki önceki işgünü (vektörel)
+            source_dates = []
+            if gap_dates:
+                calendar = load_calendar(min(gap_dates), max(gap_dates), cur)
+                source_dates = calendar.previous_business_days(gap_dates).tolist()
+            
+            # Kaynak günün değeri tek eşitlik aramasıyla okunur; o gün de boşsa pencere içindeki
+            # en yakın dolu güne LATERAL ile düşülür. Bulunanlar tek UPDATE ile güncellenir.
+            # Kaynaklar güncelleme öncesi anlık görüntüden okunur; satır satır yoldaki gibi
+            # doldurulan günler zincirlenmez.
+            cur.execute("""
+                WITH gaps AS (
+                    SELECT g.tarih, g.satir_sayisi,
+                           COALESCE(exact.tarih, near.tarih) AS kaynak_tarih,
+                           COALESCE(exact.tlref_faiz, near.tlref_faiz) AS tlref_faiz
+                    FROM (
+                        SELECT c.tarih, k.kaynak, COUNT(*) AS satir_sayisi
+                        FROM cash_flow_analysis c
+                        JOIN unnest(%s::date[], %s::date[]) AS k(tarih, kaynak) ON k.tarih = c.tarih
+                        WHERE c.tlref_faiz IS NULL
+                        GROUP BY c.tarih, k.kaynak
+                    ) g
+                    LEFT JOIN LATERAL (
+                        SELECT s.tarih, s.tlref_faiz
+                        FROM cash_flow_analysis s
+                        WHERE s.tarih = g.kaynak
+                          AND s.tarih >= g.tarih - %s
+                          AND s.tlref_faiz IS NOT NULL
+                        LIMIT 1
+                    ) exact ON TRUE
+                    LEFT JOIN LATERAL (
+                        SELECT s.tarih, s.tlref_faiz
+                        FROM cash_flow_analysis s
+                        WHERE exact.tarih IS NULL
+                          AND s.tarih < g.tarih
+                          AND s.tarih >= g.tarih - %s
+                          AND s.tlref_faiz IS NOT NULL
+                        ORDER BY s.tarih DESC
+                        LIMIT 1
+                    ) near ON TRUE
+                ),
+                updated AS (
+                    UPDATE cash_flow_analysis cfa
+                    SET tlref_faiz = g.tlref_faiz,
+                        tlref_faiz_kazanci = (g.tlref_faiz * COALESCE(cfa.anapara, 0) / 365.0)
+                    FROM gaps g
+                    WHERE cfa.tarih = g.tarih
+                      AND cfa.tlref_faiz IS NULL
+                      AND g.tlref_faiz IS NOT NULL
+                    RETURNING cfa.tarih, cfa.tlref_faiz_kazanci
+                )
+                SELECT g.tarih, g.kaynak_tarih, g.tlref_faiz, g.satir_sayisi,
+                       COUNT(u.tarih), COALESCE(SUM(u.tlref_faiz_kazanci), 0)
+                FROM gaps g
+                LEFT JOIN updated u ON u.tarih = g.tarih
+                GROUP BY g.tarih, g.kaynak_tarih, g.tlref_faiz, g.satir_sayisi
+                ORDER BY g.tarih
+            """, (gap_dates, source_dates, LOOKBACK_DAYS, LOOKBACK_DAYS))
+            
+            report = cur.fetchall()
+            refresh_rollups(cur, [row[0] for row in report if row[4]])
+        
+        if not report:
+            print("Tüm tarihlerde TLREF değeri mevcut.")
+            return []
         
         updated_count = 0
         not_found_count = 0
+        updated_row_count = 0
         
-        for date_val, anapara in missing_dates:
-            # Önceki işgününün TLREF değerini bul
-            prev_date, prev_tlref = find_previous_workday_tlref(date_val)
-            
+        # Satır satır yoldaki gibi tarih sayılır; güncellenen satır toplamı ayrıca raporlanır
+        for date_val, prev_date, prev_tlref, row_count, updated_rows, faiz_kazanci in report:
             if prev_tlref is not None:
-                # Bu tarih için TLREF değerini güncelle
-                anapara_float = float(anapara) if anapara else 0
-                
-                cur.execute("""
-                    UPDATE cash_flow_analysis
-                    SET tlref_faiz = %s,
-                        tlref_faiz_kazanci = (%s * %s / 365.0)
-                    WHERE tarih = %s
-                """, (prev_tlref, prev_tlref, anapara_float, date_val))
-                
-                if cur.rowcount > 0:
-                    updated_count += 1
-                    faiz_kazanci = (prev_tlref * anapara_float) / 365.0
-                    print(f"  ✓ {date_val}: TLREF %{prev_tlref:.6f} ({prev_date} tarihinden) | Kazanç: {faiz_kazanci:,.2f}")
-                
+                updated_count += 1
+                updated_row_count += updated_rows
+                print(f"  ✓ {date_val}: TLREF %{float(prev_tlref):.6f} ({prev_date} tarihinden) | Kazanç: {float(faiz_kazanci):,.2f}")
             else:
                 not_found_count += 1
                 print(f"  ⚠ {date_val}: Önceki işgünü TLREF değeri bulunamadı")
         
-        # Tüm değişiklikleri commit et
-        conn.commit()
-        cur.close()
-        conn.close()
-        
+        tlref_metrics.count("tlref_rows_total", updated_row_count, op="holiday_fill")
         print(f"\n=== TATİL GÜNLERİ DOLDURMA SONUCU ===")
         print(f"Güncellenene tarih: {updated_count}")
         print(f"Bulunamayan tarih: {not_found_count}")
+        print(f"Güncellenen satır: {updated_row_count}")
         
+        return [(date_val, prev_date, prev_tlref) for date_val, prev_date, prev_tlref, *_ in report]
+    
     except Exception as e:
-        print(f"Tatil günleri doldurma hatası: {e}")
+        print(f"Tatil günleri toplu doldurma hatası: {e}")
+        if raise_errors:
+            raise
+        return []
 
 def check_weekends_and_holidays():
     """Hafta sonları ve tatil günlerini kontrol et"""
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        # Hafta sonlarını kontrol et
-        cur.execute("""
-            SELECT 
-                tarih,
-                EXTRACT(DOW FROM tarih) as day_of_week,
-                tlref_faiz,
-                anapara
-            FROM cash_flow_analysis 
-            WHERE EXTRACT(DOW FROM tarih) IN (0, 6)  -- Pazar(0) ve Cumartesi(6)
-            ORDER BY tarih
-            LIMIT 10
-        """)
-        
-        weekends = cur.fetchall()
-        
-        print("HAFTA SONU TARİHLERİ:")
-        print("-" * 60)
-        for date_val, dow, tlref, anapara in weekends:
-            day_name = "Pazar" if dow == 0 else "Cumartesi"
-            tlref_str = f"%{tlref:.6f}" if tlref else "NULL"
-            print(f"{date_val} ({day_name}): TLREF={tlref_str} | Anapara={anapara:,.0f}")
-        
-        # TLREF faizi olmayan günleri kontrol et
-        cur.execute("""
-            SELECT COUNT(*) 
-            FROM cash_flow_analysis 
-            WHERE tlref_faiz IS NULL
-        """)
-        
-        null_count = cur.fetchone()[0]
-        print(f"\nToplam TLREF faizi olmayan kayıt: {null_count}")
-        
-        cur.close()
-        conn.close()
+        with transaction() as cur:
+            # Hafta sonlarını kontrol et
+            cur.execute("""
+                SELECT 
+                    tarih,
+                    EXTRACT(DOW FROM tarih) as day_of_week,
+                    tlref_faiz,
+                    anapara
+                FROM cash_flow_analysis 
+                WHERE EXTRACT(DOW FROM tarih) IN (0, 6)  -- Pazar(0) ve Cumartesi(6)
+                ORDER BY tarih
+                LIMIT 10
+            """)
+            
+            weekends = cur.fetchall()
+            
+            print("HAFTA SONU TARİHLERİ:")
+            print("-" * 60)
+            for date_val, dow, tlref, anapara in weekends:
+                day_name = "Pazar" if dow == 0 else "Cumartesi"
+                tlref_str = f"%{tlref:.6f}" if tlref else "NULL"
+                print(f"{date_val} ({day_name}): TLREF={tlref_str} | Anapara={anapara:,.0f}")
+            
+            # TLREF faizi olmayan günleri kontrol et
+            cur.execute("""
+                SELECT COUNT(*) 
+                FROM cash_flow_analysis 
+                WHERE tlref_faiz IS NULL
+            """)
+            
+            null_count = cur.fetchone()[0]
+            print(f"\nToplam TLREF faizi olmayan kayıt: {null_count}")
         
     except Exception as e:
         print(f"Hafta sonu kontrol hatası: {e}")
@@ -175,46 +290,41 @@ def check_weekends_and_holidays():
 def verify_tlref_coverage():
     """TLREF kapsamını doğrula"""
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        # Genel istatistikler
-        cur.execute("""
-            SELECT 
-                COUNT(*) as toplam,
-                COUNT(tlref_faiz) as tlref_var,
-                MIN(tarih) as min_tarih,
-                MAX(tarih) as max_tarih
-            FROM cash_flow_analysis
-        """)
-        
-        stats = cur.fetchone()
-        toplam, tlref_var, min_tarih, max_tarih = stats
-        
-        print("TLREF KAPSAM RAPORU:")
-        print("=" * 50)
-        print(f"Toplam kayıt: {toplam}")
-        print(f"TLREF faizi olan: {tlref_var}")
-        print(f"TLREF faizi olmayan: {toplam - tlref_var}")
-        print(f"Kapsam oranı: %{(tlref_var/toplam)*100:.1f}")
-        print(f"Tarih aralığı: {min_tarih} - {max_tarih}")
-        
-        # En son güncellenmiş kayıtları göster
-        cur.execute("""
-            SELECT tarih, tlref_faiz, tlref_faiz_kazanci, anapara
-            FROM cash_flow_analysis 
-            WHERE tlref_faiz IS NOT NULL 
-            ORDER BY tarih DESC 
-            LIMIT 5
-        """)
-        
-        recent = cur.fetchall()
-        print(f"\nEn son TLREF kayıtları:")
-        for date_val, tlref, kazanc, anapara in recent:
-            print(f"  {date_val}: %{tlref:.6f} | Kazanç: {kazanc:,.2f} | Anapara: {anapara:,.0f}")
-        
-        cur.close()
-        conn.close()
+        with transaction() as cur:
+            # Genel istatistikler
+            cur.execute("""
+                SELECT 
+                    COUNT(*) as toplam,
+                    COUNT(tlref_faiz) as tlref_var,
+                    MIN(tarih) as min_tarih,
+                    MAX(tarih) as max_tarih
+                FROM cash_flow_analysis
+            """)
+            
+            stats = cur.fetchone()
+            toplam, tlref_var, min_tarih, max_tarih = stats
+            
+            print("TLREF KAPSAM RAPORU:")
+            print("=" * 50)
+            print(f"Toplam kayıt: {toplam}")
+            print(f"TLREF faizi olan: {tlref_var}")
+            print(f"TLREF faizi olmayan: {toplam - tlref_var}")
+            print(f"Kapsam oranı: %{(tlref_var/toplam)*100:.1f}")
+            print(f"Tarih aralığı: {min_tarih} - {max_tarih}")
+            
+            # En son güncellenmiş kayıtları göster
+            cur.execute("""
+                SELECT tarih, tlref_faiz, tlref_faiz_kazanci, anapara
+                FROM cash_flow_analysis 
+                WHERE tlref_faiz IS NOT NULL 
+                ORDER BY tarih DESC 
+                LIMIT 5
+            """)
+            
+            recent = cur.fetchall()
+            print(f"\nEn son TLREF kayıtları:")
+            for date_val, tlref, kazanc, anapara in recent:
+                print(f"  {date_val}: %{tlref:.6f} | Kazanç: {kazanc:,.2f} | Anapara: {anapara:,.0f}")
         
     except Exception as e:
         print(f"Doğrulama hatası: {e}")
@@ -222,18 +332,14 @@ def verify_tlref_coverage():
 def main():
     print("=== Tatil Günleri TLREF Doldurma ===")
     print("Eksik tarihlere önceki işgününün TLREF değeri uygulanacak")
+    print("(Etkileşimsiz kullanım: python tlref_cli.py fill-holidays|verify --target holidays)")
     print()
     
-    # 1. Mevcut durumu kontrol et
-    print("1. Mevcut TLREF durumu kontrol ediliyor...")
-    verify_tlref_coverage()
+    # Mevcut durumu kontrol et
+    tlref_cli.main(["verify", "--target", "holidays"])
     
-    # 2. Hafta sonları ve tatilleri kontrol et
-    print("\n2. Hafta sonları kontrol ediliyor...")
-    check_weekends_and_holidays()
-    
-    # 3. İşlem seçeneği
-    print(f"\n3. İşlem seçenekleri:")
+    # İşlem seçeneği
+    print(f"\nİşlem seçenekleri:")
     print(f"1. Tatil günlerini önceki işgünü TLREF ile doldur")
     print(f"2. Sadece kontrol yap, güncelleme yapma")
     print(f"3. İptal")
@@ -242,11 +348,9 @@ def main():
         choice = input("\nSeçiminizi yapın (1/2/3): ")
         
         if choice == "1":
-            print(f"\n4. Tatil günleri dolduruluyor...")
-            fill_holiday_tlref()
-            
-            print(f"\n5. Güncellenmiş durum kontrol ediliyor...")
-            verify_tlref_coverage()
+            if tlref_cli.main(["fill-holidays"]) == 0:
+                print(f"\nGüncellenmiş durum kontrol ediliyor...")
+                verify_tlref_coverage()
             
         elif choice == "2":
             print("Sadece kontrol yapıldı, güncelleme yapılmadı.")
@@ -0,0 +1,227 @@
+"""evds_client için yerel stub EVDS sunucusuna karşı testler
+
+Kullanım:
+    python -m pytest -q tests
+"""
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import evds_client
+from evds_cache import EvdsCache
+from evds_client import SERIES_CODES, EvdsClient, TokenBucket, split_date_range
+from evds_stub import DEFAULT_SERIES, EvdsStubServer, synthetic_rate
+
+
+def expected_values(start_date, end_date):
+    """Stub'ın aralık için döndürdüğü hafta içi değerleri"""
+    days = (start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1))
+    return {d: synthetic_rate(d) for d in days if d.weekday() < 5}
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**kwargs):
+        server = EvdsStubServer(**kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def make_client(tmp_path):
+    clients = []
+
+    def make(server, **kwargs):
+        kwargs.setdefault("state_file", str(tmp_path / "evds_state.json"))
+        kwargs.setdefault("backoff", 0)
+        client = EvdsClient(api_key="test", base_url=server.base_url, use_cache=False, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+# -------------------------------
+# Tek aralık, series yedeği, tekrar deneme
+# -------------------------------
+def test_fetch_range_single_request(stub, make_client):
+    server = stub()
+    client = make_client(server)
+    start, end = date(2024, 1, 1), date(2024, 3, 31)
+
+    assert client.fetch_range(start, end) == expected_values(start, end)
+    assert len(server.request_log) == 1
+    assert server.request_log[0]["startDate"] == "01-01-2024"
+    assert server.request_log[0]["endDate"] == "31-03-2024"
+
+
+def test_series_fallback_is_remembered(stub, make_client, tmp_path):
+    fallback = SERIES_CODES[-1]
+    server = stub(series_codes=(fallback,))
+    start, end = date(2024, 5, 1), date(2024, 5, 31)
+
+    assert make_client(server).fetch_range(start, end) == expected_values(start, end)
+    assert [params["series"] for params in server.request_log] == SERIES_CODES
+    with open(tmp_path / "evds_state.json", encoding="utf-8") as f:
+        assert json.load(f) == {"last_series_code": fallback}
+
+    # Yeni istemci durum dosyasından çalışan kodu okur ve doğrudan onu dener
+    server.request_log.clear()
+    client = make_client(server)
+    assert client.ordered_series_codes()[0] == fallback
+    assert client.fetch_range(start, end) == expected_values(start, end)
+    assert [params["series"] for params in server.request_log] == [fallback]
+
+
+def test_recovers_after_503(stub, make_client):
+    server = stub(fail_first=2)
+    client = make_client(server, retries=3)
+    start, end = date(2024, 2, 1), date(2024, 2, 29)
+
+    assert client.fetch_range(start, end) == expected_values(start, end)
+    # İki 503 HTTPAdapter'daki Retry ile aynı series kodunda tekrar denenir
+    assert len(server.request_log) == 3
+    assert {params["series"] for params in server.request_log} == {DEFAULT_SERIES}
+
+
+def test_empty_response_returns_nothing(stub, make_client):
+    server = stub(series_codes=())
+    client = make_client(server)
+    start, end = date(2024, 1, 1), date(2024, 1, 31)
+
+    assert client.fetch_series(DEFAULT_SERIES, start, end) == {}
+    assert client.fetch_range(start, end) == {}
+    # Boş cevap hata değildir ama tüm kodlar denenir ve hiçbiri hatırlanmaz
+    assert len(server.request_log) == 1 + len(SERIES_CODES)
+    assert client.last_series_code is None
+
+
+# -------------------------------
+# Eşzamanlı parçalı çekme, hız sınırı, önbellek
+# -------------------------------
+def test_split_date_range_covers_range_without_overlap():
+    start, end = date(2022, 1, 1), date(2024, 12, 31)
+    chunks = split_date_range(start, end, 31)
+
+    assert chunks[0][0] == start and chunks[-1][1] == end
+    assert all((chunk_end - chunk_start).days < 31 for chunk_start, chunk_end in chunks)
+    assert all(nxt[0] == prev[1] + timedelta(days=1) for prev, nxt in zip(chunks, chunks[1:]))
+
+
+def test_fetch_windows_merges_chunks_over_years(stub, make_client):
+    server = stub()
+    client = make_client(server)
+    start, end = date(2022, 1, 1), date(2024, 12, 31)
+
+    values, stats = client.fetch_range_concurrent(start, end, chunk_days=31, max_workers=4, rate_limit=1000)
+
+    assert values == expected_values(start, end)
+    assert list(values) == sorted(values)
+    assert len(stats) == len(server.request_log) == len(split_date_range(start, end, 31))
+    assert [(st["start"], st["end"]) for st in stats] == split_date_range(start, end, 31)
+    assert not any(st.get("error") for st in stats)
+
+
+def test_failing_chunk_is_retried_without_losing_others(stub, make_client, monkeypatch):
+    monkeypatch.setattr(evds_client, "RETRY_BACKOFF", 0)
+    # HTTPAdapter tekrar denemesi kapalı: ilk istek 503 ile parçayı başarısız kılar
+    server = stub(fail_first=1)
+    client = make_client(server, retries=0)
+    start, end = date(2024, 1, 1), date(2024, 6, 30)
+
+    values, stats = client.fetch_range_concurrent(start, end, chunk_days=31, max_workers=3, rate_limit=1000)
+
+    assert values == expected_values(start, end)
+    assert sorted(st["attempts"] for st in stats) == [1] * (len(stats) - 1) + [2]
+    assert all(st["rows"] > 0 and not st.get("error") for st in stats)
+
+
+def test_chunk_gives_up_after_retries(stub, make_client, monkeypatch):
+    monkeypatch.setattr(evds_client, "RETRY_BACKOFF", 0)
+    server = stub(fail_first=1000)
+    client = make_client(server, retries=0)
+
+    values, stats = client.fetch_range_concurrent(date(2024, 1, 1), date(2024, 1, 31), rate_limit=1000,
+                                             retries=2)
+
+    assert values == {}
+    assert stats[0]["error"] and stats[0]["attempts"] == 3
+    assert len(server.request_log) == 3 * len(SERIES_CODES)
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=20, capacity=1)
+    started = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    # İlk token hazır, kalan 10 token saniyede 20 hızla üretilir
+    assert time.monotonic() - started >= 0.45
+
+
+def test_fetch_windows_respects_rate_limit(stub, make_client):
+    server = stub()
+    client = make_client(server)
+
+    started = time.monotonic()
+    _, stats = client.fetch_range_concurrent(date(2024, 1, 1), date(2024, 12, 31), chunk_days=10,
+                                             max_workers=8, rate_limit=20)
+
+    # 37 parça: ilk 20 istek kovadan, kalan 17 istek saniyede 20 hızla
+    assert len(stats) == len(server.request_log) == 37
+    assert time.monotonic() - started >= 0.8
+
+
+def test_cache_hit_on_repeated_fetch(stub, tmp_path):
+    server = stub()
+    cache = EvdsCache(str(tmp_path / "evds_cache.sqlite3"))
+    client = EvdsClient(api_key="test", base_url=server.base_url, cache=cache,
+                        state_file=str(tmp_path / "evds_state.json"), backoff=0)
+    start, end = date(2023, 1, 1), date(2023, 12, 31)
+    try:
+        first, _ = client.fetch_range_concurrent(start, end, chunk_days=31, rate_limit=1000)
+        requests_after_first = len(server.request_log)
+        second, _ = client.fetch_range_concurrent(start, end, chunk_days=31, rate_limit=1000)
+
+        assert first == second == expected_values(start, end)
+        assert len(server.request_log) == requests_after_first
+        assert cache.hits == len(split_date_range(start, end, 31))
+
+        # Farklı pencere önbellekte yok
+        client.fetch_range(date(2023, 2, 1), date(2023, 2, 28))
+        assert len(server.request_log) == requests_after_first + 1
+        assert cache.stats()["total_misses"] == cache.misses
+    finally:
+        client.close()
+        cache.close()
+
+
+def test_empty_response_is_not_cached(stub, tmp_path):
+    server = stub(series_codes=())
+    cache = EvdsCache(str(tmp_path / "evds_cache.sqlite3"))
+    client = EvdsClient(api_key="test", base_url=server.base_url, cache=cache,
+                        state_file=str(tmp_path / "evds_state.json"), backoff=0)
+    start, end = date(2023, 1, 1), date(2023, 1, 31)
+    try:
+        client.fetch_series(DEFAULT_SERIES, start, end)
+        client.fetch_series(DEFAULT_SERIES, start, end)
+        assert len(server.request_log) == 2
+        assert cache.hits == 0 and cache.stats()["entries"] == 0
+    finally:
+        client.close()
+        cache.close()
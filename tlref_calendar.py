@@ -0,0 +1,399 @@
+"""Türkiye işgünü takvimi (resmi tatiller, dini bayramlar, yarım günler, veritabanı istisnaları)
+
+TLREF hafta sonları ve resmi tatillerde yayımlanmaz. Takvim yıl aralığı için bir kez
+hesaplanır: her gün için işgünü bayrağı ve "o gün veya öncesindeki son işgünü" indeksi
+tutulur, tekil sorgular O(1), çoklu sorgular NumPy ile vektörel yapılır. Dini bayramlar
+tablolu Hicri takvimle hesaplanır, Diyanet'in ilan ettiği tarihler düzeltme tablosunda
+tutulur; ek kapanışlar/açılışlar tlref_takvim_istisnalari tablosundan okunur.
+
+Düzeltme tablosunda olmayan yıllarda bayram tablolu takvimle tahmin edilir ve uyarı
+loglanır. Tahmin bir gün kayabileceğinden tahmini bayramın ilk ve son günü ile bunlara
+bitişik günler kesin sayılmaz: tatil gibi taşınır ama EVDS'e yine de sorulur.
+
+Arife günleri (28 Ekim, bayram arifeleri) yarım gündür; piyasa açık olduğundan işgünü sayılır.
+
+Kullanım:
+    python tlref_calendar.py holidays --year 2025
+    python tlref_calendar.py set --date 2025-12-31 --closed --note "Piyasa kapalı"
+    python tlref_calendar.py unset --date 2025-12-31
+    python tlref_calendar.py check --start 2024-01-01 --end 2024-12-31
+"""
+import argparse
+import logging
+import math
+from array import array
+from datetime import date, timedelta
+from functools import lru_cache
+
+# Takvim günlük yolda her çalışmada kurulur; numpy sadece vektörel sorgularda içeride yüklenir
+from tlref_db import transaction
+
+# -------------------------------
+# AYARLAR
+# -------------------------------
+TABLE_NAME = "TLREF"
+OVERRIDE_TABLE = "tlref_takvim_istisnalari"
+DEFAULT_START_YEAR = 2018  # Tarih verilmezse takvimin başladığı yıl (TLREF 2019 sonunda başladı)
+
+# (ay, gün, ad, ilk geçerli yıl, yarım gün)
+FIXED_HOLIDAYS = [
+    (1, 1, "Yılbaşı", None, False),
+    (4, 23, "Ulusal Egemenlik ve Çocuk Bayramı", None, False),
+    (5, 1, "Emek ve Dayanışma Günü", 2009, False),
+    (5, 19, "Atatürk'ü Anma, Gençlik ve Spor Bayramı", None, False),
+    (7, 15, "Demokrasi ve Milli Birlik Günü", 2017, False),
+    (8, 30, "Zafer Bayramı", None, False),
+    (10, 28, "Cumhuriyet Bayramı Arifesi", None, True),
+    (10, 29, "Cumhuriyet Bayramı", None, False)
+]
+
+# (ad, Hicri ay, Hicri gün, gün sayısı); bir önceki gün arife (yarım gün)
+LUNAR_HOLIDAYS = [
+    ("Ramazan Bayramı", 10, 1, 3),
+    ("Kurban Bayramı", 12, 10, 4)
+]
+
+# Tablolu Hicri takvim gözlemden 0-1 gün sapar; ilan edilen ilk bayram günleri
+LUNAR_HOLIDAY_STARTS = {
+    "Ramazan Bayramı": {
+        2016: date(2016, 7, 5), 2017: date(2017, 6, 25),
+        2018: date(2018, 6, 15), 2019: date(2019, 6, 4), 2020: date(2020, 5, 24),
+        2021: date(2021, 5, 13), 2022: date(2022, 5, 2), 2023: date(2023, 4, 21),
+        2024: date(2024, 4, 10), 2025: date(2025, 3, 30), 2026: date(2026, 3, 20),
+        2027: date(2027, 3, 9), 2028: date(2028, 2, 26), 2029: date(2029, 2, 14),
+        2030: date(2030, 2, 4)
+    },
+    "Kurban Bayramı": {
+        2016: date(2016, 9, 12), 2017: date(2017, 9, 1),
+        2018: date(2018, 8, 21), 2019: date(2019, 8, 11), 2020: date(2020, 7, 31),
+        2021: date(2021, 7, 20), 2022: date(2022, 7, 9), 2023: date(2023, 6, 28),
+        2024: date(2024, 6, 16), 2025: date(2025, 6, 6), 2026: date(2026, 5, 27),
+        2027: date(2027, 5, 16), 2028: date(2028, 5, 5), 2029: date(2029, 4, 24),
+        2030: date(2030, 4, 13)
+    }
+}
+
+HIJRI_EPOCH_ORDINAL = date(622, 7, 19).toordinal()  # 1 Muharrem 1 (Jülyen 16 Temmuz 622)
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------
+# Tatil kuralları
+# -------------------------------
+def hijri_to_date(year, month, day):
+    """Tablolu (aritmetik) Hicri takvim tarihini miladi tarihe çevir"""
+    days = day + math.ceil(29.5 * (month - 1)) + (year - 1) * 354 + (3 + 11 * year) // 30
+    return date.fromordinal(HIJRI_EPOCH_ORDINAL + days - 1)
+
+
+@lru_cache(maxsize=None)
+def lunar_holiday_starts(name, year):
+    """Bir dini bayramın verilen miladi yıla düşen ilk günleri ve tahmini olup olmadıkları
+
+    Düzeltme tablosunda yoksa tablolu takvime düşülür; (ilk günler, tahmini) döner.
+    """
+    known = LUNAR_HOLIDAY_STARTS.get(name, {})
+    if year in known:
+        return (known[year],), False
+
+    _, month, day, _ = next(spec for spec in LUNAR_HOLIDAYS if spec[0] == name)
+    approx = int((year - 622) * 33 / 32)
+    starts = (hijri_to_date(h, month, day) for h in range(approx - 1, approx + 3))
+    starts = tuple(start for start in starts if start.year == year)
+    logger.warning(f"⚠ {year} {name} ilan edilmiş tarih tablosunda yok, tablolu takvimle tahmin edildi "
+                   f"({', '.join(map(str, starts))}); LUNAR_HOLIDAY_STARTS güncellenmeli")
+    return starts, True
+
+
+@lru_cache(maxsize=None)
+def turkish_holidays(year):
+    """Yılın resmi tatil ve yarım günleri; {tarih: (ad, yarım_gün)}"""
+    holidays = {}
+
+    def add(day, name, half_day=False):
+        # Tam gün tatil aynı güne düşen yarım günü (ör. arife) ezer
+        if day.year != year or (half_day and day in holidays):
+            return
+        holidays[day] = (name, half_day)
+
+    for month, day, name, since, half_day in FIXED_HOLIDAYS:
+        if since is None or year >= since:
+            add(date(year, month, day), name, half_day)
+
+    # Önceki yılın sonunda başlayan bayram bu yıla taşabilir
+    for name, _, _, length in LUNAR_HOLIDAYS:
+        for start in lunar_holiday_starts(name, year - 1)[0] + lunar_holiday_starts(name, year)[0]:
+            add(start - timedelta(days=1), f"{name} Arifesi", True)
+            for offset in range(length):
+                add(start + timedelta(days=offset), f"{name} ({offset + 1}. gün)")
+    return holidays
+
+
+@lru_cache(maxsize=None)
+def guessed_holiday_edges(year):
+    """Tahmini bayramların bir gün kayınca durumu değişebilecek günleri (ilk/son gün ve bitişikleri)"""
+    edges = set()
+    for name, _, _, length in LUNAR_HOLIDAYS:
+        for previous_year in (year - 1, year):
+            starts, guessed = lunar_holiday_starts(name, previous_year)
+            if not guessed:
+                continue
+            for start in starts:
+                end = start + timedelta(days=length - 1)
+                # Kayma hafta sonunu işgününe çevirmez
+                edges.update(day for day in (start - timedelta(days=1), start, end, end + timedelta(days=1))
+                             if day.year == year and day.weekday() < 5)
+    return frozenset(edges)
+
+
+# -------------------------------
+# Takvim
+# -------------------------------
+class BusinessCalendar:
+    """[start_year, end_year] için gün bazında işgünü bayrağı ve son işgünü indeksi"""
+
+    def __init__(self, start_year, end_year, overrides=()):
+        self.first = date(start_year, 1, 1)
+        self.last = date(end_year, 12, 31)
+        self.start = self.first.toordinal()
+        self.names = {}
+        self.half_days = set()
+        self.guessed = set()
+        closed = set()
+        for year in range(start_year, end_year + 1):
+            for day, (name, half_day) in turkish_holidays(year).items():
+                self.names[day] = name
+                (self.half_days if half_day else closed).add(day)
+            self.guessed.update(guessed_holiday_edges(year))
+
+        # İstisnalar (tarih, işgünü, yarım gün, açıklama) kuralların önüne geçer
+        self.overrides = {}
+        for day, is_open, half_day, note in overrides:
+            self.overrides[day] = is_open
+            self.half_days.discard(day)
+            self.guessed.discard(day)
+            if is_open and half_day:
+                self.half_days.add(day)
+            if note:
+                self.names[day] = note
+
+        size = self.last.toordinal() - self.start + 1
+        self._business = bytearray(size)
+        self._previous = array("q", bytes(8 * size))  # o gün veya öncesindeki son işgününün indeksi, yoksa -1
+        last_open = -1
+        for offset in range(size):
+            day = date.fromordinal(self.start + offset)
+            is_open = self.overrides.get(day)
+            if is_open is None:
+                is_open = day.weekday() < 5 and day not in closed
+            if is_open:
+                self._business[offset] = 1
+                last_open = offset
+            self._previous[offset] = last_open
+
+    def __repr__(self):
+        return f"BusinessCalendar({self.first} - {self.last}, {sum(self._business)} işgünü)"
+
+    def _offset(self, date_val):
+        offset = date_val.toordinal() - self.start
+        if offset < 0 or offset >= len(self._business):
+            raise ValueError(f"{date_val} takvim aralığı dışında ({self.first} - {self.last})")
+        return offset
+
+    # -------------------------------
+    # Tekil sorgular
+    # -------------------------------
+    def is_business_day(self, date_val):
+        return bool(self._business[self._offset(date_val)])
+
+    def may_be_business_day(self, date_val):
+        """İşgünü ya da tahmini bayram kenarı; EVDS'e sorulması gereken günler"""
+        return self.is_business_day(date_val) or date_val in self.guessed
+
+    def is_half_day(self, date_val):
+        return date_val in self.half_days and self.is_business_day(date_val)
+
+    def holiday_name(self, date_val):
+        """Tatil/yarım gün adı; hafta sonu ve sıradan günlerde None"""
+        return self.names.get(date_val)
+
+    def previous_business_day(self, date_val, strict=True):
+        """date_val'den (strict değilse date_val dahil) önceki son işgünü; takvimde yoksa None"""
+        offset = self._offset(date_val) - strict
+        source = self._previous[offset] if offset >= 0 else -1
+        return None if source < 0 else date.fromordinal(self.start + source)
+
+    def business_days(self, start_date, end_date):
+        return [d for d in _days(start_date, end_date) if self.is_business_day(d)]
+
+    def non_business_days(self, start_date, end_date, certain=False):
+        """Hafta sonu/tatil günleri; certain ise tahmini bayram kenarları hariç"""
+        is_open = self.may_be_business_day if certain else self.is_business_day
+        return [d for d in _days(start_date, end_date) if not is_open(d)]
+
+    # -------------------------------
+    # Vektörel sorgular
+    # -------------------------------
+    def _offsets(self, dates):
+        import numpy as np
+
+        days = np.asarray(dates).astype("datetime64[D]").astype(np.int64)
+        offsets = days + (date(1970, 1, 1).toordinal() - self.start)
+        if len(offsets) and (offsets.min() < 0 or offsets.max() >= len(self._business)):
+            raise ValueError(f"Tarihler takvim aralığı dışında ({self.first} - {self.last})")
+        return offsets
+
+    def is_business_days(self, dates):
+        """date/datetime64 dizisi için işgünü bayrakları (bool dizisi)"""
+        import numpy as np
+
+        return np.frombuffer(self._business, dtype=np.bool_)[self._offsets(dates)]
+
+    def previous_business_days(self, dates, strict=True):
+        """previous_business_day'in vektörel hali; datetime64[D] dizisi, bulunamayanlar NaT"""
+        import numpy as np
+
+        offsets = self._offsets(dates) - int(strict)
+        sources = np.full(len(offsets), -1, dtype=np.int64)
+        valid = offsets >= 0
+        sources[valid] = np.frombuffer(self._previous, dtype=np.int64)[offsets[valid]]
+        result = np.full(len(offsets), np.datetime64("NaT"), dtype="datetime64[D]")
+        found = sources >= 0
+        epoch = date(1970, 1, 1).toordinal()
+        result[found] = (self.start + sources[found] - epoch).astype("datetime64[D]")
+        return result
+
+
+def _days(start_date, end_date):
+    return [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+
+# -------------------------------
+# Veritabanı istisnaları
+# -------------------------------
+def create_override_table(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {OVERRIDE_TABLE} (
+            tarih DATE PRIMARY KEY,
+            isgunu BOOLEAN NOT NULL,
+            yarim_gun BOOLEAN NOT NULL DEFAULT FALSE,
+            aciklama VARCHAR(200),
+            guncellendi TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def load_overrides(cur, start_date=None, end_date=None):
+    """İstisna tablosundaki (tarih, işgünü, yarım gün, açıklama) satırları; tablo yoksa boş liste"""
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (OVERRIDE_TABLE,))
+    if not cur.fetchone()[0]:
+        return []
+    cur.execute(f"""
+        SELECT tarih, isgunu, yarim_gun, aciklama FROM {OVERRIDE_TABLE}
+        WHERE (%s::date IS NULL OR tarih >= %s) AND (%s::date IS NULL OR tarih <= %s)
+    """, (start_date, start_date, end_date, end_date))
+    return cur.fetchall()
+
+
+def load_calendar(start_date=None, end_date=None, cur=None):
+    """Tarih aralığını (önceki işgünü aramaları için bir yıl öncesiyle) kapsayan takvimi istisnalarla kur"""
+    start_year = DEFAULT_START_YEAR if start_date is None else start_date.year - 1
+    end_year = date.today().year + 1 if end_date is None else max(end_date.year, start_year)
+    first, last = date(start_year, 1, 1), date(end_year, 12, 31)
+    if cur is None:
+        with transaction() as cur:
+            overrides = load_overrides(cur, first, last)
+    else:
+        overrides = load_overrides(cur, first, last)
+    return BusinessCalendar(start_year, end_year, overrides)
+
+
+def set_override(cur, date_val, is_open, half_day=False, note=None):
+    create_override_table(cur)
+    cur.execute(f"""
+        INSERT INTO {OVERRIDE_TABLE} (tarih, isgunu, yarim_gun, aciklama)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (tarih) DO UPDATE SET
+            isgunu = EXCLUDED.isgunu,
+            yarim_gun = EXCLUDED.yarim_gun,
+            aciklama = EXCLUDED.aciklama,
+            guncellendi = CURRENT_TIMESTAMP
+    """, (date_val, is_open, half_day, note))
+
+
+def check_tlref(cur, calendar, start_date, end_date, table=TABLE_NAME):
+    """Takvimle çelişen TLREF satırları: (tatilde API değeri olan günler, işgününde taşınmış günler)"""
+    cur.execute(f"""
+        SELECT tarih, tasinan FROM {table}
+        WHERE tarih BETWEEN %s AND %s
+        ORDER BY tarih
+    """, (start_date, end_date))
+    rows = cur.fetchall()
+    published_on_holiday = [d for d, carried in rows if not carried and not calendar.is_business_day(d)]
+    carried_on_business_day = [d for d, carried in rows if carried and calendar.is_business_day(d)]
+    return published_on_holiday, carried_on_business_day
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    holidays_parser = sub.add_parser("holidays", help="Yılın tatil ve yarım günlerini listele")
+    holidays_parser.add_argument("--year", type=int, default=date.today().year)
+
+    set_parser = sub.add_parser("set", help="Bir gün için istisna ekle/güncelle")
+    set_parser.add_argument("--date", type=date.fromisoformat, required=True)
+    state = set_parser.add_mutually_exclusive_group(required=True)
+    state.add_argument("--closed", action="store_true", help="Piyasa kapalı (tatil)")
+    state.add_argument("--open", action="store_true", help="Piyasa açık (işgünü)")
+    set_parser.add_argument("--half-day", action="store_true", help="Yarım gün (sadece --open ile)")
+    set_parser.add_argument("--note", help="Açıklama")
+
+    unset_parser = sub.add_parser("unset", help="Bir günün istisnasını sil")
+    unset_parser.add_argument("--date", type=date.fromisoformat, required=True)
+
+    check_parser = sub.add_parser("check", help="TLREF tablosunu takvimle karşılaştır")
+    check_parser.add_argument("--start", type=date.fromisoformat, default=date(DEFAULT_START_YEAR, 1, 1))
+    check_parser.add_argument("--end", type=date.fromisoformat, default=date.today())
+
+    args = parser.parse_args()
+
+    if args.command == "holidays":
+        calendar = load_calendar(date(args.year, 1, 1), date(args.year, 12, 31))
+        for day in _days(date(args.year, 1, 1), date(args.year, 12, 31)):
+            name = calendar.holiday_name(day)
+            if name is None and day not in calendar.overrides:
+                continue
+            if calendar.is_half_day(day):
+                status = "yarım gün"
+            else:
+                status = "işgünü" if calendar.is_business_day(day) else "tatil"
+            marker = " (istisna)" if day in calendar.overrides else ""
+            if day in calendar.guessed:
+                marker += " (tahmini)"
+            print(f"{day} {day.strftime('%a')}  {status:9}  {name or ''}{marker}")
+
+    elif args.command == "set":
+        with transaction() as cur:
+            set_override(cur, args.date, args.open, args.open and args.half_day, args.note)
+        print(f"✓ {args.date} {'işgünü' if args.open else 'tatil'} olarak kaydedildi")
+
+    elif args.command == "unset":
+        with transaction() as cur:
+            create_override_table(cur)
+            cur.execute(f"DELETE FROM {OVERRIDE_TABLE} WHERE tarih = %s", (args.date,))
+            deleted = cur.rowcount
+        print(f"{'✓' if deleted else '⚠'} {args.date} için {deleted} istisna silindi")
+
+    elif args.command == "check":
+        with transaction() as cur:
+            calendar = load_calendar(args.start, args.end, cur)
+            published, carried = check_tlref(cur, calendar, args.start, args.end)
+        for label, days in (("tatilde API değeri olan", published), ("işgününde taşınmış", carried)):
+            sample = ", ".join(str(d) for d in days[:10])
+            print(f"{'⚠' if days else '✓'} {TABLE_NAME}: {len(days)} {label} gün" + (f" ({sample})" if days else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""TLREF scriptleri için etkileşimsiz komut satırı
+
+Menüler (tlref_tablo_creator, excel_tlref, holiday_tlref_filler, daily_tlref_updater)
+bu komutların üzerinde ince bir katmandır; cron ve profil çıkarma için doğrudan
+bu modül kullanılır. Komut başarısız olursa çıkış kodu 1'dir. Komut modülleri ve
+pandas sadece ilgili komut çalışırken yüklenir (bkz. benchmarks/bench_import_time.py).
+
+Kullanım:
+    python tlref_cli.py create --yes
+    python tlref_cli.py load --start 2024-01-01 --end 2024-12-31
+    python tlref_cli.py load --target cash-flow --mode batch --batch-size 50
+    python tlref_cli.py load --target cash-flow --save-csv
+    python tlref_cli.py incremental --target cash-flow --dry-run
+    python tlref_cli.py fill-holidays --start 2025-01-01
+    python tlref_cli.py daily --start 2025-06-01 --profile daily.prof
+    python tlref_cli.py daily --cash-flow-mode full
+    python tlref_cli.py verify --target all
+"""
+import argparse
+import sys
+from datetime import date
+
+import tlref_metrics
+
+# -------------------------------
+# AYARLAR
+# -------------------------------
+PROFILE_TOP = 25  # cProfile raporunda gösterilecek fonksiyon sayısı
+
+# Komut (ve hedef) -> metrik iş adı; menülerin kullandığı adlarla aynı
+JOB_NAMES = {
+    ("create", None): "tlref_table",
+    ("load", "tlref"): "tlref_table",
+    ("incremental", "tlref"): "tlref_table",
+    ("load", "cash-flow"): "excel_cash_flow",
+    ("incremental", "cash-flow"): "excel_cash_flow",
+    ("fill-holidays", None): "holiday_fill",
+    ("daily", None): "daily_update",
+    ("verify", None): "verify"
+}
+
+
+def filter_range(df, start_date, end_date):
+    """Excel çerçevesini [start_date, end_date] aralığına indir"""
+    import pandas as pd
+
+    if start_date is not None:
+        df = df[df['Tarih'] >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        df = df[df['Tarih'] <= pd.Timestamp(end_date)]
+    return df
+
+
+def print_frame_summary(df):
+    print("\nVeri özeti:")
+    print(f"   Toplam kayıt: {len(df):,}")
+    if not df.empty:
+        print(f"   Tarih aralığı: {df['Tarih'].min():%d.%m.%Y} - {df['Tarih'].max():%d.%m.%Y}")
+        print(f"   TLREF aralığı: {df['TLREF'].min():.4f} - {df['TLREF'].max():.4f}")
+
+
+# -------------------------------
+# Komutlar
+# -------------------------------
+def cmd_create(args):
+    """TLREF tablosunu uzun tarihli Excel'den baştan oluştur"""
+    import tlref_tablo_creator as creator
+
+    df = creator.read_excel_long_data()
+    if df is None:
+        return False
+    df = filter_range(df, args.start, args.end)
+    print_frame_summary(df)
+
+    if args.dry_run:
+        print(f"\nKuru çalışma: {creator.TABLE_NAME} {len(df):,} satırla yeniden oluşturulacaktı ({args.mode})")
+        return True
+    if not args.yes:
+        print(f"✗ {creator.TABLE_NAME} tablosu silinip yeniden oluşturulur; onay için --yes verin")
+        return False
+
+    if args.mode == "shadow":
+        return creator.rebuild_table_shadow(df)
+    if not creator.create_tlref_table() or not creator.insert_data(df):
+        return False
+    creator.create_useful_views()
+    return True
+
+
+def cmd_load(args):
+    """Excel verisini TLREF tablosuna veya cash_flow_analysis'e yaz"""
+    if args.target == "cash-flow":
+        import excel_tlref
+
+        df = excel_tlref.read_excel_tlref()
+        if df is None:
+            return False
+        df = filter_range(df, args.start, args.end)
+        print_frame_summary(df)
+        if args.dry_run:
+            print(f"\nKuru çalışma: cash_flow_analysis için {len(df):,} tarih güncellenecekti ({args.mode})")
+            return True
+        # Menüdeki gibi CSV veritabanı güncellemesinden önce yazılır
+        if args.save_csv and not excel_tlref.save_to_csv(df):
+            return False
+        _, _, errors = excel_tlref.update_all(df, args.mode)
+        return errors == 0
+
+    import tlref_tablo_creator as creator
+
+    df = creator.read_excel_long_data()
+    if df is None:
+        return False
+    df = filter_range(df, args.start, args.end)
+    print_frame_summary(df)
+    if args.dry_run:
+        print(f"\nKuru çalışma: {creator.TABLE_NAME} tablosuna {len(df):,} satır yazılacaktı ({args.mode})")
+        return True
+    return creator.insert_data(df, args.mode)
+
+
+def cmd_incremental(args):
+    """Sadece yeni veya revizyon penceresinde değişen satırları yaz"""
+    if args.target == "cash-flow":
+        import excel_tlref
+
+        changed_df = excel_tlref.select_incremental_rows()
+        if changed_df is None:
+            return False
+        changed_df = filter_range(changed_df, args.start, args.end)
+        if changed_df.empty:
+            print("Güncellenecek yeni veya değişen tarih yok.")
+            return True
+        if args.dry_run:
+            print(f"Kuru çalışma: {len(changed_df):,} tarih güncellenecekti")
+            return True
+        _, _, errors = excel_tlref.update_all(changed_df, args.mode)
+        return errors == 0
+
+    import tlref_tablo_creator as creator
+
+    df = None
+    if args.start is not None or args.end is not None:
+        df = creator.read_excel_long_data()
+        if df is None:
+            return False
+        df = filter_range(df, args.start, args.end)
+    return creator.incremental_update(df, dry_run=args.dry_run)
+
+
+def cmd_fill_holidays(args):
+    """cash_flow_analysis'te TLREF'i eksik günleri önceki işgününün değeriyle doldur"""
+    import holiday_tlref_filler as filler
+
+    # Doldurucular hatayı yutup menüye döner; cron için hata çağırana iletilir (çıkış kodu 1)
+    if args.dry_run:
+        filler.get_missing_tlref_dates(args.start, args.end, raise_errors=True)
+        print("Kuru çalışma: güncelleme yapılmadı")
+        return True
+    if args.mode == "row":
+        filler.fill_holiday_tlref(args.start, args.end, raise_errors=True)
+    else:
+        filler.fill_holiday_tlref_bulk(args.start, args.end, raise_errors=True)
+    return True
+
+
+def cmd_daily(args):
+    """Eksik günleri EVDS'ten çekip TLREF'e yaz, ardından cash_flow_analysis'i güncelle"""
+    import daily_tlref_updater as updater
+
+    if args.dry_run:
+        if args.full_scan:
+            missing_dates = updater.expand_ranges(updater.find_gap_ranges(args.start, args.end, raise_errors=True))
+        else:
+            missing_dates = updater.check_missing_dates(args.start, args.end, raise_errors=True)
+        print(f"Kuru çalışma: {len(missing_dates)} eksik gün EVDS'ten çekilecekti")
+        for ranges in updater.dates_to_ranges(missing_dates)[:20]:
+            print(f"  {ranges[0]} - {ranges[1]}")
+        return True
+
+    updater.daily_tlref_update(fetch_mode=args.fetch_mode, start_date=args.start, end_date=args.end,
+                               pipeline=args.pipeline, full_scan=args.full_scan, raise_errors=True)
+    if not args.no_cash_flow:
+        updater.update_cash_flow_tlref(raise_errors=True, mode=args.cash_flow_mode)
+    return True
+
+
+def cmd_verify(args):
+    """Tabloların durumunu raporla; özet tabloları kaynakla uyuşmuyorsa başarısız say"""
+    ok = True
+    if args.target in ("tlref", "all"):
+        import tlref_tablo_creator as creator
+        creator.verify_table_data()
+    if args.target in ("cash-flow", "all"):
+        import excel_tlref
+        excel_tlref.verify_updates(None)
+    if args.target in ("holidays", "all"):
+        import holiday_tlref_filler as filler
+        filler.verify_tlref_coverage()
+        filler.check_weekends_and_holidays()
+    if args.target in ("rollups", "all"):
+        from tlref_db import transaction
+        from tlref_rollups import check_rollups
+        with transaction() as cur:
+            mismatches = check_rollups(cur)
+        for name, rows in mismatches.items():
+            print(f"{'✗' if rows else '✓'} {name}: {len(rows)} uyuşmayan kova")
+        ok = not any(mismatches.values())
+    if args.target in ("index", "all"):
+        from tlref_db import transaction
+        from tlref_index import TABLE_NAME, check_index
+        with transaction() as cur:
+            mismatches = check_index(cur)
+        print(f"{'✗' if mismatches else '✓'} {TABLE_NAME} kümülatif endeks: {len(mismatches)} uyuşmayan gün")
+        ok = ok and not mismatches
+    if args.target in ("cash-flow-rollups", "all"):
+        from cash_flow_rollups import ROLLUP_TABLE, check_rollups as check_cash_flow_rollups
+        from tlref_db import transaction
+        with transaction() as cur:
+            mismatches = check_cash_flow_rollups(cur)
+        for period, buckets in mismatches.items():
+            print(f"{'✗' if buckets else '✓'} {ROLLUP_TABLE} [{period}]: {len(buckets)} uyuşmayan kova")
+        ok = ok and not any(mismatches.values())
+    if args.target in ("calendar", "all"):
+        # Takvimle çelişen günler uyarıdır; istisna tablosuyla düzeltilir, doğrulamayı bozmaz
+        import tlref_calendar
+        from tlref_db import transaction
+        end_date = args.end or date.today()
+        start_date = args.start or date(end_date.year - 1, 1, 1)
+        with transaction() as cur:
+            calendar = tlref_calendar.load_calendar(start_date, end_date, cur)
+            published, carried = tlref_calendar.check_tlref(cur, calendar, start_date, end_date)
+        for label, days in (("tatilde API değeri olan", published), ("işgününde taşınmış", carried)):
+            print(f"{'⚠' if days else '✓'} {tlref_calendar.TABLE_NAME} takvim: {len(days)} {label} gün "
+                  f"({start_date} - {end_date})")
+    return ok
+
+
+COMMANDS = {
+    "create": cmd_create,
+    "load": cmd_load,
+    "incremental": cmd_incremental,
+    "fill-holidays": cmd_fill_holidays,
+    "daily": cmd_daily,
+    "verify": cmd_verify
+}
+
+
+# -------------------------------
+# Profil
+# -------------------------------
+def run_profiled(func, args):
+    """Komutu seçilen profil aracıyla çalıştır, raporu yaz ve aşama tablosunu göster"""
+    import cProfile
+    import io
+    import pstats
+
+    profiler = args.profiler
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("⚠ pyinstrument kurulu değil (pip install pyinstrument), cProfile kullanılıyor",
+                  file=sys.stderr)
+            profiler = "cprofile"
+
+    if profiler == "pyinstrument":
+        session = Profiler()
+        session.start()
+        try:
+            return func(args)
+        finally:
+            session.stop()
+            if args.profile.endswith(".html"):
+                with open(args.profile, "w", encoding="utf-8") as f:
+                    f.write(session.output_html())
+            else:
+                with open(args.profile, "w", encoding="utf-8") as f:
+                    f.write(session.output_text(unicode=True))
+            print(f"\nProfil yazıldı: {args.profile}", file=sys.stderr)
+
+    session = cProfile.Profile()
+    session.enable()
+    try:
+        return func(args)
+    finally:
+        session.disable()
+        session.dump_stats(args.profile)
+        report = io.StringIO()
+        pstats.Stats(session, stream=report).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        print(report.getvalue(), file=sys.stderr)
+        print(f"Profil yazıldı: {args.profile} (snakeviz/pstats ile açılabilir)", file=sys.stderr)
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--start", type=date.fromisoformat, help="Başlangıç tarihi (YYYY-AA-GG)")
+    common.add_argument("--end", type=date.fromisoformat, help="Bitiş tarihi (YYYY-AA-GG)")
+    common.add_argument("--batch-size", type=int, help="Satır satır yollarda batch boyutu")
+    common.add_argument("--dry-run", action="store_true", help="Yazmadan ne yapılacağını raporla")
+    common.add_argument("--profile", metavar="DOSYA", help="Profil çıktısını bu dosyaya yaz")
+    common.add_argument("--profiler", choices=("cprofile", "pyinstrument"), default="cprofile")
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    create = sub.add_parser("create", parents=[common], help="TLREF tablosunu Excel'den baştan oluştur")
+    create.add_argument("--mode", choices=("shadow", "drop"), default=None,
+                        help="shadow: gölge tablo + atomik değiştirme, drop: sil ve yeniden oluştur")
+    create.add_argument("--yes", action="store_true", help="Mevcut tablonun değiştirilmesini onayla")
+
+    for name, help_text in (("load", "Excel verisini tabloya yaz"),
+                            ("incremental", "Sadece yeni/değişen satırları yaz")):
+        command = sub.add_parser(name, parents=[common], help=help_text)
+        command.add_argument("--target", choices=("tlref", "cash-flow"), default="tlref",
+                             help="tlref: EVDS_Uzun_Tarih.xlsx -> TLREF, cash-flow: EVDS.xlsx -> cash_flow_analysis")
+        command.add_argument("--mode", choices=("copy", "bulk", "batch"), default=None,
+                             help="tlref için copy/batch, cash-flow için bulk/batch")
+        if name == "load":
+            command.add_argument("--save-csv", action="store_true",
+                                 help="cash-flow için okunan Excel verisini önce tlref_batch_data.csv'ye kaydet")
+
+    holidays = sub.add_parser("fill-holidays", parents=[common], help="Tatil günlerini önceki işgünü ile doldur")
+    holidays.add_argument("--mode", choices=("bulk", "row"), default=None)
+
+    daily = sub.add_parser("daily", parents=[common], help="EVDS'ten eksik günleri çek ve yaz")
+    daily.add_argument("--full-scan", action="store_true", help="Tablonun tüm geçmişindeki boşlukları tara")
+    daily.add_argument("--pipeline", choices=("batch", "per_date"), default=None)
+    daily.add_argument("--fetch-mode", choices=("auto", "range", "concurrent"), default=None)
+    daily.add_argument("--no-cash-flow", action="store_true", help="cash_flow_analysis güncellemesini atla")
+    daily.add_argument("--cash-flow-mode", choices=("changes", "null", "full"), default=None,
+                       help="changes: boşlar + değişen TLREF günleri, null: sadece boşlar, full: tüm satırlar")
+
+    verify = sub.add_parser("verify", parents=[common], help="Tabloları doğrula")
+    verify.add_argument("--target", choices=("tlref", "cash-flow", "holidays", "rollups", "index",
+                                                 "cash-flow-rollups", "calendar", "all"), default="all")
+    return parser
+
+
+def apply_defaults(args):
+    """Verilmeyen seçenekleri ilgili modülün AYARLAR değerleriyle doldur"""
+    if args.command == "create" and args.mode is None:
+        import tlref_tablo_creator as creator
+        args.mode = creator.REBUILD_MODE
+    elif args.command in ("load", "incremental"):
+        if args.target == "cash-flow":
+            import excel_tlref
+            args.mode = args.mode or excel_tlref.UPDATE_MODE
+            if args.mode == "copy":
+                args.mode = "bulk"
+            if args.batch_size:
+                excel_tlref.BATCH_SIZE = args.batch_size
+        else:
+            import tlref_tablo_creator as creator
+            args.mode = args.mode or creator.LOAD_MODE
+            if args.mode == "bulk":
+                args.mode = "copy"
+            if args.batch_size:
+                creator.BATCH_SIZE = args.batch_size
+    elif args.command == "fill-holidays" and args.mode is None:
+        import holiday_tlref_filler as filler
+        args.mode = filler.FILL_MODE
+    elif args.command == "daily":
+        import daily_tlref_updater as updater
+        args.pipeline = args.pipeline or updater.PIPELINE_MODE
+        args.fetch_mode = args.fetch_mode or updater.FETCH_MODE
+        # Toplu yol cash_flow_analysis'i kendi işlemi içinde de günceller, ayar oradan okunur
+        updater.CASH_FLOW_MODE = args.cash_flow_mode = args.cash_flow_mode or updater.CASH_FLOW_MODE
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    apply_defaults(args)
+
+    func = COMMANDS[args.command]
+    job_name = JOB_NAMES.get((args.command, getattr(args, "target", None)),
+                             JOB_NAMES.get((args.command, None), args.command))
+    try:
+        with tlref_metrics.job(job_name) as run:
+            ok = run_profiled(func, args) if args.profile else func(args)
+            run["ok"] = bool(ok)
+    except KeyboardInterrupt:
+        print("\nİşlem kullanıcı tarafından iptal edildi.")
+        return 130
+    except Exception as e:
+        print(f"✗ {args.command} hatası: {e}")
+        return 1
+
+    if args.profile:
+        print(f"\n=== Aşama süreleri ({job_name}) ===", file=sys.stderr)
+        print(tlref_metrics.format_stage_table(job_name), file=sys.stderr)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
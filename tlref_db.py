@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions, pool
+
+import tlref_metrics
+
+# -------------------------------
+# AYARLAR
+# -------------------------------
+DB_CONFIG = {
+    "host": os.environ.get("TLREF_DB_HOST", "192.168.182.3"),
+    "dbname": os.environ.get("TLREF_DB_NAME", "tmks-ftp"),
+    "user": os.environ.get("TLREF_DB_USER", "postgres"),
+    "password": os.environ.get("TLREF_DB_PASSWORD", "postgres.db!")
+}
+if os.environ.get("TLREF_DB_PORT"):
+    DB_CONFIG["port"] = int(os.environ["TLREF_DB_PORT"])
+
+POOL_MIN_SIZE = int(os.environ.get("TLREF_DB_POOL_MIN", 1))
+POOL_MAX_SIZE = int(os.environ.get("TLREF_DB_POOL_MAX", 5))
+HEALTHCHECK_IDLE_SECONDS = 30  # Bu süreden uzun boşta kalan bağlantı kullanılmadan önce test edilir
+
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+_last_used = {}
+
+
+class MetricsCursor(extensions.cursor):
+    """Her sorgu/COPY çağrısını veritabanı gidiş-dönüşü olarak sayan cursor"""
+
+    def execute(self, query, vars=None):
+        tlref_metrics.count("tlref_db_round_trips_total")
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        tlref_metrics.count("tlref_db_round_trips_total", len(vars_list))
+        return super().executemany(query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        tlref_metrics.count("tlref_db_round_trips_total")
+        return super().copy_expert(sql, file, size)
+
+
+class MetricsConnection(extensions.connection):
+    """Açılan bağlantıları sayan ve varsayılan olarak MetricsCursor veren bağlantı"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        tlref_metrics.count("tlref_db_connections_opened_total")
+        self.cursor_factory = MetricsCursor
+        # Yeni açılan bağlantı sağlam kabul edilir; ilk kullanımda SELECT 1 atılmaz
+        _last_used[id(self)] = time.monotonic()
+
+
+def configure_pool(min_size=None, max_size=None, **db_overrides):
+    """Havuz boyutunu ve bağlantı ayarlarını değiştir (mevcut havuz kapatılır)"""
+    global POOL_MIN_SIZE, POOL_MAX_SIZE
+    close_pool()
+    if min_size is not None:
+        POOL_MIN_SIZE = min_size
+    if max_size is not None:
+        POOL_MAX_SIZE = max_size
+    DB_CONFIG.update(db_overrides)
+
+
+def get_pool():
+    """Paylaşılan bağlantı havuzunu döndür, yoksa oluştur"""
+    global _pool, _pool_slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pool.ThreadedConnectionPool(POOL_MIN_SIZE, POOL_MAX_SIZE,
+                                                    connection_factory=MetricsConnection, **DB_CONFIG)
+                # Havuz doluysa hata vermek yerine boş bağlantı beklenir
+                _pool_slots = threading.BoundedSemaphore(POOL_MAX_SIZE)
+    return _pool
+
+
+def close_pool():
+    """Havuzdaki tüm bağlantıları kapat"""
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+        _pool = None
+        _pool_slots = None
+        _last_used.clear()
+
+
+def is_healthy(conn):
+    """Bağlantının kullanılabilir olup olmadığını kontrol et"""
+    if conn.closed:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout():
+    db_pool = get_pool()
+    slots = _pool_slots
+    slots.acquire()
+    try:
+        for _ in range(POOL_MAX_SIZE + 1):
+            conn = db_pool.getconn()
+            idle = time.monotonic() - _last_used.get(id(conn), 0)
+            if not conn.closed and (idle < HEALTHCHECK_IDLE_SECONDS or is_healthy(conn)):
+                return db_pool, slots, conn
+            # Kopmuş bağlantıyı havuzdan at ve yenisini iste
+            _last_used.pop(id(conn), None)
+            db_pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("Havuzdan sağlıklı bağlantı alınamadı")
+    except Exception:
+        slots.release()
+        raise
+
+
+@contextmanager
+def connection():
+    """Havuzdan bir bağlantı al, iş bitince havuza geri ver"""
+    db_pool, slots, conn = _checkout()
+    try:
+        yield conn
+    finally:
+        broken = bool(conn.closed)
+        try:
+            if not broken and conn.status != psycopg2.extensions.STATUS_READY:
+                # Yarım kalan işlem havuza taşınmasın
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    # Sunucu işlem ortasında koptu; bağlantı havuza geri verilmez
+                    broken = True
+        finally:
+            # Slot her durumda geri verilir, yoksa POOL_MAX_SIZE hatadan sonra herkes bekler
+            try:
+                if broken:
+                    _last_used.pop(id(conn), None)
+                else:
+                    _last_used[id(conn)] = time.monotonic()
+                db_pool.putconn(conn, close=broken)
+            finally:
+                slots.release()
+
+
+@contextmanager
+def transaction():
+    """Tek bir işlem (transaction) içinde cursor ver; hata olursa geri al"""
+    with connection() as conn:
+        cur = conn.cursor()
+        try:
+            yield cur
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
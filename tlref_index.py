@@ -0,0 +1,234 @@
+"""TLREF kümülatif endeks sütunları (kumulatif_endeks, kumulatif_toplam)
+
+Her tarihin yanında günlük büyüme çarpanlarının (1 + tlref_yuzde / 365) birikimli
+çarpımı ve oranların birikimli toplamı tutulur. Böylece herhangi bir [bas, son]
+dönemi için bileşik getiri, ortalama oran ve basit faiz binlerce satırı toplamak
+yerine iki satır okunarak hesaplanır (tlref_donem_getirisi SQL fonksiyonu).
+
+Yükleyiciler sadece ilk değişen tarihten sonrasını yeniden hesaplar; tam yeniden
+hesaplama NumPy ile tek geçişte yapılır.
+
+Kullanım:
+    python tlref_index.py rebuild
+    python tlref_index.py check
+    python tlref_index.py window --start 2024-01-01 --end 2024-12-31
+"""
+import argparse
+import io
+from datetime import date
+
+import numpy as np
+
+import tlref_metrics
+from tlref_db import transaction
+
+# -------------------------------
+# AYARLAR
+# -------------------------------
+TABLE_NAME = "TLREF"
+DAY_COUNT = 365.0  # Günlük faiz tabanı (cash_flow_analysis.tlref_faiz_kazanci ile aynı)
+WINDOW_FUNCTION = "tlref_donem_getirisi"
+CHECK_TOLERANCE = 1e-9  # check'te kabul edilen göreli fark (artımlı çarpım birikimli yuvarlama yapar)
+
+# Başlangıç satırının kendi çarpanı bölünerek "bas'tan bir önceki gün" değeri elde edilir;
+# böylece dönem iki satırla (bas'tan itibaren ilk, son'a kadar son satır) hesaplanır
+WINDOW_FUNCTION_SQL = """
+    CREATE OR REPLACE FUNCTION {function}(bas DATE, son DATE)
+    RETURNS TABLE (
+        ilk_tarih DATE,
+        son_tarih DATE,
+        gun_sayisi INTEGER,
+        bilesik_getiri DOUBLE PRECISION,
+        ortalama_tlref DOUBLE PRECISION,
+        basit_getiri DOUBLE PRECISION
+    )
+    LANGUAGE sql STABLE AS $$
+        SELECT
+            i.tarih,
+            s.tarih,
+            s.tarih - i.tarih + 1,
+            s.kumulatif_endeks * (1 + i.tlref_yuzde::float8 / {day_count}) / i.kumulatif_endeks - 1,
+            (s.kumulatif_toplam - i.kumulatif_toplam + i.tlref_yuzde::float8) / (s.tarih - i.tarih + 1),
+            (s.kumulatif_toplam - i.kumulatif_toplam + i.tlref_yuzde::float8) / {day_count}
+        FROM (
+            SELECT tarih, tlref_yuzde, kumulatif_endeks, kumulatif_toplam
+            FROM {table} WHERE tarih >= bas ORDER BY tarih LIMIT 1
+        ) i, (
+            SELECT tarih, kumulatif_endeks, kumulatif_toplam
+            FROM {table} WHERE tarih <= son ORDER BY tarih DESC LIMIT 1
+        ) s
+        WHERE i.tarih <= s.tarih
+    $$
+"""
+
+
+def index_columns_exist(cur, table=TABLE_NAME):
+    cur.execute("""
+        SELECT COUNT(*) FROM pg_attribute
+        WHERE attrelid = to_regclass(%s)
+          AND attname IN ('kumulatif_endeks', 'kumulatif_toplam')
+          AND NOT attisdropped
+    """, (table.lower(),))
+    return cur.fetchone()[0] == 2
+
+
+def create_index_columns(cur, table=TABLE_NAME):
+    """Eski kurulumlara endeks sütunlarını ekle ve dönem fonksiyonunu oluştur"""
+    cur.execute(f"""
+        ALTER TABLE {table}
+            ADD COLUMN IF NOT EXISTS kumulatif_endeks DOUBLE PRECISION,
+            ADD COLUMN IF NOT EXISTS kumulatif_toplam DOUBLE PRECISION
+    """)
+    cur.execute(WINDOW_FUNCTION_SQL.format(function=WINDOW_FUNCTION, table=table, day_count=DAY_COUNT))
+
+
+def compute_index(rates, anchor_index=1.0, anchor_sum=0.0):
+    """Oran dizisinden (kumulatif_endeks, kumulatif_toplam) dizilerini vektörel hesapla"""
+    rates = np.asarray(rates, dtype=np.float64)
+    return anchor_index * np.cumprod(1.0 + rates / DAY_COUNT), anchor_sum + np.cumsum(rates)
+
+
+def _write_index(cur, dates, index_values, sum_values, table):
+    """Hesaplanan değerleri COPY ile geçici tabloya aktarıp tek UPDATE ile yaz"""
+    cur.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS tlref_index_staging (
+            tarih DATE,
+            kumulatif_endeks DOUBLE PRECISION,
+            kumulatif_toplam DOUBLE PRECISION
+        ) ON COMMIT DROP
+    """)
+    cur.execute("DELETE FROM tlref_index_staging")
+
+    # repr float'ı kayıpsız yazar
+    buffer = io.StringIO("".join(
+        f"{d.isoformat()},{float(e)!r},{float(s)!r}\n" for d, e, s in zip(dates, index_values, sum_values)
+    ))
+    cur.copy_expert("COPY tlref_index_staging FROM STDIN WITH (FORMAT csv)", buffer)
+    cur.execute(f"""
+        UPDATE {table} t
+        SET kumulatif_endeks = s.kumulatif_endeks,
+            kumulatif_toplam = s.kumulatif_toplam
+        FROM tlref_index_staging s
+        WHERE t.tarih = s.tarih
+    """)
+    return cur.rowcount
+
+
+def _recompute_from(cur, first_date, table):
+    """first_date'ten (None ise en baştan) sonuna kadar endeksi yeniden hesaplayıp yaz"""
+    anchor_index, anchor_sum = 1.0, 0.0
+    if first_date is not None:
+        cur.execute(f"""
+            SELECT kumulatif_endeks, kumulatif_toplam FROM {table}
+            WHERE tarih < %s ORDER BY tarih DESC LIMIT 1
+        """, (first_date,))
+        row = cur.fetchone()
+        if row is not None:
+            if row[0] is None or row[1] is None:
+                # Öncesi hiç hesaplanmamış, zincir baştan kurulur
+                return _recompute_from(cur, None, table)
+            anchor_index, anchor_sum = row
+
+    cur.execute(f"""
+        SELECT tarih, tlref_yuzde FROM {table}
+        WHERE (%s::date IS NULL OR tarih >= %s)
+        ORDER BY tarih
+    """, (first_date, first_date))
+    rows = cur.fetchall()
+    if not rows:
+        return 0
+
+    index_values, sum_values = compute_index([float(r) for _, r in rows], anchor_index, anchor_sum)
+    updated = _write_index(cur, [d for d, _ in rows], index_values, sum_values, table)
+    tlref_metrics.count("tlref_rows_total", updated, op="index_update")
+    return updated
+
+
+@tlref_metrics.stage("index_rebuild")
+def rebuild_index(cur, table=TABLE_NAME):
+    """Tüm endeksi baştan hesapla; güncellenen satır sayısını döndür"""
+    return _recompute_from(cur, None, table)
+
+
+@tlref_metrics.stage("index_refresh")
+def refresh_index(cur, dates, table=TABLE_NAME):
+    """Verilen tarihlerin en erkeninden itibaren endeksi yeniden hesapla
+
+    Endeks sütunları henüz eklenmemişse hiçbir şey yapmaz; güncellenen satır sayısını döndürür.
+    """
+    dates = [d for d in dates if d is not None]
+    if not dates or not index_columns_exist(cur, table):
+        return 0
+    return _recompute_from(cur, min(dates), table)
+
+
+def check_index(cur, table=TABLE_NAME):
+    """Saklanan endeksi baştan hesaplananla karşılaştır; uyuşmayan tarihlerin listesini döndür"""
+    cur.execute(f"""
+        SELECT tarih, tlref_yuzde, kumulatif_endeks, kumulatif_toplam
+        FROM {table} ORDER BY tarih
+    """)
+    rows = cur.fetchall()
+    if not rows:
+        return []
+
+    expected_index, expected_sum = compute_index([float(r[1]) for r in rows])
+    stored_index = np.array([np.nan if r[2] is None else r[2] for r in rows], dtype=np.float64)
+    stored_sum = np.array([np.nan if r[3] is None else r[3] for r in rows], dtype=np.float64)
+    bad = ~np.isclose(stored_index, expected_index, rtol=CHECK_TOLERANCE, atol=0)
+    bad |= ~np.isclose(stored_sum, expected_sum, rtol=CHECK_TOLERANCE, atol=CHECK_TOLERANCE)
+    return [rows[i][0] for i in np.flatnonzero(bad)]
+
+
+def window_return(cur, start_date, end_date):
+    """[start_date, end_date] dönemi için iki satırlık aramayla getiri özetini döndür (veri yoksa None)"""
+    cur.execute(f"SELECT * FROM {WINDOW_FUNCTION}(%s, %s)", (start_date, end_date))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    keys = ("ilk_tarih", "son_tarih", "gun_sayisi", "bilesik_getiri", "ortalama_tlref", "basit_getiri")
+    return dict(zip(keys, row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("rebuild", help="Endeks sütunlarını ekle ve baştan hesapla")
+    sub.add_parser("check", help="Saklanan endeksi baştan hesaplananla karşılaştır")
+
+    window_parser = sub.add_parser("window", help="Dönem için bileşik getiri ve ortalama oran")
+    window_parser.add_argument("--start", type=date.fromisoformat, required=True)
+    window_parser.add_argument("--end", type=date.fromisoformat, default=date.today())
+
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        with transaction() as cur:
+            create_index_columns(cur)
+            count = rebuild_index(cur)
+        print(f"✓ {TABLE_NAME}: {count} satırın kümülatif endeksi yeniden hesaplandı")
+
+    elif args.command == "check":
+        with transaction() as cur:
+            mismatches = check_index(cur)
+        if mismatches:
+            sample = ", ".join(str(d) for d in mismatches[:10])
+            print(f"✗ {len(mismatches)} tarihte endeks uyuşmuyor ({sample})")
+            raise SystemExit(1)
+        print(f"✓ {TABLE_NAME} kümülatif endeksi tutarlı")
+
+    elif args.command == "window":
+        with transaction() as cur:
+            result = window_return(cur, args.start, args.end)
+        if result is None:
+            print("Bu dönemde TLREF verisi yok")
+            return
+        print(f"Dönem: {result['ilk_tarih']} - {result['son_tarih']} ({result['gun_sayisi']} gün)")
+        print(f"Bileşik getiri: %{result['bilesik_getiri'] * 100:.4f}")
+        print(f"Ortalama TLREF: %{result['ortalama_tlref'] * 100:.4f}")
+        print(f"Basit getiri:   %{result['basit_getiri'] * 100:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""TLREF işleri için aşama süreleri ve sayaçlar (Prometheus metin formatı + JSON özet)
+
+Scriptler aşamalarını stage() ile sarar, satır/istek sayılarını count() ile ekler.
+İş bitince job() metrikleri TLREF_METRICS_DIR altına node_exporter textfile
+collector'ın okuyacağı tlref_<iş>.prom ve tlref_<iş>.json dosyaları olarak yazar;
+uzun çalışan servis için TLREF_METRICS_PORT verilirse /metrics uç noktası açılır.
+
+Kullanım:
+    with job("daily_update"):
+        with stage("gap_detection"):
+            ...
+        count("tlref_rows_total", len(rows), op="upsert")
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# -------------------------------
+# AYARLAR
+# -------------------------------
+METRICS_DIR = os.environ.get("TLREF_METRICS_DIR")  # .prom/.json dosyalarının yazılacağı klasör
+METRICS_PORT = int(os.environ.get("TLREF_METRICS_PORT", 0))  # 0 ise HTTP uç noktası açılmaz
+
+HELP = {
+    "tlref_job_seconds": ("summary", "İş toplam süresi"),
+    "tlref_job_last_success_timestamp_seconds": ("gauge", "İşin son başarılı bitiş zamanı (unix)"),
+    "tlref_job_last_status": ("gauge", "Son çalışmanın durumu (1 başarılı, 0 hatalı)"),
+    "tlref_stage_seconds": ("summary", "Aşama süresi"),
+    "tlref_rows_total": ("counter", "İşlenen satır sayısı"),
+    "tlref_http_requests_total": ("counter", "EVDS'e atılan HTTP istekleri"),
+    "tlref_db_round_trips_total": ("counter", "Veritabanına gidiş-dönüş sayısı"),
+    "tlref_db_connections_opened_total": ("counter", "Açılan veritabanı bağlantısı sayısı")
+}
+
+_lock = threading.Lock()
+_counters = {}  # (ad, etiketler) -> değer
+_gauges = {}
+_timings = {}  # (ad, etiketler) -> [adet, toplam, en büyük]
+_current_job = "unknown"
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def reset():
+    """Tüm metrikleri sıfırla (testler ve benchmark'lar için)"""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
+
+
+# -------------------------------
+# Kayıt
+# -------------------------------
+def count(name, value=1, **labels):
+    """Sayaç artır; etiketlere o anki iş adı eklenir"""
+    key = _key(name, {"job": _current_job, **labels})
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    key = _key(name, {"job": _current_job, **labels})
+    with _lock:
+        _gauges[key] = value
+
+
+def observe(name, seconds, **labels):
+    key = _key(name, {"job": _current_job, **labels})
+    with _lock:
+        entry = _timings.setdefault(key, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+
+@contextmanager
+def stage(name, **labels):
+    """Bloğun süresini tlref_stage_seconds{stage=name} olarak kaydet"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("tlref_stage_seconds", time.perf_counter() - start, stage=name, **labels)
+
+
+@contextmanager
+def job(name, export_on_exit=True):
+    """Bir script çalışmasını sar: toplam süre, son durum ve bitişte dosyaya yazma
+
+    Hatayı kendisi yakalayan çağıran, verilen durum sözlüğünde ok=False yaparak
+    çalışmayı başarısız işaretleyebilir.
+    """
+    global _current_job
+    previous, _current_job = _current_job, name
+    start = time.perf_counter()
+    state = {"ok": False}
+    try:
+        state["ok"] = True
+        yield state
+    except BaseException:
+        state["ok"] = False
+        raise
+    finally:
+        succeeded = state["ok"]
+        observe("tlref_job_seconds", time.perf_counter() - start)
+        set_gauge("tlref_job_last_status", 1 if succeeded else 0)
+        if succeeded:
+            set_gauge("tlref_job_last_success_timestamp_seconds", time.time())
+        if export_on_exit:
+            export(name)
+        _current_job = previous
+
+
+# -------------------------------
+# Dışa aktarma
+# -------------------------------
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def render_prometheus():
+    """Tüm metrikleri Prometheus metin formatında döndür"""
+    with _lock:
+        families = {}
+        for (name, labels), value in _counters.items():
+            families.setdefault(name, []).append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), value in _gauges.items():
+            families.setdefault(name, []).append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), (n, total, _) in _timings.items():
+            families.setdefault(name, []).extend([
+                f"{name}_sum{_format_labels(labels)} {total:.6f}",
+                f"{name}_count{_format_labels(labels)} {n}"
+            ])
+
+    lines = []
+    for name in sorted(families):
+        metric_type, help_text = HELP.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.extend(sorted(families[name]))
+    return "\n".join(lines) + "\n"
+
+
+def summary(job_name=None):
+    """Bir işin (varsayılan o anki iş) aşama sürelerini ve sayaçlarını sözlük olarak döndür"""
+    job_name = job_name or _current_job
+    with _lock:
+        runs = {}
+        stages = {}
+        for (name, labels), (n, total, longest) in _timings.items():
+            label_dict = dict(labels)
+            if label_dict.pop("job", None) != job_name:
+                continue
+            if name == "tlref_job_seconds":
+                runs = {"count": n, "total_s": round(total, 6), "max_s": round(longest, 6)}
+                continue
+            key = label_dict.pop("stage", name)
+            if label_dict:
+                key += "[" + ",".join(f"{k}={v}" for k, v in sorted(label_dict.items())) + "]"
+            stages[key] = {"count": n, "total_s": round(total, 6), "max_s": round(longest, 6)}
+
+        counters = {}
+        for (name, labels), value in _counters.items():
+            if dict(labels).get("job") != job_name:
+                continue
+            label_dict = {k: v for k, v in labels if k != "job"}
+            key = name + ("{" + ",".join(f"{k}={v}" for k, v in sorted(label_dict.items())) + "}"
+                          if label_dict else "")
+            counters[key] = value
+    return {"job": job_name, "runs": runs, "stages": stages, "counters": counters}
+
+
+def format_stage_table(job_name=None):
+    """Bir işin aşama sürelerini en uzundan kısaya tablo metni olarak döndür"""
+    data = summary(job_name)
+    total = data["runs"].get("total_s") or sum(s["total_s"] for s in data["stages"].values()) or 1
+    lines = [
+        f"{'Aşama':40} | {'Adet':>5} | {'Toplam (sn)':>11} | {'En uzun (sn)':>12} | {'Pay':>6}",
+        "-" * 86
+    ]
+    for name, s in sorted(data["stages"].items(), key=lambda item: -item[1]["total_s"]):
+        lines.append(f"{name:40} | {s['count']:5} | {s['total_s']:11.3f} | {s['max_s']:12.3f} | "
+                     f"{s['total_s'] / total:6.1%}")
+    if data["runs"]:
+        lines.append("-" * 86)
+        lines.append(f"{'toplam':40} | {data['runs']['count']:5} | {data['runs']['total_s']:11.3f} |")
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f"  {name}: {value:,}")
+    return "\n".join(lines)
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def export(job_name=None, folder=None):
+    """METRICS_DIR ayarlıysa tlref_<iş>.prom ve tlref_<iş>.json dosyalarını yaz"""
+    folder = folder or METRICS_DIR
+    if not folder:
+        return None
+    os.makedirs(folder, exist_ok=True)
+    job_name = job_name or _current_job
+    base = os.path.join(folder, f"tlref_{job_name}")
+    _write_atomic(f"{base}.prom", render_prometheus())
+    _write_atomic(f"{base}.json", json.dumps(summary(job_name), indent=2, ensure_ascii=False))
+    return base
+
+
+def serve(port=None, host="0.0.0.0"):
+    """/metrics ve /summary.json uç noktalarını arka planda sun; port 0 ise hiçbir şey yapmaz"""
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return None
+
+    # Sadece servis modunda gerekir; kısa süreli scriptlerin açılışını yavaşlatmasın
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = render_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/summary.json":
+                body, content_type = json.dumps(summary(), ensure_ascii=False), "application/json"
+            else:
+                self.send_error(404)
+                return
+            payload = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,211 @@
+"""TLREF aylık/yıllık özet tabloları (TLREF_monthly_avg, TLREF_yearly_trend)
+
+Özetler her dashboard isteğinde yeniden hesaplanan view'lar yerine tablo olarak
+tutulur; yükleyiciler sadece dokundukları yıl/ay kovalarını yeniden hesaplar.
+
+Kullanım:
+    python tlref_rollups.py rebuild
+    python tlref_rollups.py check
+    python tlref_rollups.py refresh --start 2024-01-01 --end 2024-12-31
+"""
+import argparse
+from datetime import date
+
+import tlref_metrics
+from tlref_db import transaction
+
+# -------------------------------
+# AYARLAR
+# -------------------------------
+TABLE_NAME = "TLREF"
+MONTHLY_TABLE = f"{TABLE_NAME}_monthly_avg"
+YEARLY_TABLE = f"{TABLE_NAME}_yearly_trend"
+WORKDAYS_VIEW = f"{TABLE_NAME}_workdays"
+
+MONTHLY_SELECT = """
+    SELECT
+        yil,
+        ay,
+        COUNT(*) as gun_sayisi,
+        AVG(tlref_yuzde) as ortalama_tlref,
+        MIN(tlref_yuzde) as min_tlref,
+        MAX(tlref_yuzde) as max_tlref,
+        STDDEV(tlref_yuzde) as standart_sapma
+    FROM {source}
+    {where}
+    GROUP BY yil, ay
+"""
+
+YEARLY_SELECT = """
+    SELECT
+        yil,
+        COUNT(*) as toplam_gun,
+        AVG(tlref_yuzde) as ortalama_tlref,
+        MIN(tlref_yuzde) as min_tlref,
+        MAX(tlref_yuzde) as max_tlref,
+        MAX(tlref_yuzde) - MIN(tlref_yuzde) as volatilite
+    FROM {source}
+    {where}
+    GROUP BY yil
+"""
+
+# Özet tablosu -> (kova anahtar sütunları, özet sorgusu)
+ROLLUPS = {
+    MONTHLY_TABLE: (("yil", "ay"), MONTHLY_SELECT),
+    YEARLY_TABLE: (("yil",), YEARLY_SELECT)
+}
+
+
+def _relkind(cur, name):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (name.lower(),))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def rollups_exist(cur):
+    """Özetler tablo olarak kurulmuş mu (eski kurulumlarda hâlâ view olabilir)"""
+    return all(_relkind(cur, name) == "r" for name in ROLLUPS)
+
+
+def create_rollup_tables(cur, source=TABLE_NAME):
+    """Eski view'ları kaldırıp özet tablolarını ve işgünü view'ını oluştur"""
+    for name in ROLLUPS:
+        if _relkind(cur, name) == "v":
+            cur.execute(f"DROP VIEW {name}")
+
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MONTHLY_TABLE} (
+            yil INTEGER NOT NULL,
+            ay INTEGER NOT NULL,
+            gun_sayisi BIGINT NOT NULL,
+            ortalama_tlref NUMERIC,
+            min_tlref NUMERIC,
+            max_tlref NUMERIC,
+            standart_sapma NUMERIC,
+            PRIMARY KEY (yil, ay)
+        )
+    """)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {YEARLY_TABLE} (
+            yil INTEGER PRIMARY KEY,
+            toplam_gun BIGINT NOT NULL,
+            ortalama_tlref NUMERIC,
+            min_tlref NUMERIC,
+            max_tlref NUMERIC,
+            volatilite NUMERIC
+        )
+    """)
+
+    # Sıralama sorgu tarafında yapılır; view içinde ORDER BY planlayıcıyı bağlar
+    cur.execute(f"""
+        CREATE OR REPLACE VIEW {WORKDAYS_VIEW} AS
+        SELECT * FROM {source}
+        WHERE hafta_sonu = FALSE
+    """)
+
+
+@tlref_metrics.stage("rollup_rebuild")
+def rebuild_rollups(cur, source=TABLE_NAME):
+    """Özet tablolarını kaynak tablodan baştan hesapla; (aylık, yıllık) satır sayısını döndür"""
+    counts = []
+    for name, (_, select_sql) in ROLLUPS.items():
+        cur.execute(f"DELETE FROM {name}")
+        cur.execute(f"INSERT INTO {name} {select_sql.format(source=source, where='')}")
+        counts.append(cur.rowcount)
+    return tuple(counts)
+
+
+@tlref_metrics.stage("rollup_refresh")
+def refresh_rollups(cur, dates, source=TABLE_NAME):
+    """Sadece verilen tarihlerin düştüğü yıl/ay kovalarını yeniden hesapla
+
+    Özet tabloları henüz kurulmamışsa hiçbir şey yapmaz; (aylık, yıllık) kova sayısını döndürür.
+    """
+    dates = sorted({d for d in dates if d is not None})
+    if not dates or not rollups_exist(cur):
+        return 0, 0
+
+    cur.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS tlref_rollup_buckets (yil INTEGER, ay INTEGER) ON COMMIT DROP
+    """)
+    cur.execute("DELETE FROM tlref_rollup_buckets")
+    cur.execute("""
+        INSERT INTO tlref_rollup_buckets (yil, ay)
+        SELECT DISTINCT EXTRACT(YEAR FROM d)::int, EXTRACT(MONTH FROM d)::int
+        FROM unnest(%s::date[]) AS d
+    """, (dates,))
+
+    counts = []
+    for name, (keys, select_sql) in ROLLUPS.items():
+        key_list = ", ".join(keys)
+        touched = f"({key_list}) IN (SELECT DISTINCT {key_list} FROM tlref_rollup_buckets)"
+        cur.execute(f"DELETE FROM {name} WHERE {touched}")
+        cur.execute(f"INSERT INTO {name} {select_sql.format(source=source, where='WHERE ' + touched)}")
+        cur.execute(f"SELECT COUNT(DISTINCT ({key_list})) FROM tlref_rollup_buckets")
+        counts.append(cur.fetchone()[0])
+    return tuple(counts)
+
+
+def check_rollups(cur, source=TABLE_NAME):
+    """Özet tablolarını kaynaktan hesaplananla karşılaştır; {tablo: [uyuşmayan kovalar]} döndür"""
+    mismatches = {}
+    for name, (keys, select_sql) in ROLLUPS.items():
+        join = " AND ".join(f"r.{k} = e.{k}" for k in keys)
+        key_select = ", ".join(f"COALESCE(r.{k}, e.{k})" for k in keys)
+        cur.execute(f"""
+            WITH expected AS ({select_sql.format(source=source, where='')})
+            SELECT {key_select}
+            FROM {name} r
+            FULL OUTER JOIN expected e ON {join}
+            WHERE (r.*) IS DISTINCT FROM (e.*)
+            ORDER BY 1
+        """)
+        mismatches[name] = cur.fetchall()
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("rebuild", help="Özet tablolarını oluştur ve baştan hesapla")
+    sub.add_parser("check", help="Özet tablolarını kaynak tabloyla karşılaştır")
+
+    refresh_parser = sub.add_parser("refresh", help="Tarih aralığının kovalarını yeniden hesapla")
+    refresh_parser.add_argument("--start", type=date.fromisoformat, required=True)
+    refresh_parser.add_argument("--end", type=date.fromisoformat, default=date.today())
+
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        with transaction() as cur:
+            create_rollup_tables(cur)
+            monthly, yearly = rebuild_rollups(cur)
+        print(f"✓ {MONTHLY_TABLE}: {monthly} ay, {YEARLY_TABLE}: {yearly} yıl yeniden hesaplandı")
+
+    elif args.command == "check":
+        with transaction() as cur:
+            mismatches = check_rollups(cur)
+        for name, rows in mismatches.items():
+            if rows:
+                buckets = ", ".join("-".join(str(v) for v in row) for row in rows[:10])
+                print(f"✗ {name}: {len(rows)} kova uyuşmuyor ({buckets})")
+            else:
+                print(f"✓ {name}: kaynak tabloyla tutarlı")
+        if any(mismatches.values()):
+            raise SystemExit(1)
+
+    elif args.command == "refresh":
+        # Aralıktaki her ayın ilk günü o ayın kovasını temsil eder
+        months = []
+        year, month = args.start.year, args.start.month
+        while (year, month) <= (args.end.year, args.end.month):
+            months.append(date(year, month, 1))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        with transaction() as cur:
+            monthly, yearly = refresh_rollups(cur, months)
+        print(f"✓ {monthly} ay ve {yearly} yıl kovası yeniden hesaplandı")
+
+
+if __name__ == "__main__":
+    main()
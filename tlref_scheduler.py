@@ -0,0 +1,293 @@
+"""TLREF günlük güncelleme servisi (daemon)
+
+Aşamalar sırayla ve birbirine bağlı çalışır: cash_flow_analysis aşaması ancak TLREF
+güncellemesi başarılı olursa başlar. Son başarılı çalışma run-history tablosunda
+tutulur; servis kapalıyken kaçırılan günler açılışta tek çalışmada telafi edilir.
+Postgres advisory lock ile aynı anda tek servis çalışır.
+
+Kullanım:
+    python tlref_scheduler.py run
+    python tlref_scheduler.py run --once
+    python tlref_scheduler.py history --limit 20
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+import daily_tlref_updater as updater
+import tlref_metrics
+from tlref_db import DB_CONFIG, MetricsConnection, transaction
+
+# -------------------------------
+# AYARLAR
+# -------------------------------
+RUN_HISTORY_TABLE = "tlref_run_history"
+RUN_AT = os.environ.get("TLREF_SCHEDULE_AT", "18:00")  # Günlük çalışma saati (SS:DD)
+LOCK_KEY = 0x544C524546  # pg_advisory_lock anahtarı ("TLREF")
+POLL_SECONDS = 60  # Bekleme sırasında kilit bağlantısı bu aralıkla kontrol edilir
+RETRY_MINUTES = 30  # Başarısız çalışmadan sonra tekrar denemeden önce beklenecek süre
+PIPELINE_STAGE = "pipeline"  # Tüm aşamaların birlikte kaydedildiği satırın aşama adı
+
+logger = logging.getLogger(__name__)
+
+
+def run_tlref_stage(start_date):
+    return updater.daily_tlref_update(start_date=start_date, raise_errors=True)
+
+
+def run_cash_flow_stage(start_date):
+    return updater.update_cash_flow_tlref(raise_errors=True)
+
+
+# Sırayla çalışan aşamalar: (ad, fonksiyon); her fonksiyon etkilenen satır sayısını döndürür
+STAGES = [
+    ("tlref", run_tlref_stage),
+    ("cash_flow", run_cash_flow_stage)
+]
+
+
+class LockNotAcquired(Exception):
+    """Başka bir servis kopyası kilidi tutuyor"""
+
+
+# -------------------------------
+# Run-history tablosu
+# -------------------------------
+def create_run_history_table(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {RUN_HISTORY_TABLE} (
+            id BIGSERIAL PRIMARY KEY,
+            slot_date DATE NOT NULL,
+            stage VARCHAR(32) NOT NULL,
+            status VARCHAR(16) NOT NULL,
+            started_at TIMESTAMP NOT NULL,
+            finished_at TIMESTAMP,
+            duration_s DOUBLE PRECISION,
+            rows_affected INTEGER,
+            error TEXT,
+            host VARCHAR(255)
+        )
+    """)
+    cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{RUN_HISTORY_TABLE}_success
+        ON {RUN_HISTORY_TABLE} (stage, slot_date) WHERE status = 'success'
+    """)
+
+
+def record_run(slot_date, stage, status, started_at, duration_s, rows_affected=None, error=None):
+    with transaction() as cur:
+        cur.execute(f"""
+            INSERT INTO {RUN_HISTORY_TABLE}
+            (slot_date, stage, status, started_at, finished_at, duration_s, rows_affected, error, host)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (slot_date, stage, status, started_at, started_at + timedelta(seconds=duration_s),
+              duration_s, rows_affected, error, socket.gethostname()))
+
+
+def last_success_slot():
+    """Tüm aşamaları başarıyla tamamlanmış son günü döndür (hiç yoksa None)"""
+    with transaction() as cur:
+        cur.execute(f"""
+            SELECT MAX(slot_date) FROM {RUN_HISTORY_TABLE}
+            WHERE stage = %s AND status = 'success'
+        """, (PIPELINE_STAGE,))
+        return cur.fetchone()[0]
+
+
+def recent_runs(limit=20):
+    with transaction() as cur:
+        cur.execute(f"""
+            SELECT slot_date, stage, status, started_at, duration_s, rows_affected, error, host
+            FROM {RUN_HISTORY_TABLE}
+            ORDER BY id DESC
+            LIMIT %s
+        """, (limit,))
+        return cur.fetchall()
+
+
+# -------------------------------
+# Zamanlama
+# -------------------------------
+def run_time(slot_date):
+    hour, minute = (int(part) for part in RUN_AT.split(":"))
+    return datetime.combine(slot_date, datetime.min.time()).replace(hour=hour, minute=minute)
+
+
+def latest_due_slot(now):
+    """Çalışma saati geçmiş en son gün (saat 18:00'den önce dün, sonra bugün)"""
+    today = now.date()
+    return today if now >= run_time(today) else today - timedelta(days=1)
+
+
+def catch_up_start(last_success, due_slot):
+    """Kaçırılan günler varsayılan geriye bakma penceresinden eskiyse taramanın başlangıç tarihi"""
+    if last_success is None:
+        return None
+    default_start = due_slot - timedelta(days=updater.LOOKBACK_DAYS)
+    start = last_success - timedelta(days=updater.CARRY_FORWARD_DAYS)
+    return start if start < default_start else None
+
+
+def run_pipeline(slot_date, start_date=None):
+    """Aşamaları sırayla çalıştır; bir aşama hata verirse sonrakiler atlanır. Başarılıysa True"""
+    pipeline_started = datetime.now()
+    pipeline_clock = time.perf_counter()
+    total_rows = 0
+    failed = None
+
+    with tlref_metrics.job("scheduler") as run:
+        for stage, func in STAGES:
+            started_at = datetime.now()
+            clock = time.perf_counter()
+            if failed:
+                record_run(slot_date, stage, "skipped", started_at, 0.0, error=f"{failed} aşaması başarısız")
+                continue
+            try:
+                rows = func(start_date) or 0
+            except Exception as e:
+                logger.error(f"{slot_date} {stage} aşaması hatası: {e}")
+                record_run(slot_date, stage, "failed", started_at, time.perf_counter() - clock, error=str(e))
+                failed = stage
+                continue
+            total_rows += rows
+            record_run(slot_date, stage, "success", started_at, time.perf_counter() - clock, rows)
+            logger.info(f"✓ {slot_date} {stage}: {rows} satır ({time.perf_counter() - clock:.1f} sn)")
+        run["ok"] = failed is None
+
+    record_run(slot_date, PIPELINE_STAGE, "failed" if failed else "success", pipeline_started,
+               time.perf_counter() - pipeline_clock, total_rows,
+               error=f"{failed} aşaması başarısız" if failed else None)
+    return failed is None
+
+
+# -------------------------------
+# Tek kopya kilidi
+# -------------------------------
+def acquire_lock():
+    """Servis ömrü boyunca açık kalacak ayrı bir bağlantıda advisory lock al"""
+    conn = psycopg2.connect(connection_factory=MetricsConnection, **DB_CONFIG)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (LOCK_KEY,))
+        if not cur.fetchone()[0]:
+            conn.close()
+            raise LockNotAcquired("TLREF servisi başka bir yerde çalışıyor (advisory lock alınamadı)")
+    return conn
+
+
+def lock_alive(conn):
+    """Kilit bağlantısı kopmuşsa kilit de bırakılmıştır"""
+    if conn.closed:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def ensure_lock(conn):
+    """Kilit bağlantısı koptuysa kilidi yeniden almayı dene"""
+    if lock_alive(conn):
+        return conn
+    logger.warning("Kilit bağlantısı koptu, kilit yeniden alınıyor")
+    try:
+        conn.close()
+    except psycopg2.Error:
+        pass
+    return acquire_lock()
+
+
+# -------------------------------
+# Servis döngüsü
+# -------------------------------
+def run_daemon(once=False):
+    """Kilidi al, kaçırılan günleri telafi et ve her gün RUN_AT saatinde aşamaları çalıştır"""
+    lock_conn = acquire_lock()
+    tlref_metrics.serve()
+    stopping = []
+    previous_handler = signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    try:
+        with transaction() as cur:
+            create_run_history_table(cur)
+
+        last_success = last_success_slot()
+        retry_at = None
+        logger.info(f"TLREF servisi başladı (günlük {RUN_AT}, son başarılı gün: {last_success or 'yok'})")
+
+        while not stopping:
+            now = datetime.now()
+            due_slot = latest_due_slot(now)
+
+            if (last_success is None or last_success < due_slot) and (retry_at is None or now >= retry_at):
+                lock_conn = ensure_lock(lock_conn)
+                start_date = catch_up_start(last_success, due_slot)
+                if last_success is not None and due_slot - last_success > timedelta(days=1):
+                    logger.info(f"{last_success} sonrası {(due_slot - last_success).days} gün telafi ediliyor")
+                if run_pipeline(due_slot, start_date):
+                    last_success, retry_at = due_slot, None
+                else:
+                    retry_at = now + timedelta(minutes=RETRY_MINUTES)
+                    logger.warning(f"Çalışma başarısız, {retry_at:%H:%M} itibarıyla tekrar denenecek")
+                if once:
+                    return last_success == due_slot
+                continue
+
+            if once:
+                logger.info("Bekleyen çalışma yok")
+                return True
+
+            next_run = retry_at or run_time(due_slot + timedelta(days=1))
+            time.sleep(max(1, min(POLL_SECONDS, (next_run - datetime.now()).total_seconds())))
+            lock_conn = ensure_lock(lock_conn)
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        lock_conn.close()
+        logger.info("TLREF servisi durduruldu")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Servisi başlat")
+    run_parser.add_argument("--once", action="store_true", help="Bekleyen çalışmayı yap ve çık")
+
+    history_parser = sub.add_parser("history", help="Son çalışmaları listele")
+    history_parser.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        try:
+            ok = run_daemon(once=args.once)
+        except LockNotAcquired as e:
+            print(f"✗ {e}")
+            raise SystemExit(2)
+        except KeyboardInterrupt:
+            print("\nServis durduruldu.")
+            return
+        if not ok:
+            raise SystemExit(1)
+
+    elif args.command == "history":
+        with transaction() as cur:
+            create_run_history_table(cur)
+        print(f"{'Gün':10} | {'Aşama':9} | {'Durum':7} | {'Başlangıç':19} | {'Süre (sn)':>9} | {'Satır':>6}")
+        print("-" * 76)
+        for slot_date, stage, status, started_at, duration_s, rows, error, host in recent_runs(args.limit):
+            print(f"{slot_date} | {stage:9} | {status:7} | {started_at:%Y-%m-%d %H:%M:%S} | "
+                  f"{duration_s or 0:9.2f} | {rows if rows is not None else '-':>6}"
+                  f"{'  ' + error if error else ''}")
+
+
+if __name__ == "__main__":
+    main()
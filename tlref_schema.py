@@ -0,0 +1,332 @@
+"""TLREF ve cash_flow_analysis için indeks/bölümleme stratejisi ve migration
+
+Kullanım:
+    python tlref_schema.py status
+    python tlref_schema.py migrate --dry-run
+    python tlref_schema.py migrate
+    python tlref_schema.py migrate --partition-cash-flow
+"""
+import argparse
+from datetime import date
+
+import cash_flow_rollups
+from tlref_calendar import OVERRIDE_TABLE, create_override_table
+from tlref_db import transaction
+from tlref_index import create_index_columns, index_columns_exist, rebuild_index
+
+# -------------------------------
+# AYARLAR
+# -------------------------------
+TLREF_TABLE = "TLREF"
+CASH_FLOW_TABLE = "cash_flow_analysis"
+FUTURE_PARTITION_YEARS = 2  # Bölümlemede bu yıldan sonra kaç yıl için önceden bölüm açılsın
+
+# (ad soneki, yöntem, sütunlar, koşul) - adlar idx_<tablo>_<sonek> olarak üretilir.
+# tarih zaten UNIQUE olduğundan ayrı bir B-tree gerekmez; hafta_sonu seçiciliği çok düşük.
+# updated_at indeksi cash_flow_analysis'e değişiklik aktarımının yüksek su işareti aramasını karşılar.
+TLREF_INDEXES = [
+    ("yil_ay", "btree", "yil, ay", None),
+    ("updated_at", "btree", "updated_at", None)
+]
+
+# Eski kurulumlarda olmayan TLREF sütunları: (ad, tanım)
+TLREF_ADDED_COLUMNS = [
+    ("tasinan", "BOOLEAN NOT NULL DEFAULT FALSE")  # API'de olmadığı için önceki günden taşınmış yer tutucu
+]
+
+# cash_flow_analysis tarih sırasıyla eklenir; BRIN çok küçük kalır ve aralık sorgularına yeter.
+# Kısmi indeks sadece TLREF'i eksik satırları tutar, boşluk taramaları bunu kullanır.
+# BRIN "ORDER BY tarih DESC LIMIT 1" aramalarını karşılayamadığından, tatil doldurucunun
+# kaynak gün araması ve yüksek su işareti için dolu satırlara ayrı bir kısmi B-tree gerekir.
+CASH_FLOW_INDEXES = [
+    ("tarih_brin", "brin", "tarih", None),
+    ("tlref_bos", "btree", "tarih", "tlref_faiz IS NULL"),
+    ("tlref_dolu", "btree", "tarih", "tlref_faiz IS NOT NULL")
+]
+
+# Eski kurulumlardan kalan ve artık istenmeyen indeksler
+OBSOLETE_INDEXES = [
+    f"idx_{TLREF_TABLE}_tarih",
+    f"idx_{TLREF_TABLE}_hafta_sonu"
+]
+
+
+def index_name(table_name, suffix):
+    return f"idx_{table_name}_{suffix}"
+
+
+def index_statements(table_name, specs, if_not_exists=False):
+    """İndeks tanımlarından CREATE INDEX cümlelerini üret"""
+    statements = []
+    for suffix, method, columns, predicate in specs:
+        exists = "IF NOT EXISTS " if if_not_exists else ""
+        where = f" WHERE {predicate}" if predicate else ""
+        statements.append(
+            f"CREATE INDEX {exists}{index_name(table_name, suffix)} "
+            f"ON {table_name} USING {method} ({columns}){where}"
+        )
+    return statements
+
+
+def create_indexes(cur, table_name, specs, if_not_exists=False):
+    for statement in index_statements(table_name, specs, if_not_exists):
+        cur.execute(statement)
+
+
+def rename_indexes(cur, specs, from_table, to_table):
+    """from_table adıyla oluşturulmuş indeksleri to_table adlarına çevir"""
+    for suffix, _, _, _ in specs:
+        cur.execute(f"ALTER INDEX {index_name(from_table, suffix)} RENAME TO {index_name(to_table, suffix)}")
+
+
+def column_exists(cur, table_name, column):
+    cur.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_attribute
+            WHERE attrelid = to_regclass(%s) AND attname = %s AND NOT attisdropped
+        )
+    """, (table_name.lower(), column))
+    return cur.fetchone()[0]
+
+
+def relation_exists(cur, name):
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (name.lower(),))
+    return cur.fetchone()[0]
+
+
+def is_partitioned(cur, table_name):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table_name.lower(),))
+    row = cur.fetchone()
+    return row is not None and row[0] == "p"
+
+
+def dependent_views(cur, table_name):
+    """Tabloya bağlı view'ların (ad, tanım) listesini oluşturulma sırasıyla döndür"""
+    cur.execute("""
+        SELECT DISTINCT v.oid, v.oid::regclass::text, pg_get_viewdef(v.oid)
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        JOIN pg_class v ON v.oid = r.ev_class
+        WHERE d.refobjid = to_regclass(%s)
+          AND v.relkind = 'v'
+          AND v.oid <> d.refobjid
+        ORDER BY v.oid
+    """, (table_name.lower(),))
+    return [(name, definition) for _, name, definition in cur.fetchall()]
+
+
+def partition_name(table_name, year):
+    return f"{table_name}_{year}"
+
+
+def missing_year_partitions(cur, table_name=CASH_FLOW_TABLE, through_year=None):
+    """Verideki ilk yıldan through_year'a kadar henüz açılmamış yılları döndür"""
+    through_year = through_year or date.today().year + FUTURE_PARTITION_YEARS
+    cur.execute(f"SELECT MIN(EXTRACT(YEAR FROM tarih))::int FROM {table_name}")
+    first_year = cur.fetchone()[0] or date.today().year
+    return [year for year in range(first_year, through_year + 1)
+            if not relation_exists(cur, partition_name(table_name, year))]
+
+
+def ensure_year_partitions(cur, table_name=CASH_FLOW_TABLE, through_year=None):
+    """Eksik yıllık bölümleri aç; varsayılan bölüme düşmüş satırları yeni bölüme taşı"""
+    default_table = f"{table_name}_default"
+    created = []
+    for year in missing_year_partitions(cur, table_name, through_year):
+        partition = partition_name(table_name, year)
+        bounds = f"FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        cur.execute(f"CREATE TABLE {partition} (LIKE {table_name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        # Varsayılan bölümde bu yıla ait satır varsa ATTACH hata verir, önce taşınır
+        cur.execute(f"""
+            WITH moved AS (
+                DELETE FROM {default_table}
+                WHERE tarih >= '{year}-01-01' AND tarih < '{year + 1}-01-01'
+                RETURNING *
+            )
+            INSERT INTO {partition} SELECT * FROM moved
+        """)
+        cur.execute(f"ALTER TABLE {table_name} ATTACH PARTITION {partition} FOR VALUES {bounds}")
+        created.append(partition)
+    return created
+
+
+def partition_cash_flow(cur):
+    """cash_flow_analysis'i tarih üzerinden yıllık RANGE bölümlü tabloya dönüştür
+
+    Bölüm anahtarı birincil anahtarda olmak zorunda olduğundan ve tarih boş olabildiğinden
+    id üzerindeki birincil anahtar, bölüm başına normal indekse dönüşür.
+    Boş tarihli satırlar varsayılan bölümde kalır.
+    """
+    legacy_table = f"{CASH_FLOW_TABLE}_legacy"
+    views = dependent_views(cur, CASH_FLOW_TABLE)
+
+    cur.execute(f"LOCK TABLE {CASH_FLOW_TABLE} IN ACCESS EXCLUSIVE MODE")
+    cur.execute(f"ALTER TABLE {CASH_FLOW_TABLE} RENAME TO {legacy_table}")
+    cur.execute(f"""
+        CREATE TABLE {CASH_FLOW_TABLE}
+        (LIKE {legacy_table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+        PARTITION BY RANGE (tarih)
+    """)
+    cur.execute(f"CREATE TABLE {CASH_FLOW_TABLE}_default PARTITION OF {CASH_FLOW_TABLE} DEFAULT")
+
+    cur.execute(f"SELECT MIN(EXTRACT(YEAR FROM tarih))::int FROM {legacy_table}")
+    first_year = cur.fetchone()[0] or date.today().year
+    for year in range(first_year, date.today().year + FUTURE_PARTITION_YEARS + 1):
+        cur.execute(f"""
+            CREATE TABLE {partition_name(CASH_FLOW_TABLE, year)} PARTITION OF {CASH_FLOW_TABLE}
+            FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')
+        """)
+
+    cur.execute(f"INSERT INTO {CASH_FLOW_TABLE} SELECT * FROM {legacy_table}")
+    moved = cur.rowcount
+
+    # serial sütunların sequence'ları eski tabloya bağlı; tablo silinmeden önce yeni tabloya aktarılır
+    cur.execute("""
+        SELECT a.attname, pg_get_serial_sequence(%s, a.attname)
+        FROM pg_attribute a
+        WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped
+    """, (legacy_table, legacy_table))
+    for column, sequence in cur.fetchall():
+        if sequence:
+            cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY {CASH_FLOW_TABLE}.{column}")
+
+    cur.execute(f"DROP TABLE {legacy_table} CASCADE")
+    cur.execute(f"CREATE INDEX {index_name(CASH_FLOW_TABLE, 'id')} ON {CASH_FLOW_TABLE} (id)")
+    for name, definition in views:
+        cur.execute(f"CREATE OR REPLACE VIEW {name} AS {definition}")
+    # Değişiklik tetikleyicileri eski tabloyla birlikte silindi
+    if cash_flow_rollups.rollup_exists(cur):
+        cash_flow_rollups.create_change_capture(cur)
+    return moved
+
+
+def ensure_tlref_columns(cur):
+    """migrate çalıştırılmamış kurulumda yazıcıların kullandığı TLREF sütunlarını ekle
+
+    Sütunlar plan_migration ile aynı sırada eklenir, endeks sütunları baştan hesaplanır.
+    Eklenen sütunların adlarını döndürür.
+    """
+    if not relation_exists(cur, TLREF_TABLE):
+        return []
+    added = []
+    if not index_columns_exist(cur, TLREF_TABLE):
+        create_index_columns(cur, TLREF_TABLE)
+        rebuild_index(cur, TLREF_TABLE)
+        added += ["kumulatif_endeks", "kumulatif_toplam"]
+    for column, definition in TLREF_ADDED_COLUMNS:
+        if not column_exists(cur, TLREF_TABLE, column):
+            cur.execute(f"ALTER TABLE {TLREF_TABLE} ADD COLUMN IF NOT EXISTS {column} {definition}")
+            added.append(column)
+    return added
+
+
+def plan_migration(cur, partition=False):
+    """Uygulanacak adımları (açıklama, fonksiyon) listesi olarak döndür"""
+    steps = []
+    for name in OBSOLETE_INDEXES:
+        if relation_exists(cur, name):
+            steps.append((f"DROP INDEX {name}", lambda c, n=name: c.execute(f"DROP INDEX IF EXISTS {n}")))
+
+    converting = (partition and relation_exists(cur, CASH_FLOW_TABLE)
+                  and not is_partitioned(cur, CASH_FLOW_TABLE))
+    if converting:
+        steps.append((f"{CASH_FLOW_TABLE} tablosunu yıllık bölümlere dönüştür", partition_cash_flow))
+    elif is_partitioned(cur, CASH_FLOW_TABLE) and missing_year_partitions(cur):
+        steps.append((f"{CASH_FLOW_TABLE} için eksik yıllık bölümleri aç", ensure_year_partitions))
+
+    if relation_exists(cur, TLREF_TABLE) and not index_columns_exist(cur, TLREF_TABLE):
+        def add_index_columns(c):
+            create_index_columns(c, TLREF_TABLE)
+            rebuild_index(c, TLREF_TABLE)
+        steps.append((f"{TLREF_TABLE} tablosuna kümülatif endeks sütunlarını ekle ve hesapla", add_index_columns))
+
+    # Sütunlar tlref_tablo_creator.TABLE_COLUMNS_SQL ile aynı sırada eklenir; SELECT * view'ları
+    # gölge tabloyla değiştirmeden sonra da aynı sütun sırasını görür
+    for column, definition in TLREF_ADDED_COLUMNS:
+        if relation_exists(cur, TLREF_TABLE) and not column_exists(cur, TLREF_TABLE, column):
+            statement = f"ALTER TABLE {TLREF_TABLE} ADD COLUMN {column} {definition}"
+            steps.append((statement, lambda c, s=statement: c.execute(s)))
+
+    if not relation_exists(cur, OVERRIDE_TABLE):
+        steps.append((f"{OVERRIDE_TABLE} takvim istisna tablosunu oluştur", create_override_table))
+
+    if relation_exists(cur, CASH_FLOW_TABLE) and not relation_exists(cur, cash_flow_rollups.ROLLUP_TABLE):
+        def add_cash_flow_rollups(c):
+            cash_flow_rollups.create_rollup_table(c)
+            cash_flow_rollups.rebuild_rollups(c)
+        steps.append((f"{cash_flow_rollups.ROLLUP_TABLE} özet tablosunu oluştur ve hesapla", add_cash_flow_rollups))
+    elif relation_exists(cur, CASH_FLOW_TABLE) and not cash_flow_rollups.change_capture_exists(cur):
+        # Tetikleyicilerden önce yapılan değişiklikler kuyruğa düşmemiştir, kovalar baştan hesaplanır
+        def add_change_capture(c):
+            cash_flow_rollups.create_change_capture(c)
+            cash_flow_rollups.rebuild_rollups(c)
+        steps.append((f"{CASH_FLOW_TABLE} değişiklik tetikleyicilerini kur ve özetleri yeniden hesapla",
+                      add_change_capture))
+
+    for table_name, specs in ((TLREF_TABLE, TLREF_INDEXES), (CASH_FLOW_TABLE, CASH_FLOW_INDEXES)):
+        if not relation_exists(cur, table_name):
+            continue
+        rebuilt = converting and table_name == CASH_FLOW_TABLE
+        for spec, statement in zip(specs, index_statements(table_name, specs, if_not_exists=True)):
+            # Dönüştürülen tablonun indeksleri yeni tabloda yeniden kurulur
+            if rebuilt or not relation_exists(cur, index_name(table_name, spec[0])):
+                steps.append((statement, lambda c, s=statement: c.execute(s)))
+    return steps
+
+
+def migrate(partition=False, dry_run=False):
+    """Eski indeksleri kaldır, yeni indeksleri (ve istenirse bölümlemeyi) tek işlemde uygula"""
+    with transaction() as cur:
+        steps = plan_migration(cur, partition)
+        for description, apply in steps:
+            print(f"  {'(deneme) ' if dry_run else ''}{description}")
+            if not dry_run:
+                apply(cur)
+        if not dry_run:
+            for table_name in (TLREF_TABLE, CASH_FLOW_TABLE):
+                if relation_exists(cur, table_name):
+                    cur.execute(f"ANALYZE {table_name}")
+    return len(steps)
+
+
+def index_report(cur):
+    """İki tablodaki indekslerin (tablo, indeks, boyut, tanım) listesi"""
+    cur.execute("""
+        SELECT i.tablename, i.indexname,
+               pg_size_pretty(pg_relation_size(to_regclass(i.schemaname || '.' || i.indexname))),
+               i.indexdef
+        FROM pg_indexes i
+        WHERE i.schemaname = current_schema()
+          AND (i.tablename = %s OR i.tablename LIKE %s)
+        ORDER BY i.tablename, i.indexname
+    """, (TLREF_TABLE.lower(), CASH_FLOW_TABLE.lower() + "%"))
+    return cur.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("status", help="Mevcut indeksleri ve boyutlarını göster")
+    migrate_parser = sub.add_parser("migrate", help="İndeks stratejisini uygula")
+    migrate_parser.add_argument("--partition-cash-flow", action="store_true",
+                                help="cash_flow_analysis'i yıllık bölümlere dönüştür")
+    migrate_parser.add_argument("--dry-run", action="store_true", help="Sadece yapılacakları göster")
+
+    args = parser.parse_args()
+
+    if args.command == "status":
+        with transaction() as cur:
+            for table_name, name, size, definition in index_report(cur):
+                print(f"{table_name:30} {name:40} {size:>10}  {definition}")
+
+    elif args.command == "migrate":
+        count = migrate(args.partition_cash_flow, args.dry_run)
+        if count == 0:
+            print("✓ Şema güncel, yapılacak değişiklik yok")
+        elif not args.dry_run:
+            print(f"✓ {count} adım uygulandı")
+
+
+if __name__ == "__main__":
+    main()
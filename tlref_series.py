@@ -0,0 +1,219 @@
+"""Gün numarası -> TLREF değerini NumPy dizilerinde tutan bellek içi seri
+
+Tüm seri bir kez yüklenir; tam tarih ve "D gününde veya öncesindeki en son değer"
+aramaları veritabanına gitmeden O(1) yapılır.
+"""
+from datetime import date
+
+import numpy as np
+
+from tlref_db import transaction
+
+# -------------------------------
+# AYARLAR
+# -------------------------------
+TABLE_NAME = "TLREF"
+
+
+def _ordinals(dates):
+    """date/datetime/np.datetime64 dizisini proleptik gün numaralarına çevir"""
+    values = np.asarray(dates if hasattr(dates, "__len__") else list(dates))
+    if np.issubdtype(values.dtype, np.datetime64):
+        # datetime64 dönemi 1970-01-01; date.toordinal ile aynı eksene kaydır
+        return values.astype("datetime64[D]").astype(np.int64) + date(1970, 1, 1).toordinal()
+    return np.fromiter((d.toordinal() for d in values), dtype=np.int64, count=len(values))
+
+
+class TlrefSeries:
+    """Günlük yoğun dizi: values[gün - start] oran (yoksa NaN), last_index[gün - start] son dolu gün"""
+
+    def __init__(self, dates=(), rates=()):
+        ordinals = _ordinals(dates)
+        rates = np.asarray(rates, dtype=np.float64)
+        if len(ordinals) == 0:
+            self.start = 0
+            self.values = np.empty(0, dtype=np.float64)
+            self.last_index = np.empty(0, dtype=np.int64)
+            return
+
+        self.start = int(ordinals.min())
+        self.values = np.full(int(ordinals.max()) - self.start + 1, np.nan)
+        # Aynı tarih birden fazla gelirse son değer kazanır
+        self.values[ordinals - self.start] = rates
+        self.last_index = np.empty(len(self.values), dtype=np.int64)
+        self._rebuild_index()
+
+    def _rebuild_index(self, offset=0):
+        """offset'ten itibaren her gün için en son dolu günün indeksini ileri taşı"""
+        known = np.where(np.isnan(self.values[offset:]), -1, np.arange(offset, len(self.values)))
+        if offset:
+            known[0] = max(known[0], self.last_index[offset - 1])
+        self.last_index[offset:] = np.maximum.accumulate(known)
+
+    @property
+    def end(self):
+        return self.start + len(self.values) - 1
+
+    def __len__(self):
+        return int(np.count_nonzero(~np.isnan(self.values)))
+
+    def __contains__(self, date_val):
+        return self.get(date_val) is not None
+
+    def __repr__(self):
+        if not len(self.values):
+            return "TlrefSeries(boş)"
+        return (f"TlrefSeries({date.fromordinal(self.start)} - {date.fromordinal(self.end)}, "
+                f"{len(self)} değer)")
+
+    # -------------------------------
+    # Yükleme / kaydetme
+    # -------------------------------
+    @classmethod
+    def from_db(cls, start_date=None, end_date=None, table=TABLE_NAME,
+                date_column="tarih", value_column="tlref_oran", cur=None):
+        """Tablodan (tarih, değer) çiftlerini tek sorguda okuyup seri oluştur"""
+        conditions, params = [f"{value_column} IS NOT NULL"], []
+        if start_date is not None:
+            conditions.append(f"{date_column} >= %s")
+            params.append(start_date)
+        if end_date is not None:
+            conditions.append(f"{date_column} <= %s")
+            params.append(end_date)
+
+        # Aynı tarihte birden fazla satır olabilir (cash_flow_analysis), tarih başına tek değer alınır
+        sql = f"""
+            SELECT {date_column}, MAX({value_column})
+            FROM {table}
+            WHERE {' AND '.join(conditions)}
+            GROUP BY {date_column}
+        """
+        if cur is None:
+            with transaction() as cur:
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+        else:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        return cls([d for d, _ in rows], [float(v) for _, v in rows])
+
+    @classmethod
+    def from_cash_flow(cls, start_date=None, end_date=None, cur=None):
+        """cash_flow_analysis'teki dolu tlref_faiz değerlerinden seri oluştur"""
+        return cls.from_db(start_date, end_date, table="cash_flow_analysis",
+                           value_column="tlref_faiz", cur=cur)
+
+    @classmethod
+    def from_frame(cls, df, date_column="Tarih", value_column="TLREF"):
+        """(Tarih, TLREF) çerçevesinden seri oluştur"""
+        return cls(df[date_column].values, df[value_column].values)
+
+    def save(self, path):
+        """Seriyi .npz anlık görüntüsü olarak kaydet"""
+        np.savez_compressed(path, start=self.start, values=self.values)
+
+    @classmethod
+    def load(cls, path):
+        """save ile kaydedilmiş anlık görüntüyü yükle"""
+        with np.load(path) as data:
+            series = cls()
+            series.start = int(data["start"])
+            series.values = data["values"].astype(np.float64)
+            series.last_index = np.empty(len(series.values), dtype=np.int64)
+            series._rebuild_index()
+        return series
+
+    # -------------------------------
+    # Arama
+    # -------------------------------
+    def get(self, date_val):
+        """Tam tarih araması; değer yoksa None"""
+        offset = date_val.toordinal() - self.start
+        if offset < 0 or offset >= len(self.values):
+            return None
+        value = self.values[offset]
+        return None if np.isnan(value) else float(value)
+
+    def asof(self, date_val, max_days=None, strict=False):
+        """date_val gününde (strict ise öncesinde) veya öncesindeki en son (kaynak tarih, değer)
+
+        max_days verilirse kaynak, date_val'den en fazla bu kadar gün önce olabilir.
+        Bulunamazsa (None, None) döner.
+        """
+        ordinal = date_val.toordinal()
+        offset = min(ordinal - strict - self.start, len(self.values) - 1)
+        if offset < 0:
+            return None, None
+        source = self.last_index[offset]
+        if source < 0 or (max_days is not None and ordinal - (self.start + source) > max_days):
+            return None, None
+        return date.fromordinal(int(self.start + source)), float(self.values[source])
+
+    def asof_many(self, dates, max_days=None, strict=False):
+        """asof'un vektörel hali; (kaynak tarihler datetime64[D], değerler) döndürür, bulunamayanlar NaT/NaN"""
+        ordinals = _ordinals(dates)
+        source_dates = np.full(len(ordinals), np.datetime64("NaT"), dtype="datetime64[D]")
+        rates = np.full(len(ordinals), np.nan)
+        if not len(self.values) or not len(ordinals):
+            return source_dates, rates
+
+        offsets = np.minimum(ordinals - int(strict) - self.start, len(self.values) - 1)
+        valid = offsets >= 0
+        sources = np.full(len(ordinals), -1, dtype=np.int64)
+        sources[valid] = self.last_index[offsets[valid]]
+        found = sources >= 0
+        if max_days is not None:
+            found &= ordinals - (self.start + sources) <= max_days
+
+        epoch = date(1970, 1, 1).toordinal()
+        source_dates[found] = (self.start + sources[found] - epoch).astype("datetime64[D]")
+        rates[found] = self.values[sources[found]]
+        return source_dates, rates
+
+    def slice(self, start_date=None, end_date=None):
+        """[start_date, end_date] aralığındaki değerleri yeni seri olarak döndür"""
+        first = 0 if start_date is None else max(start_date.toordinal() - self.start, 0)
+        last = len(self.values) if end_date is None else max(end_date.toordinal() - self.start + 1, 0)
+        part = TlrefSeries()
+        part.values = self.values[first:last].copy()
+        part.start = self.start + first
+        part.last_index = np.empty(len(part.values), dtype=np.int64)
+        if len(part.values):
+            part._rebuild_index()
+        return part
+
+    def items(self):
+        """(tarih, değer) çiftlerini tarih sırasıyla döndür"""
+        for offset in np.flatnonzero(~np.isnan(self.values)):
+            yield date.fromordinal(int(self.start + offset)), float(self.values[offset])
+
+    # -------------------------------
+    # Güncelleme
+    # -------------------------------
+    def set(self, date_val, rate):
+        """Bir günün değerini yaz; sonraki günlerin as-of indeksini sadece o günden itibaren güncelle"""
+        ordinal = date_val.toordinal()
+        if not len(self.values):
+            self.start = ordinal
+            self.values = np.array([float(rate)])
+            self.last_index = np.zeros(1, dtype=np.int64)
+            return
+
+        if ordinal < self.start:
+            pad = self.start - ordinal
+            self.values = np.concatenate([np.full(pad, np.nan), self.values])
+            self.last_index = np.empty(len(self.values), dtype=np.int64)
+            self.start = ordinal
+            self.values[0] = float(rate)
+            self._rebuild_index()
+            return
+
+        if ordinal > self.end:
+            grow = ordinal - self.end
+            self.values = np.concatenate([self.values, np.full(grow, np.nan)])
+            self.last_index = np.concatenate([self.last_index, np.full(grow, self.last_index[-1])])
+
+        offset = ordinal - self.start
+        self.values[offset] = float(rate)
+        self._rebuild_index(offset)
+
@@ -1,63 +1,121 @@
+import numpy as np
 import pandas as pd
-import psycopg2
-from datetime import datetime
-import os
+import io
 import time
 
+import tlref_cli
+import tlref_metrics
+from evds_excel import find_excel_file, incremental_window_start, read_evds_frame, select_changed_rows
+from tlref_db import transaction
+from tlref_index import WINDOW_FUNCTION, compute_index, create_index_columns, rebuild_index, refresh_index
+from tlref_rollups import create_rollup_tables, rebuild_rollups, refresh_rollups
+from tlref_schema import TLREF_INDEXES, create_indexes, dependent_views, rename_indexes
+from tlref_series import TlrefSeries
+
 # -------------------------------
 # AYARLAR
 # -------------------------------
 EXCEL_FILE = "EVDS_Uzun_Tarih.xlsx"
-DB_CONFIG = {
-    "host":"192.168.182.3","dbname":"tmks-ftp","user":"postgres","password":"postgres.db!"
-}
 TABLE_NAME = "TLREF"
 BATCH_SIZE = 100  # Büyük veri için batch boyutu
+LOAD_MODE = "copy"  # "copy": COPY + tek merge, "batch": eski executemany yolu
+REBUILD_MODE = "shadow"  # "shadow": gölge tabloya yükle + atomik değiştir, "drop": tabloyu silip yeniden oluştur
+SWAP_LOCK_TIMEOUT = "5s"  # Değiştirme sırasında okuyucuların kilidini en fazla bu kadar bekle
+FILL_LOOKBACK_DAYS = 7  # Eksik gün doldururken en fazla kaç gün geriye bakılsın
+
+TABLE_COLUMNS_SQL = """
+    id SERIAL,
+    tarih DATE NOT NULL,
+    tlref_oran DECIMAL(10, 6) NOT NULL,
+    tlref_yuzde DECIMAL(8, 6) NOT NULL,
+    gun_adi VARCHAR(20),
+    hafta_sonu BOOLEAN DEFAULT FALSE,
+    yil INTEGER,
+    ay INTEGER,
+    gun INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    kumulatif_endeks DOUBLE PRECISION,
+    kumulatif_toplam DOUBLE PRECISION,
+    tasinan BOOLEAN NOT NULL DEFAULT FALSE
+"""
+
+def create_table_indexes(cur, table_name):
+    """Birincil anahtar, tarih tekilliği ve tlref_schema'daki yardımcı indeksleri oluştur"""
+    cur.execute(f"""
+        ALTER TABLE {table_name}
+            ADD CONSTRAINT {table_name}_pkey PRIMARY KEY (id),
+            ADD CONSTRAINT {table_name}_tarih_key UNIQUE (tarih)
+    """)
+    create_indexes(cur, table_name, TLREF_INDEXES)
 
 def create_tlref_table():
     """TLREF tablosunu oluştur"""
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        # Önce tabloyu sil (varsa)
-        cur.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
-        
-        # Yeni tabloyu oluştur
-        create_table_sql = f"""
-        CREATE TABLE {TABLE_NAME} (
-            id SERIAL PRIMARY KEY,
-            tarih DATE NOT NULL UNIQUE,
-            tlref_oran DECIMAL(10, 6) NOT NULL,
-            tlref_yuzde DECIMAL(8, 6) NOT NULL,
-            gun_adi VARCHAR(20),
-            hafta_sonu BOOLEAN DEFAULT FALSE,
-            yil INTEGER,
-            ay INTEGER,
-            gun INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """
-        
-        cur.execute(create_table_sql)
-        
-        # İndeksler oluştur
-        cur.execute(f"CREATE INDEX idx_{TABLE_NAME}_tarih ON {TABLE_NAME}(tarih);")
-        cur.execute(f"CREATE INDEX idx_{TABLE_NAME}_yil_ay ON {TABLE_NAME}(yil, ay);")
-        cur.execute(f"CREATE INDEX idx_{TABLE_NAME}_hafta_sonu ON {TABLE_NAME}(hafta_sonu);")
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+        with transaction() as cur:
+            # Önce tabloyu sil (varsa)
+            cur.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+            
+            # Yeni tabloyu oluştur
+            cur.execute(f"CREATE TABLE {TABLE_NAME} ({TABLE_COLUMNS_SQL});")
+            
+            # İndeksler oluştur
+            create_table_indexes(cur, TABLE_NAME)
+            create_index_columns(cur, TABLE_NAME)
         
         print(f"✓ Tablo '{TABLE_NAME}' başarıyla oluşturuldu")
         return True
-        
+    
     except Exception as e:
         print(f"✗ Tablo oluşturma hatası: {e}")
         return False
 
+def fill_date_gaps(df, max_lookback_days=FILL_LOOKBACK_DAYS):
+    """Eksik günleri TlrefSeries as-of araması ile doldur, (doldurulmuş_df, rapor_df) döndür"""
+    # Aynı tarih birden fazla kez varsa ilk kayıt kaynak kabul edilir
+    source = df[['Tarih', 'TLREF']].copy()
+    source['Tarih'] = source['Tarih'].dt.normalize()
+    source = source.drop_duplicates(subset='Tarih', keep='first').set_index('Tarih')
+
+    full_date_range = pd.date_range(start=source.index.min(), end=source.index.max(), freq='D')
+    missing_dates = full_date_range[~full_date_range.isin(source.index)]
+
+    report_columns = ['Tarih', 'Kaynak_Tarih', 'TLREF']
+    if len(missing_dates) == 0:
+        return df, pd.DataFrame(columns=report_columns)
+
+    # Her eksik gün için en son mevcut tarihi ve değerini vektörel as-of ile bul
+    series = TlrefSeries.from_frame(source.reset_index())
+    carried_from, carried_values = series.asof_many(missing_dates.values, max_lookback_days)
+    within_limit = ~np.isnan(carried_values)
+
+    filled_dates = missing_dates[within_limit]
+    report_df = pd.DataFrame({
+        'Tarih': filled_dates,
+        'Kaynak_Tarih': pd.to_datetime(carried_from[within_limit]),
+        'TLREF': carried_values[within_limit]
+    })
+
+    if report_df.empty:
+        return df, report_df
+
+    filled_df = pd.DataFrame({
+        'Tarih': filled_dates,
+        'TLREF': report_df['TLREF'].values,
+        'TLREF_Yuzde': report_df['TLREF'].values / 100.0,
+        'Gun_Adi': filled_dates.day_name(),
+        'Hafta_Sonu': filled_dates.dayofweek >= 5,
+        'Yil': filled_dates.year,
+        'Ay': filled_dates.month,
+        'Gun': filled_dates.day,
+        'Tasinan': True
+    })
+
+    combined_df = pd.concat([df, filled_df], ignore_index=True)
+    combined_df = combined_df.sort_values('Tarih', kind='stable').reset_index(drop=True)
+    return combined_df, report_df
+
+@tlref_metrics.stage("gap_fill")
 def fill_missing_dates(df):
     """Eksik tarihleri bir önceki günün TLREF değeri ile doldur"""
     try:
@@ -67,72 +125,28 @@ def fill_missing_dates(df):
         
         print(f"Tarih aralığı: {start_date.strftime('%d.%m.%Y')} - {end_date.strftime('%d.%m.%Y')}")
         
-        # Tüm tarihlerin olması gereken aralığı oluştur
-        full_date_range = pd.date_range(start=start_date, end=end_date, freq='D')
-        
-        # Mevcut tarihleri set'e çevir
-        existing_dates = set(df['Tarih'].dt.date)
-        
-        # Eksik tarihleri bul
-        missing_dates = []
-        for date in full_date_range:
-            if date.date() not in existing_dates:
-                missing_dates.append(date)
+        total_days = (end_date.normalize() - start_date.normalize()).days + 1
+        missing_count = total_days - df['Tarih'].dt.normalize().nunique()
         
-        print(f"Eksik tarih sayısı: {len(missing_dates)}")
+        print(f"Eksik tarih sayısı: {missing_count}")
         
-        if len(missing_dates) == 0:
+        if missing_count == 0:
             print("Tüm tarihler mevcut, doldurma gerekmiyor.")
             return df
         
-        # Eksik tarihleri doldur
-        filled_records = []
+        # Maksimum 7 gün geriye giderek doldur
+        combined_df, report_df = fill_date_gaps(df)
         
-        for missing_date in missing_dates:
-            # Önceki günün TLREF değerini bul
-            prev_date = missing_date - pd.Timedelta(days=1)
-            search_attempts = 0
-            prev_tlref = None
-            
-            # Maksimum 7 gün geriye git
-            while search_attempts < 7 and prev_tlref is None:
-                prev_record = df[df['Tarih'].dt.date == prev_date.date()]
-                
-                if not prev_record.empty:
-                    prev_tlref = prev_record.iloc[0]['TLREF']
-                    break
-                
-                prev_date = prev_date - pd.Timedelta(days=1)
-                search_attempts += 1
-            
-            if prev_tlref is not None:
-                # Yeni kayıt oluştur
-                new_record = {
-                    'Tarih': missing_date,
-                    'TLREF': prev_tlref,
-                    'TLREF_Yuzde': prev_tlref / 100.0,
-                    'Gun_Adi': missing_date.day_name(),
-                    'Hafta_Sonu': missing_date.dayofweek >= 5,
-                    'Yil': missing_date.year,
-                    'Ay': missing_date.month,
-                    'Gun': missing_date.day
-                }
-                filled_records.append(new_record)
-                
-                # İlk 10 tanesini göster
-                if len(filled_records) <= 10:
-                    print(f"  {missing_date.strftime('%d.%m.%Y')} ({missing_date.day_name()}): TLREF {prev_tlref:.4f} (önceki günden)")
-        
-        if len(filled_records) > 10:
-            print(f"  ... ve {len(filled_records) - 10} tarih daha dolduruldu")
-        
-        # Yeni kayıtları DataFrame'e ekle
-        if filled_records:
-            filled_df = pd.DataFrame(filled_records)
-            combined_df = pd.concat([df, filled_df], ignore_index=True)
-            combined_df = combined_df.sort_values('Tarih').reset_index(drop=True)
-            
-            print(f"Toplam kayıt: {len(df)} -> {len(combined_df)} (+{len(filled_records)} dolduruldu)")
+        # İlk 10 tanesini göster
+        for row in report_df.head(10).itertuples(index=False):
+            print(f"  {row.Tarih.strftime('%d.%m.%Y')} ({row.Tarih.day_name()}): TLREF {row.TLREF:.4f} "
+                  f"({row.Kaynak_Tarih.strftime('%d.%m.%Y')} tarihinden)")
+        
+        if len(report_df) > 10:
+            print(f"  ... ve {len(report_df) - 10} tarih daha dolduruldu")
+        
+        if not report_df.empty:
+            print(f"Toplam kayıt: {len(df)} -> {len(combined_df)} (+{len(report_df)} dolduruldu)")
             return combined_df
         else:
             print("Hiçbir eksik tarih doldurulamadı")
@@ -142,79 +156,44 @@ def fill_missing_dates(df):
         print(f"Tarih doldurma hatası: {e}")
         return df
 
-def read_excel_long_data():
-    """Excel dosyasından uzun vadeli TLREF verilerini oku"""
+def add_derived_columns(df):
+    """TLREF_Yuzde, gün adı, hafta sonu ve yıl/ay/gün sütunlarını ekle"""
+    df['TLREF_Yuzde'] = df['TLREF'] / 100.0
+    df['Gun_Adi'] = df['Tarih'].dt.day_name()
+    df['Hafta_Sonu'] = df['Tarih'].dt.dayofweek >= 5  # Cumartesi(5) ve Pazar(6)
+    df['Yil'] = df['Tarih'].dt.year
+    df['Ay'] = df['Tarih'].dt.month
+    df['Gun'] = df['Tarih'].dt.day
+    return df
+
+def read_excel_long_data(since=None):
+    """Excel dosyasından uzun vadeli TLREF verilerini oku (since verilirse sadece o tarihten sonrası)"""
     try:
         # Dosya yolu kontrolü
-        desktop_path = os.path.join(os.path.expanduser("~"), "Desktop", EXCEL_FILE)
-        current_path = EXCEL_FILE
-        
-        file_path = None
-        if os.path.exists(desktop_path):
-            file_path = desktop_path
-        elif os.path.exists(current_path):
-            file_path = current_path
-        else:
+        file_path = find_excel_file(EXCEL_FILE)
+        if file_path is None:
             print(f"{EXCEL_FILE} dosyası bulunamadı.")
             return None
             
         print(f"Excel dosyası okunuyor: {file_path}")
         
-        # Excel dosyasını oku
-        df = pd.read_excel(file_path, sheet_name='EVDS')
+        # Sadece tarih ve TLREF sütunlarını oku
+        df = read_evds_frame(file_path)
         
         print(f"Ham veri: {len(df)} satır")
         
-        # Sütun isimlerini temizle
-        df.columns = df.columns.str.strip()
-        
-        # TLREF sütununu bul
-        tlref_column = None
-        for col in df.columns:
-            if 'TLREF' in col.upper() or 'ORAN' in col.upper():
-                tlref_column = col
-                break
-        
-        if tlref_column is None:
-            print("TLREF sütunu bulunamadı")
-            return None
-            
-        print(f"TLREF sütunu: {tlref_column}")
-        
-        # Veriyi temizle
-        df = df.dropna(subset=[tlref_column])
-        
-        # Tarih sütununu datetime'a çevir
-        date_column = df.columns[0]
-        
-        try:
-            if df[date_column].dtype == 'object':
-                df[date_column] = pd.to_datetime(df[date_column], format='%d-%m-%Y', errors='coerce')
-            else:
-                df[date_column] = pd.to_datetime(df[date_column], errors='coerce')
-        except:
-            print("Tarih dönüşümünde sorun var")
-            return None
-        
-        # Tarih dönüşümü başarısız olan satırları kaldır
-        df = df.dropna(subset=[date_column])
+        if since is not None:
+            # Doldurma için önceki günlerden birkaç gerçek satır da alınır
+            df = df[df['Tarih'] >= pd.Timestamp(since) - pd.Timedelta(days=FILL_LOOKBACK_DAYS)]
+            print(f"{pd.Timestamp(since).strftime('%d.%m.%Y')} sonrası için {len(df)} satır seçildi")
+            if df.empty:
+                return df
         
         # Tarihe göre sırala (eskiden yeniye)
-        df = df.sort_values(date_column, ascending=True)
-        
-        # Kolon isimlerini standartlaştır
-        df = df.rename(columns={
-            date_column: 'Tarih',
-            tlref_column: 'TLREF'
-        })
+        df = df.sort_values('Tarih', ascending=True)
         
         # Ek bilgiler ekle
-        df['TLREF_Yuzde'] = df['TLREF'] / 100.0
-        df['Gun_Adi'] = df['Tarih'].dt.day_name()
-        df['Hafta_Sonu'] = df['Tarih'].dt.dayofweek >= 5  # Cumartesi(5) ve Pazar(6)
-        df['Yil'] = df['Tarih'].dt.year
-        df['Ay'] = df['Tarih'].dt.month
-        df['Gun'] = df['Tarih'].dt.day
+        df = add_derived_columns(df)
         
         print(f"İşlenmiş veri: {len(df)} satır")
         print(f"Tarih aralığı: {df['Tarih'].min().strftime('%d.%m.%Y')} - {df['Tarih'].max().strftime('%d.%m.%Y')}")
@@ -230,258 +209,504 @@ def read_excel_long_data():
         print(f"Excel okuma hatası: {e}")
         return None
 
-def insert_data_in_batches(df):
-    """Veriyi batch'ler halinde tabloya ekle"""
+def get_high_water_mark():
+    """Tablodaki en son tarihi döndür (tablo boşsa None)"""
+    with transaction() as cur:
+        cur.execute(f"SELECT MAX(tarih) FROM {TABLE_NAME}")
+        return cur.fetchone()[0]
+
+def load_existing_rates(since):
+    """since tarihinden itibaren tablodaki gerçek (taşınmamış) (Tarih, TLREF) değerlerini getir
+
+    Taşınmış satırlar hiçbir Excel satırıyla eşleşmez; Excel'de gerçek değer varsa yazılır.
+    """
+    with transaction() as cur:
+        cur.execute(f"""
+            SELECT tarih, tlref_oran
+            FROM {TABLE_NAME}
+            WHERE tarih >= %s AND NOT tasinan
+        """, (pd.Timestamp(since).date(),))
+        rows = cur.fetchall()
+    return pd.DataFrame({
+        'Tarih': pd.to_datetime([tarih for tarih, _ in rows]),
+        'TLREF': [float(oran) for _, oran in rows]
+    })
+
+def incremental_update(df=None, dry_run=False):
+    """Sadece tablonun son tarihinden sonraki ve revizyon penceresinde değişen satırları ekle
+
+    dry_run ile yazılacak satırlar sadece raporlanır.
+    """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
+        high_water_mark = get_high_water_mark()
         
-        total_records = len(df)
-        total_batches = (total_records + BATCH_SIZE - 1) // BATCH_SIZE
+        if high_water_mark is None:
+            print("Tablo boş, tam yükleme yapılıyor...")
+            df = df if df is not None else read_excel_long_data()
+            if df is not None and dry_run:
+                print(f"Kuru çalışma: {len(df)} satır eklenecekti")
+                return True
+            return df is not None and insert_data(df)
         
-        print(f"\n{total_records} kayıt {BATCH_SIZE}'er kayıt halinde {total_batches} batch'te ekleniyor...")
+        since = incremental_window_start(high_water_mark)
+        print(f"Tablodaki son tarih: {high_water_mark} | Kontrol başlangıcı: {since.strftime('%d.%m.%Y')}")
         
-        inserted_count = 0
+        if df is None:
+            df = read_excel_long_data(since=since)
+            if df is None:
+                return False
         
-        for i in range(0, total_records, BATCH_SIZE):
-            batch_df = df.iloc[i:i+BATCH_SIZE]
-            batch_num = (i // BATCH_SIZE) + 1
-            
-            print(f"Batch {batch_num}/{total_batches} işleniyor...")
-            
-            # Batch verilerini hazırla
-            insert_data = []
-            for _, row in batch_df.iterrows():
-                insert_data.append((
-                    row['Tarih'].date(),
-                    float(row['TLREF']),
-                    float(row['TLREF_Yuzde']),
-                    row['Gun_Adi'],
-                    bool(row['Hafta_Sonu']),
-                    int(row['Yil']),
-                    int(row['Ay']),
-                    int(row['Gun'])
-                ))
+        # Parmak izi aynı olan (değişmemiş) satırlar tamamen atlanır
+        changed_df = select_changed_rows(df, load_existing_rates(since), since)
+        
+        print(f"Yeni veya değişen satır: {len(changed_df)}")
+        if changed_df.empty:
+            print("✓ Tablo güncel, eklenecek satır yok")
+            return True
+        
+        if dry_run:
+            print(f"Kuru çalışma: {len(changed_df)} satır yazılacaktı "
+                  f"({changed_df['Tarih'].min():%d.%m.%Y} - {changed_df['Tarih'].max():%d.%m.%Y})")
+            return True
+        
+        return insert_data(changed_df)
+        
+    except Exception as e:
+        print(f"✗ Artımlı yükleme hatası: {e}")
+        return False
+
+@tlref_metrics.stage("db_upsert")
+def insert_data_in_batches(df):
+    """Veriyi batch'ler halinde tabloya ekle"""
+    try:
+        with transaction() as cur:
+            total_records = len(df)
+            total_batches = (total_records + BATCH_SIZE - 1) // BATCH_SIZE
             
-            # Batch insert
-            insert_sql = f"""
-                INSERT INTO {TABLE_NAME} 
-                (tarih, tlref_oran, tlref_yuzde, gun_adi, hafta_sonu, yil, ay, gun)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (tarih) DO UPDATE SET
-                    tlref_oran = EXCLUDED.tlref_oran,
-                    tlref_yuzde = EXCLUDED.tlref_yuzde,
-                    gun_adi = EXCLUDED.gun_adi,
-                    hafta_sonu = EXCLUDED.hafta_sonu,
-                    updated_at = CURRENT_TIMESTAMP
-            """
+            print(f"\n{total_records} kayıt {BATCH_SIZE}'er kayıt halinde {total_batches} batch'te ekleniyor...")
             
-            cur.executemany(insert_sql, insert_data)
-            conn.commit()
+            inserted_count = 0
             
-            inserted_count += len(insert_data)
-            progress = (batch_num / total_batches) * 100
-            print(f"  ✓ {len(insert_data)} kayıt eklendi | İlerleme: {progress:.1f}%")
+            for i in range(0, total_records, BATCH_SIZE):
+                batch_df = df.iloc[i:i+BATCH_SIZE]
+                batch_num = (i // BATCH_SIZE) + 1
+                
+                print(f"Batch {batch_num}/{total_batches} işleniyor...")
+                
+                # Batch verilerini hazırla
+                insert_data = []
+                for _, row in batch_df.iterrows():
+                    insert_data.append((
+                        row['Tarih'].date(),
+                        float(row['TLREF']),
+                        float(row['TLREF_Yuzde']),
+                        row['Gun_Adi'],
+                        bool(row['Hafta_Sonu']),
+                        int(row['Yil']),
+                        int(row['Ay']),
+                        int(row['Gun']),
+                        bool(row.get('Tasinan') == True)
+                    ))
+                
+                # Batch insert; taşınmış değer gerçek değerin üzerine yazılmaz, aynı kalan satıra dokunulmaz
+                insert_sql = f"""
+                    INSERT INTO {TABLE_NAME} 
+                    (tarih, tlref_oran, tlref_yuzde, gun_adi, hafta_sonu, yil, ay, gun, tasinan)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (tarih) DO UPDATE SET
+                        tlref_oran = EXCLUDED.tlref_oran,
+                        tlref_yuzde = EXCLUDED.tlref_yuzde,
+                        gun_adi = EXCLUDED.gun_adi,
+                        hafta_sonu = EXCLUDED.hafta_sonu,
+                        tasinan = EXCLUDED.tasinan,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE (NOT EXCLUDED.tasinan OR {TABLE_NAME}.tasinan)
+                      AND ({TABLE_NAME}.tlref_oran, {TABLE_NAME}.tasinan)
+                          IS DISTINCT FROM (EXCLUDED.tlref_oran, EXCLUDED.tasinan)
+                """
+                
+                cur.executemany(insert_sql, insert_data)
+                cur.connection.commit()
+                
+                inserted_count += len(insert_data)
+                progress = (batch_num / total_batches) * 100
+                print(f"  ✓ {len(insert_data)} kayıt eklendi | İlerleme: {progress:.1f}%")
+                
+                time.sleep(0.1)  # Kısa bekleme
             
-            time.sleep(0.1)  # Kısa bekleme
-        
-        cur.close()
-        conn.close()
+            refresh_rollups(cur, df['Tarih'].dt.date.unique())
+            refresh_index(cur, df['Tarih'].dt.date.unique())
         
+        tlref_metrics.count("tlref_rows_total", inserted_count, op="tlref_upsert")
         print(f"\n✓ Toplam {inserted_count} kayıt başarıyla tabloya eklendi")
         return True
-        
+    
     except Exception as e:
         print(f"✗ Veri ekleme hatası: {e}")
         return False
 
+def build_load_frame(df):
+    """DataFrame'i TLREF tablosunun kolon sırasına ve tiplerine dönüştür"""
+    return pd.DataFrame({
+        'tarih': df['Tarih'].dt.date,
+        'tlref_oran': df['TLREF'].astype(float),
+        'tlref_yuzde': df['TLREF_Yuzde'].astype(float),
+        'gun_adi': df['Gun_Adi'],
+        'hafta_sonu': df['Hafta_Sonu'].astype(bool),
+        'yil': df['Yil'].astype(int),
+        'ay': df['Ay'].astype(int),
+        'gun': df['Gun'].astype(int),
+        # fill_date_gaps'in eklediği günler; Excel'in kendi satırlarında sütun boştur
+        'tasinan': df['Tasinan'].eq(True) if 'Tasinan' in df else False
+    })
+
+def copy_into_staging(cur, df, staging_table):
+    """Hazır DataFrame'i COPY FROM STDIN ile geçici staging tablosuna aktar"""
+    load_df = build_load_frame(df)
+    # Aynı tarih birden fazla gelirse executemany'deki gibi son satır kazanır
+    load_df.insert(0, 'sira', range(len(load_df)))
+    
+    cur.execute(f"""
+        CREATE TEMP TABLE {staging_table} (
+            sira INTEGER,
+            tarih DATE,
+            tlref_oran DECIMAL(10, 6),
+            tlref_yuzde DECIMAL(8, 6),
+            gun_adi VARCHAR(20),
+            hafta_sonu BOOLEAN,
+            yil INTEGER,
+            ay INTEGER,
+            gun INTEGER,
+            tasinan BOOLEAN
+        ) ON COMMIT DROP
+    """)
+    
+    buffer = io.StringIO()
+    load_df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cur.copy_expert(
+        f"COPY {staging_table} ({', '.join(load_df.columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+    return len(load_df)
+
+@tlref_metrics.stage("db_upsert")
+def insert_data_bulk(df):
+    """Veriyi COPY ile staging tablosuna aktarıp tek bir merge ile tabloya ekle"""
+    try:
+        with transaction() as cur:
+            staging_table = f"{TABLE_NAME}_staging"
+            
+            print(f"\n{len(df)} kayıt COPY ile staging tablosuna aktarılıyor...")
+            copied = copy_into_staging(cur, df, staging_table)
+            
+            # Tek set-based upsert; xmax = 0 olan satırlar yeni eklenmiştir. Değişmeyen satırlar
+            # (ve gerçek değerin üzerine gelen taşınmış değerler) atlanır, updated_at'leri ilerlemez
+            cur.execute(f"""
+                WITH merged AS (
+                    INSERT INTO {TABLE_NAME}
+                    (tarih, tlref_oran, tlref_yuzde, gun_adi, hafta_sonu, yil, ay, gun, tasinan)
+                    SELECT DISTINCT ON (tarih)
+                        tarih, tlref_oran, tlref_yuzde, gun_adi, hafta_sonu, yil, ay, gun, tasinan
+                    FROM {staging_table}
+                    ORDER BY tarih, sira DESC
+                    ON CONFLICT (tarih) DO UPDATE SET
+                        tlref_oran = EXCLUDED.tlref_oran,
+                        tlref_yuzde = EXCLUDED.tlref_yuzde,
+                        gun_adi = EXCLUDED.gun_adi,
+                        hafta_sonu = EXCLUDED.hafta_sonu,
+                        tasinan = EXCLUDED.tasinan,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE (NOT EXCLUDED.tasinan OR {TABLE_NAME}.tasinan)
+                      AND ({TABLE_NAME}.tlref_oran, {TABLE_NAME}.tasinan)
+                          IS DISTINCT FROM (EXCLUDED.tlref_oran, EXCLUDED.tasinan)
+                    RETURNING (xmax = 0) AS eklendi
+                )
+                SELECT
+                    COUNT(*) FILTER (WHERE eklendi),
+                    COUNT(*) FILTER (WHERE NOT eklendi)
+                FROM merged
+            """)
+            inserted_count, updated_count = cur.fetchone()
+            tlref_metrics.count("tlref_rows_total", inserted_count + updated_count, op="tlref_upsert")
+            
+            # Sadece dokunulan yıl/ay kovaları ve ilk değişen tarihten sonraki endeks yeniden hesaplanır
+            refresh_rollups(cur, df['Tarih'].dt.date.unique())
+            refresh_index(cur, df['Tarih'].dt.date.unique())
+        
+        print(f"  ✓ {copied} satır aktarıldı")
+        print(f"\n✓ Toplam {inserted_count} kayıt eklendi, {updated_count} kayıt güncellendi")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Toplu veri ekleme hatası: {e}")
+        return False
+
+def insert_data(df, mode=LOAD_MODE):
+    """Seçilen moda göre veriyi tabloya ekle (copy veya batch)"""
+    if mode == "batch":
+        return insert_data_in_batches(df)
+    return insert_data_bulk(df)
+
+@tlref_metrics.stage("shadow_load")
+def load_shadow_table(cur, df, shadow_table):
+    """Gölge tabloyu indekssiz oluşturup COPY ile doldur, sonra indeksleri kur
+
+    Kümülatif endeks sütunları DataFrame üzerinde hesaplanıp satırlarla birlikte yazılır;
+    yüklenen satırlar sonradan UPDATE ile yeniden yazılmaz.
+    """
+    cur.execute(f"DROP TABLE IF EXISTS {shadow_table}")
+    cur.execute(f"CREATE TABLE {shadow_table} ({TABLE_COLUMNS_SQL});")
+    
+    # Aynı tarih birden fazla gelirse merge yolundaki gibi son satır kazanır
+    load_df = (build_load_frame(df).drop_duplicates(subset='tarih', keep='last')
+               .sort_values('tarih').reset_index(drop=True))
+    # Oranlar tablodaki DECIMAL(8, 6) ile aynı yuvarlanır; rebuild_index ile aynı zincir çıkar
+    load_df['kumulatif_endeks'], load_df['kumulatif_toplam'] = compute_index(load_df['tlref_yuzde'].round(6))
+    buffer = io.StringIO()
+    load_df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cur.copy_expert(
+        f"COPY {shadow_table} ({', '.join(load_df.columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+    
+    # İndeksler yükleme bittikten sonra tek seferde kurulur
+    create_table_indexes(cur, shadow_table)
+    cur.execute(f"ANALYZE {shadow_table}")
+    return load_df
+
+def validate_shadow_table(cur, load_df, shadow_table):
+    """Gölge tablonun satır sayısını, tarih ve oran aralığını beklenenle karşılaştır"""
+    cur.execute(f"""
+        SELECT COUNT(*), MIN(tarih), MAX(tarih), MIN(tlref_oran), MAX(tlref_oran),
+               COUNT(*) FILTER (WHERE tlref_yuzde IS NULL OR yil IS NULL OR kumulatif_endeks IS NULL)
+        FROM {shadow_table}
+    """)
+    count, min_date, max_date, min_rate, max_rate, incomplete = cur.fetchone()
+    
+    errors = []
+    if count != len(load_df):
+        errors.append(f"satır sayısı {count} != {len(load_df)}")
+    if (min_date, max_date) != (load_df['tarih'].min(), load_df['tarih'].max()):
+        errors.append(f"tarih aralığı {min_date} - {max_date} beklenenden farklı")
+    if count and (abs(float(min_rate) - load_df['tlref_oran'].min()) > 1e-6
+                  or abs(float(max_rate) - load_df['tlref_oran'].max()) > 1e-6):
+        errors.append(f"TLREF aralığı {min_rate} - {max_rate} beklenenden farklı")
+    if incomplete:
+        errors.append(f"{incomplete} satırda eksik türetilmiş sütun")
+    return count, min_date, max_date, errors
+
+@tlref_metrics.stage("shadow_swap")
+def swap_in_shadow_table(cur, shadow_table, keep_newer=True):
+    """Gölge tabloyu tek işlemde yeniden adlandırarak asıl tablonun yerine koy
+
+    Kilit altında sadece Excel sonrasına ait satırlar taşınır (endeksleri ve özet kovaları
+    artımlı yenilenir), tablolar yeniden adlandırılır ve view'lar yeniden bağlanır.
+    """
+    old_table = f"{TABLE_NAME}_old"
+    cur.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+    cur.execute("SELECT to_regclass(%s)", (TABLE_NAME.lower(),))
+    table_exists = cur.fetchone()[0] is not None
+    
+    carried = 0
+    views = []
+    if table_exists:
+        cur.execute(f"LOCK TABLE {TABLE_NAME} IN ACCESS EXCLUSIVE MODE")
+        views = dependent_views(cur, TABLE_NAME)
+        
+        # Excel'in bittiği tarihten sonra API ile eklenmiş günler kaybolmasın
+        if keep_newer:
+            cur.execute(f"""
+                INSERT INTO {shadow_table}
+                (tarih, tlref_oran, tlref_yuzde, gun_adi, hafta_sonu, yil, ay, gun, tasinan, created_at, updated_at)
+                SELECT tarih, tlref_oran, tlref_yuzde, gun_adi, hafta_sonu, yil, ay, gun, tasinan, created_at, updated_at
+                FROM {TABLE_NAME}
+                WHERE tarih > (SELECT MAX(tarih) FROM {shadow_table})
+                RETURNING tarih
+            """)
+            carried_dates = [row[0] for row in cur.fetchall()]
+            carried = len(carried_dates)
+            refresh_index(cur, carried_dates, table=shadow_table)
+            refresh_rollups(cur, carried_dates, source=shadow_table)
+        
+        cur.execute(f"ALTER TABLE {TABLE_NAME} RENAME TO {old_table}")
+    
+    cur.execute(f"ALTER TABLE {shadow_table} RENAME TO {TABLE_NAME}")
+    if table_exists:
+        cur.execute(f"DROP TABLE {old_table} CASCADE")
+    
+    # Gölge adlarıyla oluşan kısıt, indeks ve sequence adlarını asıl adlara çevir
+    cur.execute(f"ALTER TABLE {TABLE_NAME} RENAME CONSTRAINT {shadow_table}_pkey TO {TABLE_NAME}_pkey")
+    cur.execute(f"ALTER TABLE {TABLE_NAME} RENAME CONSTRAINT {shadow_table}_tarih_key TO {TABLE_NAME}_tarih_key")
+    rename_indexes(cur, TLREF_INDEXES, shadow_table, TABLE_NAME)
+    cur.execute(f"ALTER SEQUENCE {shadow_table}_id_seq RENAME TO {TABLE_NAME}_id_seq")
+    
+    # Eski tabloyla birlikte düşen view'ları yeni tabloya yeniden bağla
+    for name, definition in views:
+        cur.execute(f"CREATE OR REPLACE VIEW {name} AS {definition}")
+    # Sütunlar gölge tabloda zaten var; dönem fonksiyonu ilk kurulumda oluşturulur
+    create_index_columns(cur, TABLE_NAME)
+    return carried, [name for name, _ in views]
+
+def rebuild_table_shadow(df, keep_newer=True):
+    """Veriyi gölge tabloya yükle, doğrula ve okuyucuları kesmeden asıl tabloyla değiştir"""
+    shadow_table = f"{TABLE_NAME}_shadow"
+    try:
+        print(f"\n{len(df)} kayıt gölge tabloya ({shadow_table}) yükleniyor...")
+        start = time.perf_counter()
+        with transaction() as cur:
+            load_df = load_shadow_table(cur, df, shadow_table)
+            count, min_date, max_date, errors = validate_shadow_table(cur, load_df, shadow_table)
+            if errors:
+                raise ValueError("gölge tablo doğrulanamadı: " + "; ".join(errors))
+        
+        print(f"  ✓ {count} satır yüklendi ve doğrulandı ({min_date} - {max_date}) "
+              f"| {time.perf_counter() - start:.2f} sn")
+        
+        with transaction() as cur:
+            # Özetler asıl tablo kilitlenmeden gölge tablodan hesaplanır; değiştirmeyle aynı
+            # işlemde olduğundan okuyucular yeni özetleri yeni tabloyla birlikte görür.
+            # İşgünü view'ı gölge tabloya bağlanır ve yeniden adlandırmada onu izler.
+            create_rollup_tables(cur, source=shadow_table)
+            rebuild_rollups(cur, source=shadow_table)
+            carried, views = swap_in_shadow_table(cur, shadow_table, keep_newer)
+        
+        if carried:
+            print(f"  ✓ Excel sonrasına ait {carried} kayıt mevcut tablodan aktarıldı")
+        print(f"✓ '{TABLE_NAME}' tablosu tek işlemde gölge tabloyla değiştirildi")
+        if views:
+            print(f"  ✓ Yeniden bağlanan view'lar: {', '.join(views)}")
+        return True
+    
+    except Exception as e:
+        print(f"✗ Gölge tablo ile yeniden oluşturma hatası: {e}")
+        try:
+            with transaction() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {shadow_table}")
+        except Exception:
+            pass
+        return False
+
 def verify_table_data():
     """Tablo verilerini doğrula"""
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        
-        # Genel istatistikler
-        cur.execute(f"""
-            SELECT 
-                COUNT(*) as toplam_kayit,
-                MIN(tarih) as min_tarih,
-                MAX(tarih) as max_tarih,
-                MIN(tlref_oran) as min_tlref,
-                MAX(tlref_oran) as max_tlref,
-                COUNT(CASE WHEN hafta_sonu = true THEN 1 END) as hafta_sonu_sayisi
-            FROM {TABLE_NAME}
-        """)
-        
-        stats = cur.fetchone()
-        toplam, min_tarih, max_tarih, min_tlref, max_tlref, hafta_sonu = stats
-        
-        print("\n=== TABLO DOĞRULAMA RAPORU ===")
-        print(f"Tablo adı: {TABLE_NAME}")
-        print(f"Toplam kayıt: {toplam:,}")
-        print(f"Tarih aralığı: {min_tarih} - {max_tarih}")
-        print(f"TLREF aralığı: {min_tlref:.4f} - {max_tlref:.4f}")
-        print(f"Hafta sonu kayıt: {hafta_sonu}")
-        
-        # Yıllık istatistikler
-        cur.execute(f"""
-            SELECT 
-                yil,
-                COUNT(*) as kayit_sayisi,
-                AVG(tlref_yuzde) as ortalama_tlref,
-                MIN(tlref_yuzde) as min_tlref,
-                MAX(tlref_yuzde) as max_tlref
-            FROM {TABLE_NAME}
-            GROUP BY yil
-            ORDER BY yil
-        """)
-        
-        yearly_stats = cur.fetchall()
-        print(f"\nYıllık İstatistikler:")
-        print("-" * 80)
-        print("Yıl    | Kayıt | Ort TLREF(%) | Min TLREF(%) | Max TLREF(%)")
-        print("-" * 80)
-        for yil, kayit, ort, min_val, max_val in yearly_stats:
-            print(f"{yil} | {kayit:5} | {ort:.6f}   | {min_val:.6f}   | {max_val:.6f}")
-        
-        # Son 10 kayıt
-        cur.execute(f"""
-            SELECT tarih, tlref_oran, tlref_yuzde, gun_adi, hafta_sonu
-            FROM {TABLE_NAME}
-            ORDER BY tarih DESC
-            LIMIT 10
-        """)
-        
-        recent = cur.fetchall()
-        print(f"\nSon 10 kayıt:")
-        for tarih, oran, yuzde, gun, hafta_sonu in recent:
-            hafta_sonu_str = "HaftaSonu" if hafta_sonu else gun
-            print(f"  {tarih} ({hafta_sonu_str}): {oran:.4f} (%{yuzde:.6f})")
-        
-        cur.close()
-        conn.close()
+        with transaction() as cur:
+            # Genel istatistikler
+            cur.execute(f"""
+                SELECT 
+                    COUNT(*) as toplam_kayit,
+                    MIN(tarih) as min_tarih,
+                    MAX(tarih) as max_tarih,
+                    MIN(tlref_oran) as min_tlref,
+                    MAX(tlref_oran) as max_tlref,
+                    COUNT(CASE WHEN hafta_sonu = true THEN 1 END) as hafta_sonu_sayisi
+                FROM {TABLE_NAME}
+            """)
+            
+            stats = cur.fetchone()
+            toplam, min_tarih, max_tarih, min_tlref, max_tlref, hafta_sonu = stats
+            
+            print("\n=== TABLO DOĞRULAMA RAPORU ===")
+            print(f"Tablo adı: {TABLE_NAME}")
+            print(f"Toplam kayıt: {toplam:,}")
+            print(f"Tarih aralığı: {min_tarih} - {max_tarih}")
+            print(f"TLREF aralığı: {min_tlref:.4f} - {max_tlref:.4f}")
+            print(f"Hafta sonu kayıt: {hafta_sonu}")
+            
+            # Yıllık istatistikler
+            cur.execute(f"""
+                SELECT 
+                    yil,
+                    COUNT(*) as kayit_sayisi,
+                    AVG(tlref_yuzde) as ortalama_tlref,
+                    MIN(tlref_yuzde) as min_tlref,
+                    MAX(tlref_yuzde) as max_tlref
+                FROM {TABLE_NAME}
+                GROUP BY yil
+                ORDER BY yil
+            """)
+            
+            yearly_stats = cur.fetchall()
+            print(f"\nYıllık İstatistikler:")
+            print("-" * 80)
+            print("Yıl    | Kayıt | Ort TLREF(%) | Min TLREF(%) | Max TLREF(%)")
+            print("-" * 80)
+            for yil, kayit, ort, min_val, max_val in yearly_stats:
+                print(f"{yil} | {kayit:5} | {ort:.6f}   | {min_val:.6f}   | {max_val:.6f}")
+            
+            # Son 10 kayıt
+            cur.execute(f"""
+                SELECT tarih, tlref_oran, tlref_yuzde, gun_adi, hafta_sonu
+                FROM {TABLE_NAME}
+                ORDER BY tarih DESC
+                LIMIT 10
+            """)
+            
+            recent = cur.fetchall()
+            print(f"\nSon 10 kayıt:")
+            for tarih, oran, yuzde, gun, hafta_sonu in recent:
+                hafta_sonu_str = "HaftaSonu" if hafta_sonu else gun
+                print(f"  {tarih} ({hafta_sonu_str}): {oran:.4f} (%{yuzde:.6f})")
         
     except Exception as e:
         print(f"✗ Doğrulama hatası: {e}")
 
 def create_useful_views():
-    """Faydalı view'lar oluştur"""
+    """İşgünü view'ını ve aylık/yıllık özet tablolarını oluştur"""
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
+        with transaction() as cur:
+            create_rollup_tables(cur)
+            monthly_count, yearly_count = rebuild_rollups(cur)
+            create_index_columns(cur, TABLE_NAME)
+            index_count = rebuild_index(cur)
         
-        # 1. İşgünleri view'ı
-        cur.execute(f"""
-            CREATE OR REPLACE VIEW {TABLE_NAME}_workdays AS
-            SELECT * FROM {TABLE_NAME}
-            WHERE hafta_sonu = FALSE
-            ORDER BY tarih;
-        """)
-        
-        # 2. Aylık ortalama view'ı
-        cur.execute(f"""
-            CREATE OR REPLACE VIEW {TABLE_NAME}_monthly_avg AS
-            SELECT 
-                yil,
-                ay,
-                COUNT(*) as gun_sayisi,
-                AVG(tlref_yuzde) as ortalama_tlref,
-                MIN(tlref_yuzde) as min_tlref,
-                MAX(tlref_yuzde) as max_tlref,
-                STDDEV(tlref_yuzde) as standart_sapma
-            FROM {TABLE_NAME}
-            GROUP BY yil, ay
-            ORDER BY yil, ay;
-        """)
-        
-        # 3. Yıllık trend view'ı
-        cur.execute(f"""
-            CREATE OR REPLACE VIEW {TABLE_NAME}_yearly_trend AS
-            SELECT 
-                yil,
-                COUNT(*) as toplam_gun,
-                AVG(tlref_yuzde) as ortalama_tlref,
-                MIN(tlref_yuzde) as min_tlref,
-                MAX(tlref_yuzde) as max_tlref,
-                MAX(tlref_yuzde) - MIN(tlref_yuzde) as volatilite
-            FROM {TABLE_NAME}
-            GROUP BY yil
-            ORDER BY yil;
-        """)
-        
-        conn.commit()
-        cur.close()
-        conn.close()
-        
-        print("\n✓ Faydalı view'lar oluşturuldu:")
+        print("\n✓ Faydalı view'lar ve özet tabloları oluşturuldu:")
         print(f"  - {TABLE_NAME}_workdays (sadece işgünleri)")
-        print(f"  - {TABLE_NAME}_monthly_avg (aylık ortalamalar)")
-        print(f"  - {TABLE_NAME}_yearly_trend (yıllık trendler)")
-        
+        print(f"  - {TABLE_NAME}_monthly_avg (aylık ortalamalar, {monthly_count} ay)")
+        print(f"  - {TABLE_NAME}_yearly_trend (yıllık trendler, {yearly_count} yıl)")
+        print(f"  - {WINDOW_FUNCTION}(bas, son) (kümülatif endeks, {index_count} gün)")
+    
     except Exception as e:
         print(f"✗ View oluşturma hatası: {e}")
 
 def main():
     print("=== TLREF Tarihi Veri Tablosu Oluşturucu ===")
-    print("EVDS_Uzun_Tarih.xlsx dosyasından veritabanına tablo oluşturacak")
+    print(f"{EXCEL_FILE} dosyasından veritabanına tablo oluşturacak")
+    print("(Etkileşimsiz kullanım: python tlref_cli.py create|load|incremental|verify)")
     print()
     
-    # 1. Excel dosyasını oku
-    print("1. Excel dosyası okunuyor...")
-    df = read_excel_long_data()
-    
-    if df is None:
-        print("Excel dosyası okunamadı. İşlem durduruluyor.")
-        return
-    
-    # 2. Veri özeti
-    print(f"\n2. Veri özeti:")
-    print(f"   Toplam kayıt: {len(df):,}")
-    print(f"   Tarih aralığı: {df['Tarih'].min().strftime('%d.%m.%Y')} - {df['Tarih'].max().strftime('%d.%m.%Y')}")
-    print(f"   Hafta sonu kayıt: {df['Hafta_Sonu'].sum()}")
-    print(f"   İşgünü kayıt: {(~df['Hafta_Sonu']).sum()}")
-    
-    # 3. İşlem seçeneği
-    print(f"\n3. İşlem seçenekleri:")
+    # İşlem seçeneği
+    print(f"İşlem seçenekleri:")
     print(f"1. Yeni tablo oluştur ve verileri ekle (UYARI: Mevcut TLREF tablosu silinecek!)")
     print(f"2. Mevcut tabloya yeni verileri ekle/güncelle")
-    print(f"3. Sadece veri kontrolü yap")
-    print(f"4. İptal")
+    print(f"3. Sadece yeni/değişen verileri ekle (artımlı)")
+    print(f"4. Sadece veri kontrolü yap")
+    print(f"5. İptal")
     
     try:
-        choice = input("\nSeçiminizi yapın (1/2/3/4): ")
+        choice = input("\nSeçiminizi yapın (1/2/3/4/5): ")
         
         if choice == "1":
             print(f"\n⚠ UYARI: Bu işlem mevcut TLREF tablosunu silecek!")
             confirm = input("Devam etmek istediğinizden emin misiniz? (EVET/hayır): ")
             
             if confirm.upper() == "EVET":
-                print(f"\n4. Veritabanı tablosu oluşturuluyor...")
-                if not create_tlref_table():
-                    return
-                
-                print(f"\n5. Veriler tabloya ekleniyor...")
-                if not insert_data_in_batches(df):
-                    return
-                
-                print(f"\n6. Tablo verileri doğrulanıyor...")
-                verify_table_data()
-                
-                print(f"\n7. Faydalı view'lar oluşturuluyor...")
-                create_useful_views()
+                if tlref_cli.main(["create", "--yes"]) == 0:
+                    tlref_cli.main(["verify", "--target", "tlref"])
             else:
                 print("İşlem iptal edildi.")
                 
         elif choice == "2":
-            print(f"\n4. Mevcut tabloya veriler ekleniyor/güncelleniyor...")
-            if not insert_data_in_batches(df):
-                return
-            
-            print(f"\n5. Tablo verileri doğrulanıyor...")
-            verify_table_data()
+            if tlref_cli.main(["load"]) == 0:
+                tlref_cli.main(["verify", "--target", "tlref"])
             
         elif choice == "3":
-            print("Sadece veri kontrolü yapıldı.")
+            if tlref_cli.main(["incremental"]) == 0:
+                tlref_cli.main(["verify", "--target", "tlref"])
+            
+        elif choice == "4":
+            tlref_cli.main(["load", "--dry-run"])
             
         else:
             print("İşlem iptal edildi.")